@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+import time
+
+# ensure project root is importable
+proj_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if proj_root not in sys.path:
+    sys.path.insert(0, proj_root)
+
+import numba
+import numpy as np
+
+from dt import geodesic_distance_transform
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Scaling of the parallel geodesic raster sweeps"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4096, 8192])
+    parser.add_argument("--threads", type=int, nargs="+", default=None)
+    parser.add_argument("--sweeps", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    threads = args.threads
+    if threads is None:
+        threads = [1]
+        while threads[-1] * 2 <= numba.config.NUMBA_NUM_THREADS:
+            threads.append(threads[-1] * 2)
+
+    # compile both paths before timing
+    small = np.zeros((8, 8), dtype=np.uint8)
+    geodesic_distance_transform(small, small == 0)
+    geodesic_distance_transform(small, small == 0, parallel=True)
+
+    rng = np.random.default_rng(0)
+    print(f"{'size':>6} {'threads':>7} {'time (s)':>9} {'speedup':>8}")
+    for n in args.sizes:
+        img = rng.integers(0, 256, (n, n), dtype=np.uint8)
+        mask = np.zeros((n, n), dtype=bool)
+        mask[n // 2, n // 2] = True
+
+        def run(parallel: bool) -> tuple[float, np.ndarray]:
+            best = float("inf")
+            for _ in range(args.repeat):
+                t = time.perf_counter()
+                res = geodesic_distance_transform(
+                    img, mask, max_sweeps=args.sweeps, parallel=parallel
+                )
+                best = min(best, time.perf_counter() - t)
+            return best, res
+
+        t_serial, ref = run(False)
+        print(f"{n:>6} {'serial':>7} {t_serial:>9.3f} {1.0:>8.2f}")
+        for nt in threads:
+            numba.set_num_threads(nt)
+            t_par, res = run(True)
+            assert np.array_equal(res, ref), "parallel result differs from serial"
+            print(f"{n:>6} {nt:>7} {t_par:>9.3f} {t_serial / t_par:>8.2f}")
+        numba.set_num_threads(numba.config.NUMBA_NUM_THREADS)
+
+
+if __name__ == "__main__":
+    main()
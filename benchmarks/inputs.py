@@ -0,0 +1,61 @@
+import numpy as np
+
+IMAGES = ("noise", "gradient", "spiral", "piecewise")
+MARKERS = ("point", "scribbles", "dense")
+
+
+def make_image(kind: str, n: int, dtype, rng: np.random.Generator) -> np.ndarray:
+    vmax = np.iinfo(dtype).max
+    if kind == "noise":
+        x = rng.random((n, n))
+    elif kind == "gradient":
+        x = np.add.outer(np.arange(n), np.arange(n)) / max(2 * n - 2, 1)
+    elif kind == "spiral":
+        y, z = np.mgrid[:n, :n] - n / 2
+        r = np.hypot(y, z)
+        theta = np.arctan2(y, z)
+        x = (np.sin(r / max(n / 128, 1) - theta) > 0) * 0.8 + 0.1
+    elif kind == "piecewise":
+        # constant blocks of random size and value
+        k = max(n // 32, 1)
+        x = rng.random((k, k))
+        x = np.repeat(np.repeat(x, -(-n // k), axis=0), -(-n // k), axis=1)[:n, :n]
+    else:
+        raise ValueError(f"Unknown image: {kind}")
+    return (x * vmax).astype(dtype)
+
+
+def make_markers(kind: str, n: int, rng: np.random.Generator) -> np.ndarray:
+    # 0/1 marker image
+    markers = np.zeros((n, n), dtype=np.uint8)
+    if kind == "point":
+        markers[n // 2, n // 2] = 1
+    elif kind == "scribbles":
+        # a few thick straight strokes
+        for _ in range(5):
+            (l0, c0), (l1, c1) = rng.integers(0, n, (2, 2))
+            t = np.linspace(0, 1, 2 * n)
+            l = np.round(l0 + t * (l1 - l0)).astype(int)
+            c = np.round(c0 + t * (c1 - c0)).astype(int)
+            for d in range(-2, 3):
+                markers[np.clip(l + d, 0, n - 1), c] = 1
+    elif kind == "dense":
+        markers[rng.random((n, n)) < 0.05] = 1
+    else:
+        raise ValueError(f"Unknown markers: {kind}")
+    return markers
+
+
+def make_frames(img: np.ndarray, count: int) -> list[np.ndarray]:
+    # Frames of a video: a bright square moving over img
+    n = img.shape[0]
+    blob = max(n // 16, 1)
+    vmax = np.iinfo(img.dtype).max
+    res = []
+    for t in range(count):
+        frame = img.astype(np.int64)
+        y = (n // 4 + 4 * t) % max(n - blob, 1)
+        x = (n // 2 + 3 * t) % max(n - blob, 1)
+        frame[y : y + blob, x : x + blob] += vmax * 3 // 8
+        res.append(np.clip(frame, 0, vmax).astype(img.dtype))
+    return res
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+import argparse
+import functools
+import json
+import os
+import platform
+import sys
+import time
+
+# ensure project root is importable
+proj_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if proj_root not in sys.path:
+    sys.path.insert(0, proj_root)
+
+import numba
+import numpy as np
+
+from dt import (
+    immersion,
+    add_median_border,
+    get_coordinates,
+    get_immersed_coordinates,
+    level_lines_distance_transform,
+    implicit_level_lines_distance_transform,
+    geodesic_distance_transform,
+    batch_level_lines_distance_transform,
+    batch_geodesic_distance_transform,
+    multiresolution_level_lines_distance_transform,
+    multiresolution_geodesic_distance_transform,
+    approximation_error,
+    StreamingSession,
+)
+from dt.geodesic_distance_transform import _distances, _sweep
+from inputs import IMAGES, MARKERS, make_image, make_markers, make_frames
+
+DTYPES = {"uint8": np.uint8, "uint16": np.uint16}
+
+# Pixels of the stacks of images of the batch cases (256 images of 256x256,
+# 16 of 1024x1024, a single one from 4096x4096)
+BATCH_PIXELS = 2**24
+
+# Levels, band and sweeps of the multiresolution cases
+LEVELS, BAND, SWEEPS = 3, 2, 2
+
+# (connectivity, gamma) of the connectivity cases, gamma None being the
+# intensity costs only
+CONNECTIVITY = ((8, None), (4, None), (16, None), (4, 1.0), (8, 1.0), (16, 1.0))
+
+
+class Case:
+    # A case whose function to time is built by setup(), only when the case
+    # runs (setup is not timed), and whose last result gives extra(result),
+    # fields added to its entry of the report (errors, number of sweeps)
+    def __init__(self, setup, extra=None):
+        self.setup = setup
+        self.extra = extra
+
+
+def image_cases(img: np.ndarray) -> dict:
+    # Functions that only depend on the image
+    return {
+        "immersion": lambda: immersion(img),
+        "add_median_border": lambda: add_median_border(img),
+    }
+
+
+def marker_cases(img: np.ndarray, markers: np.ndarray) -> dict:
+    # Functions that depend on the markers, with the immersion precomputed
+    m, M = immersion(img)
+    seeds = get_immersed_coordinates(markers)
+    mask = markers > 0
+    return {
+        "get_coordinates": lambda: get_coordinates(markers),
+        "level_lines_distance_transform": lambda: level_lines_distance_transform(
+            m, M, seeds
+        ),
+        "implicit_level_lines_distance_transform[pixels]": lambda: (
+            implicit_level_lines_distance_transform(img, seeds, pixels_only=True)
+        ),
+        "geodesic_distance_transform[sweep]": lambda: geodesic_distance_transform(
+            img, mask
+        ),
+        "geodesic_distance_transform[dial]": lambda: geodesic_distance_transform(
+            img, mask, method="dial"
+        ),
+    }
+
+
+def batch_cases(img: np.ndarray, markers: np.ndarray, repeat: int) -> dict:
+    # The batched transforms of a stack of shifted copies of img, with the
+    # same markers, and one call per image of the stack for comparison
+    count = max(BATCH_PIXELS // img.size, 1)
+    mask = markers > 0
+    seeds = [get_immersed_coordinates(markers)] * count
+
+    @functools.cache
+    def stack():
+        imgs = np.stack([np.roll(img, 7 * k, axis=1) for k in range(count)])
+        return imgs, np.broadcast_to(mask, imgs.shape)
+
+    def lldt(batched: bool):
+        imgs, _ = stack()
+        if batched:
+            return lambda: batch_level_lines_distance_transform(
+                imgs, seeds, pixels_only=True, return_levels=False
+            )
+        return lambda: [
+            implicit_level_lines_distance_transform(
+                i, s, pixels_only=True, return_levels=False
+            )
+            for i, s in zip(imgs, seeds)
+        ]
+
+    def gdt(batched: bool, method: str):
+        imgs, masks = stack()
+        if batched:
+            return lambda: batch_geodesic_distance_transform(imgs, masks, method=method)
+        return lambda: [
+            geodesic_distance_transform(i, m, method=method)
+            for i, m in zip(imgs, masks)
+        ]
+
+    cases = {}
+    for batched, suffix in ((True, ""), (False, ", loop")):
+        cases[f"batch_level_lines_distance_transform[pixels{suffix}]"] = Case(
+            functools.partial(lldt, batched)
+        )
+        for method in ("sweep", "dial"):
+            cases[f"batch_geodesic_distance_transform[{method}{suffix}]"] = Case(
+                functools.partial(gdt, batched, method)
+            )
+    return cases
+
+
+def stream_cases(img: np.ndarray, markers: np.ndarray, repeat: int) -> dict:
+    # Latency of a StreamingSession on the frames of a square moving over
+    # img, each run updating the maps of the previous frame, and of new
+    # transforms of a frame. The error is the one of the streamed LLDT.
+    mask = markers > 0
+    seeds = get_immersed_coordinates(markers)
+    frames = functools.cache(lambda: make_frames(img, repeat + 1))
+    current = []
+
+    def stream():
+        session = StreamingSession()
+        session.update(frames()[0], mask)
+        it = iter(frames()[1:])
+
+        def update():
+            current[:] = [next(it)]
+            return session.update(current[0], mask)
+
+        return update
+
+    def error(maps) -> dict:
+        exact = implicit_level_lines_distance_transform(
+            current[0], seeds, pixels_only=True, return_levels=False
+        )[1]
+        return {"error": approximation_error(maps["lldt"], exact)}
+
+    return {
+        "StreamingSession.update": Case(stream, error),
+        "StreamingSession.update[cold]": Case(
+            lambda: lambda: StreamingSession().update(frames()[1], mask)
+        ),
+    }
+
+
+def multiresolution_cases(img: np.ndarray, markers: np.ndarray, repeat: int) -> dict:
+    # The multiresolution transforms at each stop level, with their error
+    # against the exact transforms
+    mask = markers > 0
+    seeds = get_immersed_coordinates(markers)
+    exact = {
+        "level_lines": functools.cache(
+            lambda: implicit_level_lines_distance_transform(
+                img, seeds, pixels_only=True, return_levels=False
+            )[1]
+        ),
+        "geodesic": functools.cache(lambda: geodesic_distance_transform(img, mask)),
+    }
+    approx = {
+        "level_lines": lambda stop: multiresolution_level_lines_distance_transform(
+            img, seeds, LEVELS, stop, BAND
+        ),
+        "geodesic": lambda stop: multiresolution_geodesic_distance_transform(
+            img, mask, LEVELS, stop, BAND, SWEEPS
+        ),
+    }
+
+    def timed(name: str, stop: int):
+        return lambda: approx[name](stop)
+
+    def error(name: str):
+        return lambda res: {"error": approximation_error(res, exact[name]())}
+
+    cases = {}
+    for name in approx:
+        for stop in range(LEVELS, -1, -1):
+            cases[f"multiresolution_{name}_distance_transform[stop={stop}]"] = Case(
+                functools.partial(timed, name, stop), error(name)
+            )
+    return cases
+
+
+def connectivity_cases(img: np.ndarray, markers: np.ndarray, repeat: int) -> dict:
+    # The geodesic sweeps until convergence for each connectivity, with and
+    # without the GeoS spatial term, with their number of sweeps
+    mask = markers > 0
+    no_labels = np.empty((0, 0), dtype=np.uint8)
+
+    def solve(connectivity: int, gamma: float | None) -> int:
+        dist = _distances(img.shape, None)
+        dist[mask] = 0
+        return _sweep(
+            img,
+            dist[None],
+            no_labels,
+            None,
+            0.0,
+            False,
+            connectivity=connectivity,
+            gamma=gamma,
+        )
+
+    cases = {}
+    for connectivity, gamma in CONNECTIVITY:
+        name = f"connectivity={connectivity}"
+        if gamma is not None:
+            name += f", gamma={gamma:g}"
+        cases[f"geodesic_distance_transform[{name}]"] = Case(
+            lambda c=connectivity, g=gamma: lambda: solve(c, g),
+            lambda n: {"sweeps": n},
+        )
+    return cases
+
+
+# Cases of each suite besides the core one (image_cases and marker_cases)
+SUITES = {
+    "batch": batch_cases,
+    "stream": stream_cases,
+    "multiresolution": multiresolution_cases,
+    "connectivity": connectivity_cases,
+}
+
+
+def all_cases(
+    img: np.ndarray,
+    markers: np.ndarray,
+    suites: list[str],
+    repeat: int,
+) -> dict:
+    # The cases of the suites that depend on the markers
+    cases = marker_cases(img, markers) if "core" in suites else {}
+    for suite, fn in SUITES.items():
+        if suite in suites:
+            cases.update(fn(img, markers, repeat))
+    return cases
+
+
+def keep_result(fn, results: list):
+    # fn, keeping the result of its last run in results
+    def run():
+        # the previous result is freed before the next run
+        results.clear()
+        results.append(fn())
+
+    return run
+
+
+def measure(fn, repeat: int, budget: float) -> tuple[float, int]:
+    # Best time over `repeat` runs, stopping early when the runs get too long
+    best = float("inf")
+    runs = 0
+    total = 0.0
+    while runs < repeat and (runs == 0 or total < budget):
+        t = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t
+        best = min(best, elapsed)
+        total += elapsed
+        runs += 1
+    return best, runs
+
+
+def compile_times(dtypes: list[str], suites: list[str], repeat: int) -> dict:
+    # The first call of a jitted function compiles it for the argument types:
+    # time it on a tiny input before anything else runs
+    rng = np.random.default_rng(0)
+    res = {}
+    for dtype in dtypes:
+        img = make_image("noise", 4, DTYPES[dtype], rng)
+        markers = make_markers("point", 4, rng)
+        for name, fn in all_cases(img, markers, suites, repeat).items():
+            if name == "get_coordinates":
+                continue
+            t = time.perf_counter()
+            if isinstance(fn, Case):
+                fn = fn.setup()
+            fn()
+            res[f"{name}[{dtype}]"] = time.perf_counter() - t
+    return res
+
+
+def run(args) -> dict:
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "numba": numba.__version__,
+            "machine": platform.machine(),
+            "threads": numba.get_num_threads(),
+        },
+        "compile": compile_times(args.dtypes, args.suites, args.repeat),
+        "results": [],
+    }
+    for name, t in report["compile"].items():
+        print(f"compile {name:<48} {t:9.3f} s", file=sys.stderr)
+
+    too_slow = set()
+
+    def record(name, image, size, dtype, markers, fn):
+        key = (name, image, dtype, markers)
+        entry = {
+            "name": name,
+            "image": image,
+            "size": size,
+            "dtype": dtype,
+            "markers": markers,
+        }
+        if key in too_slow:
+            # a smaller size already went over the budget
+            entry["skipped"] = True
+        else:
+            extra, results = None, []
+            if isinstance(fn, Case):
+                extra, fn = fn.extra, fn.setup()
+            if extra is not None:
+                fn = keep_result(fn, results)
+            entry["time"], entry["runs"] = measure(fn, args.repeat, args.budget)
+            if extra is not None:
+                entry.update(extra(results.pop()))
+            if entry["time"] > args.budget:
+                too_slow.add(key)
+            details = ""
+            if "error" in entry:
+                details += f" error {entry['error']['relative']:.4f}"
+            if "sweeps" in entry:
+                details += f" sweeps {entry['sweeps']}"
+            print(
+                f"{name:<48} {image:<10} {size:>6} {dtype:<7} {markers or '-':<10}"
+                f" {entry['time']:9.4f} s{details}",
+                file=sys.stderr,
+            )
+        report["results"].append(entry)
+
+    for size in sorted(args.sizes):
+        for dtype in args.dtypes:
+            for image in args.images:
+                # inputs only depend on their own parameters, so that reports
+                # run with different options can be compared
+                rng = np.random.default_rng([args.seed, size, IMAGES.index(image)])
+                img = make_image(image, size, DTYPES[dtype], rng)
+                if "core" in args.suites:
+                    for name, fn in image_cases(img).items():
+                        record(name, image, size, dtype, None, fn)
+                for kind in args.markers:
+                    rng = np.random.default_rng([args.seed, size, MARKERS.index(kind)])
+                    markers = make_markers(kind, size, rng)
+                    cases = all_cases(img, markers, args.suites, args.repeat)
+                    for name, fn in cases.items():
+                        record(name, image, size, dtype, kind, fn)
+    return report
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list[str]:
+    def key(entry):
+        return (
+            entry["name"],
+            entry["image"],
+            entry["size"],
+            entry["dtype"],
+            entry["markers"],
+        )
+
+    old = {key(e): e for e in baseline["results"] if "time" in e}
+    regressions = []
+    for entry in report["results"]:
+        ref = old.get(key(entry))
+        if ref is None or "time" not in entry:
+            continue
+        ratio = entry["time"] / ref["time"]
+        # sub-millisecond differences are timing noise
+        if ratio > 1 + threshold and entry["time"] - ref["time"] > 1e-3:
+            name, image, size, dtype, markers = key(entry)
+            regressions.append(
+                f"{name} {image} {size} {dtype} {markers or '-'}:"
+                f" {ref['time']:.4f} s -> {entry['time']:.4f} s (x{ratio:.2f})"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the dt package")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256, 1024, 4096, 8192])
+    parser.add_argument("--dtypes", nargs="+", choices=DTYPES, default=list(DTYPES))
+    parser.add_argument("--images", nargs="+", choices=IMAGES, default=list(IMAGES))
+    parser.add_argument("--markers", nargs="+", choices=MARKERS, default=list(MARKERS))
+    parser.add_argument(
+        "--suites", nargs="+", choices=("core", *SUITES), default=["core", *SUITES]
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=30.0,
+        help="time (s) after which a case is not repeated nor run on larger sizes",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="JSON report (default: stdout)")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="relative slowdown reported as a regression",
+    )
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,92 @@
 from .immersion import immersion
+from .instrument import Recorder, record, stage
 from .pqueue import PQueue
 from .border import add_border, add_median_border
 from .utils import (
     C4,
     C8,
+    C6,
     in_domain,
     clamp,
     is_2_face,
     get_coordinates,
+    get_immersed_coordinates,
     get_marker_image,
 )
-from .level_lines_distance_transform import level_lines_distance_transform
-from .geodesic_distance_transform import geodesic_distance_transform
+from .cache import PrecomputationCache
+from .tree_of_shapes import TreeOfShapes
+from .level_lines_distance_transform import (
+    level_lines_distance_transform,
+    level_lines_distance_transform_update,
+    implicit_level_lines_distance_transform,
+    implicit_level_lines_distance_transform_update,
+    multi_label_level_lines_distance_transform,
+)
+from .geodesic_distance_transform import (
+    geodesic_distance_transform,
+    geodesic_distance_transform_update,
+    multi_label_geodesic_distance_transform,
+)
+from .volume import (
+    level_lines_distance_transform_3d,
+    implicit_level_lines_distance_transform_3d,
+    geodesic_distance_transform_3d,
+)
+from .batch import (
+    batch_level_lines_distance_transform,
+    batch_geodesic_distance_transform,
+)
+from .multivariate import multivariate_level_lines_distance_transform
+from .stream import StreamingSession
+from .multiresolution import (
+    multiresolution_level_lines_distance_transform,
+    multiresolution_geodesic_distance_transform,
+    approximation_error,
+)
+from .tiled import (
+    tiled_immersion,
+    tiled_level_lines_distance_transform,
+    tiled_geodesic_distance_transform,
+)
 
 __all__ = [
     "immersion",
+    "Recorder",
+    "record",
+    "stage",
     "PQueue",
     "add_border",
     "add_median_border",
     "C4",
     "C8",
+    "C6",
     "in_domain",
     "clamp",
     "is_2_face",
     "level_lines_distance_transform",
+    "level_lines_distance_transform_update",
+    "implicit_level_lines_distance_transform",
+    "implicit_level_lines_distance_transform_update",
+    "multi_label_level_lines_distance_transform",
     "get_coordinates",
+    "get_immersed_coordinates",
     "get_marker_image",
+    "PrecomputationCache",
+    "TreeOfShapes",
     "geodesic_distance_transform",
+    "geodesic_distance_transform_update",
+    "multi_label_geodesic_distance_transform",
+    "level_lines_distance_transform_3d",
+    "implicit_level_lines_distance_transform_3d",
+    "geodesic_distance_transform_3d",
+    "batch_level_lines_distance_transform",
+    "batch_geodesic_distance_transform",
+    "multivariate_level_lines_distance_transform",
+    "StreamingSession",
+    "multiresolution_level_lines_distance_transform",
+    "multiresolution_geodesic_distance_transform",
+    "approximation_error",
+    "tiled_immersion",
+    "tiled_level_lines_distance_transform",
+    "tiled_geodesic_distance_transform",
 ]
@@ -0,0 +1,317 @@
+import functools
+
+import numpy as np
+from numba import njit, prange
+
+from .level_lines_distance_transform import (
+    _as_seeds,
+    _stack_seeds,
+    _buffers,
+    _levels,
+    _propagate_front,
+    _flat,
+    _NO_CANCEL,
+    _PUSHES,
+    _MAX_BUCKET,
+    _LEVELS,
+    _NSTATS,
+)
+from .geodesic_distance_transform import (
+    _NO_ROI,
+    _scan,
+    _dial_from,
+    _neighbourhood,
+    _metric,
+    _nlevels,
+    _distances,
+)
+from .instrument import active, stage
+
+# Transforms of stacks (N, h, w) of images of the same size, such as
+# thumbnails or video frames. The images are spread over the cores by a single
+# compiled loop (prange over the images, without the GIL), which saves the
+# Python overhead and the allocations of one call per image. Each image gives
+# the same result as its own call.
+
+
+@njit(nogil=True, parallel=True, cache=True)
+def _batch_flood(
+    imgs: np.ndarray,
+    seeds: np.ndarray,
+    offsets: np.ndarray,
+    F: np.ndarray,
+    D: np.ndarray,
+    no_labels: np.ndarray,
+    max_distance: int,
+    nlevels: int,
+    fits: np.ndarray,
+    stats: np.ndarray,
+    cancel: np.ndarray,
+):
+    # Implicit flood of each image from its seeds, seeds[offsets[i]:
+    # offsets[i + 1]] (stacked (0, l, c) rows), into F[i] and D[i] (F and D
+    # being flattened as (N, n)), until cancel[0] is set if not empty. If
+    # stats is not empty, stats[i] gets the queue statistics of image i.
+    n, h, w = imgs.shape
+    gh, gw = 2 * h - 1, 2 * w - 1
+    bounds = np.array([0, 0, gh, gw], dtype=np.int64)
+    no_roi = np.empty(0, dtype=np.bool_)
+    no_dists = np.empty(0, dtype=np.int64)
+    no_stats = np.empty(0, dtype=np.int64)
+    for i in prange(n):
+        seen = np.zeros((gh * gw + 7) // 8, dtype=np.uint8)
+        # The buckets are only counted for one image at a time per thread
+        counts = np.zeros(_NSTATS + nlevels, np.int64) if stats.size > 0 else no_stats
+        fits[i] = _propagate_front(
+            imgs[i],
+            imgs[i],
+            True,
+            seeds[offsets[i] : offsets[i + 1]],
+            no_dists,
+            F[i : i + 1],
+            D[i : i + 1],
+            no_labels,
+            no_labels,
+            no_roi,
+            bounds,
+            max_distance,
+            False,
+            seen,
+            nlevels,
+            counts,
+            cancel,
+        )
+        if stats.size > 0:
+            stats[i] = counts[:_NSTATS]
+
+
+def _flood_stack(
+    imgs: np.ndarray,
+    seeds: np.ndarray,
+    offsets: np.ndarray,
+    F: np.ndarray,
+    D: np.ndarray,
+    max_distance: int,
+    nlevels: int,
+    cancel: np.ndarray,
+    **info,
+) -> np.ndarray:
+    # _batch_flood as an "lldt" stage (with info), recording the queue
+    # statistics summed over the images. Returns whether the distances of
+    # each image fit in D.
+    n = imgs.shape[0]
+    fits = np.ones(n, dtype=np.bool_)
+    # The queues are only counted when recording
+    shape = (0, 0) if active() is None else (n, _NSTATS)
+    stats = np.zeros(shape, dtype=np.int64)
+    with stage("lldt", **info) as entry:
+        _batch_flood(
+            imgs,
+            seeds,
+            offsets,
+            F,
+            D,
+            np.empty(0, dtype=np.uint8),
+            max_distance,
+            nlevels,
+            fits,
+            stats,
+            cancel,
+        )
+        if entry is not None:
+            entry["pushes"] = int(stats[:, _PUSHES].sum())
+            entry["max_bucket"] = int(stats[:, _MAX_BUCKET].max(initial=0))
+            entry["levels"] = int(stats[:, _LEVELS].max(initial=0))
+    return fits
+
+
+def batch_level_lines_distance_transform(
+    imgs: np.ndarray,
+    seeds: list[np.ndarray],
+    pixels_only: bool = False,
+    out: np.ndarray | None = None,
+    dist_out: np.ndarray | None = None,
+    dtype=np.uint32,
+    return_levels: bool = True,
+    max_distance: int | None = None,
+) -> tuple[np.ndarray | None, np.ndarray]:
+    # implicit_level_lines_distance_transform(imgs[i], seeds[i], pixels_only)
+    # of each image, stacked as (N, ...) F and D, with the same buffer options
+    if imgs.ndim != 3:
+        raise ValueError(f"Expected a stack of images (N, h, w), not {imgs.shape}")
+    n, h, w = imgs.shape
+    if len(seeds) != n:
+        raise ValueError(f"{len(seeds)} seed sets for {n} images")
+    grid = (2 * h - 1, 2 * w - 1)
+    shape = (n,) + ((h, w) if pixels_only else grid)
+
+    seed_sets = [_as_seeds(s, grid) for s in seeds]
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(s) for s in seed_sets])
+    stacked = np.concatenate(
+        [np.empty((0, 3), dtype=np.int64)] + [_stack_seeds([s]) for s in seed_sets]
+    )
+
+    F, D = _buffers(shape, dtype, out, dist_out, imgs.dtype, return_levels)
+    max_distance = np.iinfo(np.int64).max if max_distance is None else int(max_distance)
+    fits = _flood_stack(
+        imgs,
+        stacked,
+        offsets,
+        _flat(F),
+        _flat(D),
+        max_distance,
+        _levels(imgs, imgs),
+        _NO_CANCEL,
+        images=n,
+    )
+    if not fits.all():
+        raise OverflowError(f"Distances do not fit in {D.dtype}")
+
+    return (F if return_levels else None), D
+
+
+@functools.cache
+def _batch_sweep(connectivity: int, spatial: bool):
+    # Batch sweeps over the edges of the connectivity, with or without spatial
+    # term. As in _kernels, the neighbourhood is a constant of the compiled
+    # loop (a parallel loop cannot take it as an argument either).
+    half, lengths, _ = _neighbourhood(connectivity)
+
+    @njit(nogil=True, parallel=True, cache=True)
+    def batch_sweep(
+        imgs: np.ndarray,
+        dist: np.ndarray,
+        no_labels: np.ndarray,
+        no_roi: np.ndarray,
+        max_sweeps: int,
+        tol: float,
+        max_distance: float,
+        metric: int,
+        gamma: float,
+    ):
+        # Raster sweeps of each image until it converges, or at most
+        # max_sweeps of them (when not negative)
+        for i in prange(imgs.shape[0]):
+            d = dist[i : i + 1]
+            k = 0
+            changed = True
+            while changed and (max_sweeps < 0 or k < max_sweeps):
+                d1 = _scan(
+                    imgs[i],
+                    d,
+                    no_labels,
+                    no_roi,
+                    max_distance,
+                    True,
+                    metric,
+                    gamma,
+                    half,
+                    lengths,
+                    spatial,
+                )
+                d2 = _scan(
+                    imgs[i],
+                    d,
+                    no_labels,
+                    no_roi,
+                    max_distance,
+                    False,
+                    metric,
+                    gamma,
+                    half,
+                    lengths,
+                    spatial,
+                )
+                changed = max(d1, d2) > tol
+                k += 1
+
+    return batch_sweep
+
+
+@njit(nogil=True, parallel=True, cache=True)
+def _batch_dial(
+    imgs: np.ndarray,
+    dist: np.ndarray,
+    no_labels: np.ndarray,
+    no_roi: np.ndarray,
+    nlevels: int,
+    max_distance: float,
+    metric: int,
+    neighbours: np.ndarray,
+):
+    # Dial's algorithm on each image, over the (n, 2) offsets of neighbours
+    for i in prange(imgs.shape[0]):
+        seeds = np.flatnonzero(dist[i] == 0)
+        _dial_from(
+            imgs[i],
+            dist[i : i + 1],
+            no_labels,
+            seeds,
+            nlevels,
+            no_roi,
+            max_distance,
+            metric,
+            None,
+            neighbours,
+        )
+
+
+def batch_geodesic_distance_transform(
+    imgs: np.ndarray,
+    masks: np.ndarray,
+    method: str = "sweep",
+    max_sweeps: int | None = None,
+    tol: float = 0.0,
+    out: np.ndarray | None = None,
+    max_distance: float | None = None,
+    metric: str = "l1",
+    connectivity: int = 8,
+    gamma: float | None = None,
+) -> np.ndarray:
+    # geodesic_distance_transform(imgs[i], masks[i], method, ...) of each
+    # image, stacked as (N, h, w) distances (float32, or written to out).
+    # The images have no channels, so the metric does not change the costs.
+    if imgs.ndim != 3:
+        raise ValueError(f"Expected a stack of images (N, h, w), not {imgs.shape}")
+    if masks.shape != imgs.shape:
+        raise ValueError(f"masks of shape {masks.shape} for images of {imgs.shape}")
+    # the metric of an image, not of an (h, w, C) image
+    metric = _metric(imgs.reshape(-1, imgs.shape[-1]), metric)
+    if gamma is not None and gamma < 0:
+        raise ValueError(f"gamma must be positive, not {gamma}")
+
+    res = _distances(imgs.shape, out)
+    res[masks.astype(np.bool_, copy=False)] = 0
+    max_distance = np.inf if max_distance is None else float(max_distance)
+    no_labels = np.empty((0, 0), dtype=np.uint8)
+
+    if method == "sweep":
+        max_sweeps = -1 if max_sweeps is None else int(max_sweeps)
+        _batch_sweep(connectivity, gamma is not None)(
+            imgs,
+            res,
+            no_labels,
+            _NO_ROI,
+            max_sweeps,
+            tol,
+            max_distance,
+            metric,
+            1.0 if gamma is None else float(gamma),
+        )
+    elif method == "dial":
+        if not np.issubdtype(imgs.dtype, np.integer):
+            raise ValueError("The dial method requires an integer image")
+        if gamma is not None:
+            raise ValueError("The dial method requires integer costs (no gamma)")
+        # the levels of the queue of an image, not of an (h, w, C) image
+        nlevels = _nlevels(imgs.reshape(-1, imgs.shape[-1]))
+        # An array, the parallel loop cannot take the tuple
+        neighbours = np.array(_neighbourhood(connectivity)[2])
+        _batch_dial(
+            imgs, res, no_labels, _NO_ROI, nlevels, max_distance, metric, neighbours
+        )
+    else:
+        raise ValueError(f"Unknown method: {method}")
+
+    return res
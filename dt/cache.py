@@ -0,0 +1,74 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .immersion import immersion
+
+
+class PrecomputationCache:
+    """Per-image structures (immersion, ...) with LRU eviction.
+
+    Entries are keyed by a hash of the image content, so a new array holding
+    the same image hits the cache. When the arrays held by the cache exceed
+    `max_bytes`, the least recently used images are evicted.
+    """
+
+    def __init__(self, max_bytes: int = 512 * 2**20):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(img: np.ndarray) -> tuple:
+        digest = hashlib.blake2b(np.ascontiguousarray(img).data, digest_size=16)
+        return (img.shape, img.dtype.str, digest.hexdigest())
+
+    def get(self, img: np.ndarray, name: str, fn):
+        # Return the structure `name` of img, computing it with fn(img) if
+        # it is not cached yet
+        key = self.key(img)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and name in entry:
+                self._entries.move_to_end(key)
+                return entry[name]
+
+        value = fn(img)
+
+        with self._lock:
+            entry = self._entries.setdefault(key, {})
+            if name not in entry:
+                entry[name] = value
+                self._nbytes += _nbytes(value)
+            self._entries.move_to_end(key)
+            self._evict()
+            return entry[name]
+
+    def immersion(self, img: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        return self.get(img, "immersion", immersion)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def _evict(self):
+        # Keep at least the most recent image, even if it is over budget
+        while self._nbytes > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            self._nbytes -= sum(_nbytes(v) for v in entry.values())
+
+
+def _nbytes(value) -> int:
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    return 0
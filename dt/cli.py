@@ -0,0 +1,343 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+
+from .immersion import immersion
+from .instrument import record, stage
+from .utils import get_immersed_coordinates
+from .level_lines_distance_transform import (
+    implicit_level_lines_distance_transform,
+    multi_label_level_lines_distance_transform,
+)
+from .geodesic_distance_transform import (
+    _METRICS,
+    multi_label_geodesic_distance_transform,
+)
+from .multivariate import multivariate_level_lines_distance_transform
+
+# Batch computation of the distance transforms over image files, without any
+# GUI dependency (PIL is only imported to read PNG files).
+
+IMAGE_SUFFIXES = (".png",)
+MARKER_SUFFIXES = (".npy", ".png")
+TRANSFORMS = ("lldt", "gdt")
+
+# Colors of the markers painted in the GUI
+_FOREGROUND = (0, 0, 255)
+_BACKGROUND = (255, 0, 0)
+
+
+def load_image(path: Path, color: bool = False) -> np.ndarray:
+    from PIL import Image
+
+    with Image.open(path) as im:
+        if im.mode.startswith("I;16"):
+            return np.asarray(im).astype(np.uint16)
+        # Color images are converted to grayscale unless they are kept as
+        # (h, w, 3) RGB arrays
+        if color and im.mode not in ("L", "1"):
+            return np.asarray(im.convert("RGB"))
+        return np.asarray(im.convert("L"))
+
+
+def load_markers(path: Path) -> np.ndarray:
+    # Label image: 0 for unlabeled pixels, k > 0 for the markers of label k.
+    # Color PNGs are read as painted in the GUI: blue for the foreground
+    # (label 1) and red for the background (label 2).
+    if path.suffix == ".npy":
+        markers = np.load(path)
+        if not np.issubdtype(markers.dtype, np.integer) and markers.dtype != bool:
+            raise ValueError(f"{path}: markers must be an integer label image")
+        return markers.astype(np.min_scalar_type(max(int(markers.max()), 0)))
+
+    from PIL import Image
+
+    with Image.open(path) as im:
+        if im.mode in ("L", "P", "1", "I;16"):
+            return np.asarray(im).astype(np.uint16 if im.mode == "I;16" else np.uint8)
+        rgb = np.asarray(im.convert("RGB"))
+    markers = np.zeros(rgb.shape[:2], dtype=np.uint8)
+    markers[np.all(rgb == _FOREGROUND, axis=2)] = 1
+    markers[np.all(rgb == _BACKGROUND, axis=2)] = 2
+    return markers
+
+
+def compute(
+    img: np.ndarray,
+    markers: np.ndarray,
+    transforms: tuple[str, ...] = TRANSFORMS,
+    nlabels: int | None = None,
+    immersed: bool = False,
+    gdt_method: str = "sweep",
+    metric: str = "l1",
+) -> dict[str, np.ndarray]:
+    # One (nlabels, ...) distance map per transform, layer k being the
+    # distance to the markers of label k + 1. The LLDT is given at the pixel
+    # positions (the 2-faces) unless `immersed` is set. Images with channels
+    # (h, w, C) combine the channels with the metric.
+    if markers.shape != img.shape[:2]:
+        raise ValueError(
+            f"markers of shape {markers.shape} for an image of shape {img.shape}"
+        )
+    if nlabels is None:
+        nlabels = int(markers.max())
+
+    res = {}
+    if "lldt" in transforms:
+        seeds = [get_immersed_coordinates(markers == k) for k in range(1, nlabels + 1)]
+        if img.ndim == 3:
+            res["lldt"] = np.stack(
+                [
+                    multivariate_level_lines_distance_transform(
+                        img,
+                        seeds[k],
+                        pixels_only=not immersed,
+                        metric=metric,
+                        return_levels=False,
+                    )[1]
+                    for k in range(nlabels)
+                ]
+            )
+        elif immersed:
+            m, M = immersion(img)
+            res["lldt"] = multi_label_level_lines_distance_transform(
+                m, M, seeds, per_label=True
+            )
+        else:
+            # Only the distances at the pixels are kept, so the immersion is
+            # not built
+            D = np.empty((nlabels,) + img.shape, dtype=np.uint32)
+            for k in range(nlabels):
+                implicit_level_lines_distance_transform(
+                    img, seeds[k], pixels_only=True, dist_out=D[k], return_levels=False
+                )
+            res["lldt"] = D
+    if "gdt" in transforms:
+        res["gdt"] = multi_label_geodesic_distance_transform(
+            img,
+            markers,
+            per_label=True,
+            nlabels=nlabels,
+            method=gdt_method,
+            metric=metric,
+        )
+    return res
+
+
+def output_paths(out_dir: Path, stem: str, transforms, fmt: str) -> list[Path]:
+    if fmt == "npz":
+        return [out_dir / f"{stem}.npz"]
+    return [out_dir / f"{stem}_{name}.npy" for name in transforms]
+
+
+def process(
+    image_path: Path,
+    marker_path: Path,
+    out_dir: Path,
+    transforms: tuple[str, ...],
+    fmt: str,
+    nlabels: int | None,
+    immersed: bool,
+    gdt_method: str,
+    color: bool = False,
+    metric: str = "l1",
+    profile: bool = False,
+) -> tuple[float, list[dict] | None]:
+    # Runs in a worker process, returns the computation time and, if
+    # `profile` is set, the stages recorded by dt.instrument
+    t = time.perf_counter()
+    with record() if profile else contextlib.nullcontext() as recorder:
+        with stage("load"):
+            img = load_image(image_path, color)
+            markers = load_markers(marker_path)
+        with stage("compute"):
+            res = compute(
+                img, markers, transforms, nlabels, immersed, gdt_method, metric
+            )
+
+        stem = image_path.stem
+        with stage("save"):
+            if fmt == "npz":
+                np.savez(output_paths(out_dir, stem, transforms, fmt)[0], **res)
+            else:
+                paths = output_paths(out_dir, stem, transforms, fmt)
+                for name, path in zip(transforms, paths):
+                    np.save(path, res[name])
+    return time.perf_counter() - t, (recorder.stages if profile else None)
+
+
+def find_images(inputs: list[Path]) -> list[Path]:
+    images = []
+    for path in inputs:
+        if path.is_dir():
+            images.extend(
+                sorted(p for p in path.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+            )
+        else:
+            images.append(path)
+    return images
+
+
+def find_markers(image: Path, marker_dir: Path, suffix: str) -> Path | None:
+    # The markers of foo.png are foo<suffix>.npy or foo<suffix>.png
+    for ext in MARKER_SUFFIXES:
+        path = marker_dir / f"{image.stem}{suffix}{ext}"
+        if path.exists() and path != image:
+            return path
+    return None
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m dt",
+        description="Compute the level lines and geodesic distance transforms of "
+        "images from their markers",
+    )
+    parser.add_argument(
+        "inputs", type=Path, nargs="+", help="PNG images or directories of images"
+    )
+    parser.add_argument(
+        "-m",
+        "--markers",
+        type=Path,
+        help="directory of the markers (default: next to each image)",
+    )
+    parser.add_argument(
+        "--marker-suffix",
+        default="_markers",
+        help="the markers of foo.png are foo<suffix>.npy or foo<suffix>.png "
+        "(default: %(default)s)",
+    )
+    parser.add_argument("-o", "--output", type=Path, required=True)
+    parser.add_argument(
+        "-t",
+        "--transforms",
+        nargs="+",
+        choices=TRANSFORMS,
+        default=list(TRANSFORMS),
+    )
+    parser.add_argument("--format", choices=("npz", "npy"), default="npz")
+    parser.add_argument(
+        "--nlabels",
+        type=int,
+        default=None,
+        help="number of labels (default: largest label of each marker image)",
+    )
+    parser.add_argument(
+        "--immersed",
+        action="store_true",
+        help="keep the LLDT over the whole Khalimsky grid instead of the pixels",
+    )
+    parser.add_argument("--gdt-method", choices=("sweep", "dial"), default="sweep")
+    parser.add_argument(
+        "--color",
+        action="store_true",
+        help="compute color images on their RGB channels instead of converting "
+        "them to grayscale",
+    )
+    parser.add_argument(
+        "--metric",
+        choices=tuple(_METRICS),
+        default="l1",
+        help="norm combining the channels of color images (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="number of worker processes (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--skip-existing",
+        action="store_true",
+        help="do not compute images whose outputs already exist",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        metavar="JSON",
+        help="write the time, peak memory and statistics of the stages of each "
+        "image (sweeps of the GDT, queue of the LLDT) to this JSON file",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    transforms = tuple(t for t in TRANSFORMS if t in args.transforms)
+    args.output.mkdir(parents=True, exist_ok=True)
+
+    jobs = []
+    errors = 0
+    for image in find_images(args.inputs):
+        if image.stem.endswith(args.marker_suffix) and args.markers is None:
+            # marker files stored next to the images
+            continue
+        markers = find_markers(image, args.markers or image.parent, args.marker_suffix)
+        if markers is None:
+            print(f"{image}: no markers found", file=sys.stderr)
+            errors += 1
+            continue
+        outputs = output_paths(args.output, image.stem, transforms, args.format)
+        if args.skip_existing and all(p.exists() for p in outputs):
+            continue
+        jobs.append((image, markers))
+
+    done = 0
+    profiles = {}
+    t = time.perf_counter()
+    # Spawned workers: a forked one inherits the numba thread pool of a
+    # caller that already ran a parallel transform, and hangs on it
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=max(args.workers, 1), mp_context=context
+    ) as pool:
+        futures = {
+            pool.submit(
+                process,
+                image,
+                markers,
+                args.output,
+                transforms,
+                args.format,
+                args.nlabels,
+                args.immersed,
+                args.gdt_method,
+                args.color,
+                args.metric,
+                args.profile is not None,
+            ): image
+            for image, markers in jobs
+        }
+        for future in as_completed(futures):
+            image = futures[future]
+            try:
+                elapsed, stages = future.result()
+            except Exception as e:
+                print(f"{image}: {e}", file=sys.stderr)
+                errors += 1
+            else:
+                done += 1
+                print(f"{image}: {elapsed:.3f} s", file=sys.stderr)
+                if stages is not None:
+                    profiles[str(image)] = stages
+
+    if args.profile is not None:
+        # In the order of the inputs, not of completion
+        profiles = {str(i): profiles[str(i)] for i, _ in jobs if str(i) in profiles}
+        args.profile.write_text(json.dumps(profiles, indent=2))
+
+    print(
+        f"{done} image(s) in {time.perf_counter() - t:.3f} s, {errors} error(s)",
+        file=sys.stderr,
+    )
+    return 1 if errors else 0
@@ -1,22 +1,181 @@
+import functools
+
 import numpy as np
-from numba import njit
+from numba import njit, prange
+from numba.extending import overload
+
+from .pqueue import (
+    hqueue,
+    hqueue_push,
+    hqueue_pop,
+    hqueue_remove,
+    hqueue_empty,
+    hqueue_distance,
+    hqueue_skip_to,
+)
+from .utils import C4, C8, _as_roi
+from .instrument import stage
+from .level_lines_distance_transform import _CANCEL_EVERY
+
+
+# Tile size of the parallel passes
+_TILE = 64
+
+# No region of interest
+_NO_ROI = np.empty((0, 0), dtype=np.bool_)
+
+# Neighbourhoods of a pixel, by connectivity: causal half-mask of the forward
+# passes (the backward passes use the opposite offsets), and all the
+# neighbours in the order the dial method visits them. 16 is the 5x5 chamfer
+# mask, the 8 neighbours and the knight moves.
+_KNIGHT = ((-1, -2), (-2, -1), (-2, 1), (-1, 2))
+_NEIGHBOURS = {
+    4: (((0, -1), (-1, 0)), C4),
+    8: (((0, -1), (-1, -1), (-1, 0), (-1, 1)), C8),
+    16: (
+        ((0, -1), (-1, -1), (-1, 0), (-1, 1)) + _KNIGHT,
+        C8 + _KNIGHT + tuple((-dl, -dc) for dl, dc in _KNIGHT),
+    ),
+}
+
+# Norms of the difference of two pixels of a (h, w, C) image
+_METRICS = {"l1": 0, "l2": 1, "max": 2}
+
+
+def _cost(img, l, c, nl, nc, metric):
+    # Cost of the edge between the pixels (l, c) and (nl, nc): the absolute
+    # difference of their values, or for a (h, w, C) image the L1, L2 or max
+    # norm (metric 0, 1 or 2) of the difference of their channels
+    diff = np.abs(np.float64(img[l, c]) - np.float64(img[nl, nc]))
+    if img.ndim == 2 or metric == 0:
+        return float(np.sum(diff))
+    if metric == 1:
+        return float(np.sqrt(np.sum(diff * diff)))
+    return float(np.max(diff))
+
+
+@overload(_cost)
+def _cost_impl(img, l, c, nl, nc, metric):
+    # Compiled version of _cost, one per number of dimensions of img, in
+    # float64 like _cost (float() keeps float32 values in float32). It is
+    # left to LLVM to inline: numba's own inlining mixes up its variables
+    # with the ones of the loops of _dial.
+    if img.ndim == 2:
+
+        def cost(img, l, c, nl, nc, metric):
+            return abs(np.float64(img[l, c]) - np.float64(img[nl, nc]))
+
+        return cost
+
+    def cost(img, l, c, nl, nc, metric):
+        s = 0.0
+        for k in range(img.shape[2]):
+            d = abs(np.float64(img[l, c, k]) - np.float64(img[nl, nc, k]))
+            if metric == 0:
+                s += d
+            elif metric == 1:
+                s += d * d
+            elif d > s:
+                s = d
+        return np.sqrt(s) if metric == 1 else s
+
+    return cost
+
 
+@njit(inline="always")
+def _relax(
+    img: np.ndarray,
+    dist: np.ndarray,
+    labels: np.ndarray,
+    roi: np.ndarray,
+    max_distance: float,
+    l: int,
+    c: int,
+    forward: bool,
+    metric: int,
+    gamma: float,
+    half: tuple,
+    lengths: tuple,
+    spatial: bool,
+) -> float:
+    # dist is stacked as (K, h, w) and each layer is updated independently.
+    # If labels is not empty, it follows the updates of the (single) layer.
+    # Pixels out of roi (when not empty) and distances over max_distance
+    # are left unreached. img is (h, w), or (h, w, C) with the channel
+    # metric.
+    # half is the causal half-mask of the connectivity and lengths the lengths
+    # of its edges, with the spatial term when spatial.
+    # Returns the largest decrease of a distance (0 if nothing changed).
+    delta = 0.0
+    if roi.size > 0 and not roi[l, c]:
+        return delta
+    for i in range(len(half)):
+        if forward:
+            nl = l + half[i][0]
+            nc = c + half[i][1]
+        else:
+            nl = l - half[i][0]
+            nc = c - half[i][1]
+        if (
+            nl >= 0
+            and nc >= 0
+            and nl < img.shape[0]
+            and nc < img.shape[1]
+            and (roi.size == 0 or roi[nl, nc])
+        ):
+            cost = _cost(img, l, c, nl, nc, metric)
+            if spatial:
+                cost = np.sqrt(lengths[i] * lengths[i] + gamma * cost * cost)
+            for k in range(dist.shape[0]):
+                d_new = dist[k, nl, nc] + cost
+                if d_new < dist[k, l, c] and d_new <= max_distance:
+                    # Rounded to the precision of dist, d_new may not be
+                    # smaller (non integer costs), which must not count
+                    # as a change or the sweeps would never stop
+                    old = dist[k, l, c]
+                    dist[k, l, c] = d_new
+                    delta = max(delta, old - dist[k, l, c])
+                    if labels.size > 0:
+                        labels[l, c] = labels[nl, nc]
+    return delta
 
-@njit
-def _iter(img: np.ndarray, dist: np.ndarray, forward: bool) -> bool:
-    changed = False
+
+def _neighbourhood(connectivity: int) -> tuple:
+    # (half, lengths, neighbours) of the connectivity: the causal half-mask of
+    # the forward passes, the Euclidean lengths of its edges, and all the
+    # neighbours in the order the dial method visits them
+    if connectivity not in _NEIGHBOURS:
+        raise ValueError(f"Connectivity must be 4, 8 or 16, not {connectivity}")
+    half, neighbours = _NEIGHBOURS[connectivity]
+    lengths = tuple(float(np.hypot(dl, dc)) for dl, dc in half)
+    return half, lengths, neighbours
+
+
+@njit(inline="always")
+def _scan(
+    img: np.ndarray,
+    dist: np.ndarray,
+    labels: np.ndarray,
+    roi: np.ndarray,
+    max_distance: float,
+    forward: bool,
+    metric: int,
+    gamma: float,
+    half: tuple,
+    lengths: tuple,
+    spatial: bool,
+) -> float:
+    # Forward or backward raster pass of _relax over the pixels of img.
+    # Returns the largest decrease of a distance.
+    delta = 0.0
 
     if forward:
-        DL = [0, -1, -1, -1]
-        DC = [-1, -1, 0, 1]
         start_l = 0
         start_c = 0
         end_l = img.shape[0]
         end_c = img.shape[1]
         inc = 1
     else:
-        DL = [0, 1, 1, 1]
-        DC = [1, 1, 0, -1]
         start_l = img.shape[0] - 1
         start_c = img.shape[1] - 1
         end_l = -1
@@ -25,25 +184,552 @@ def _iter(img: np.ndarray, dist: np.ndarray, forward: bool) -> bool:
 
     for l in range(start_l, end_l, inc):
         for c in range(start_c, end_c, inc):
-            for dl, dc in zip(DL, DC):
-                nl = l + dl
-                nc = c + dc
-                if nl >= 0 and nc >= 0 and nl < img.shape[0] and nc < img.shape[1]:
-                    d_new = dist[nl, nc] + abs(float(img[l, c]) - float(img[nl, nc]))
-                    if d_new < dist[l, c]:
-                        dist[l, c] = d_new
-                        changed = True
-    return changed
-
-
-def geodesic_distance_transform(img: np.ndarray, mask: np.ndarray) -> np.ndarray:
-    res = np.full(img.shape, dtype=np.float32, fill_value=1e10)
-    res[mask] = 0
+            delta = max(
+                delta,
+                _relax(
+                    img,
+                    dist,
+                    labels,
+                    roi,
+                    max_distance,
+                    l,
+                    c,
+                    forward,
+                    metric,
+                    gamma,
+                    half,
+                    lengths,
+                    spatial,
+                ),
+            )
+    return delta
+
+
+@njit(inline="always")
+def _distance_at(dist: np.ndarray, p: int) -> int:
+    # Distance of the linear index p of dist, as an integer
+    hw = dist.shape[1] * dist.shape[2]
+    k = p // hw
+    l = (p - k * hw) // dist.shape[2]
+    return np.int64(dist[k, l, p - k * hw - l * dist.shape[2]])
+
+
+@njit(nogil=True, cache=True)
+def _dial_from(
+    img: np.ndarray,
+    dist: np.ndarray,
+    labels: np.ndarray,
+    seeds: np.ndarray,
+    nlevels: int,
+    roi: np.ndarray,
+    max_distance: float,
+    metric: int,
+    cancel,
+    neighbours: tuple,
+):
+    # Exact transform on the same graph as the sweeps, with a bucket queue
+    # over the integer edge costs (Dial's algorithm). The propagation
+    # starts from the seeds (linear indices in dist, sorted by distance),
+    # each one entering the queue once the front reaches its current
+    # distance, and only goes where it decreases the current distances.
+    # With seeds at 0, it can update a transform after some seeds were
+    # added; with seeds at their distance, it can complete a transform
+    # from the pixels around a region reset to 1e10. It stays in roi (when
+    # not empty) and stops at max_distance, or soon after cancel[0] is set
+    # (when not None). The costs of a (h, w, C) image must be integers (L1
+    # or max metric), without spatial term. The neighbours are a tuple of
+    # offsets or an (n, 2) array.
+    UNSEEN, QUEUED, DONE = 0, 1, 2
+    K = dist.shape[0]
+    h, w = img.shape[0], img.shape[1]
+    hw = h * w
+    q = hqueue(nlevels, K * hw, True)
+    status = np.zeros(K * hw, dtype=np.uint8)
+
+    i = 0
+    pops = 0
+    while i < seeds.size or not hqueue_empty(q):
+        if hqueue_empty(q):
+            d = _distance_at(dist, seeds[i])
+            hqueue_skip_to(q, max(hqueue_distance(q), d))
+        # Seeds within reach of the circular queue
+        while i < seeds.size:
+            p = seeds[i]
+            d = _distance_at(dist, p)
+            if d >= hqueue_distance(q) + nlevels:
+                break
+            if status[p] == UNSEEN:
+                status[p] = QUEUED
+                hqueue_push(q, p, d - hqueue_distance(q))
+            i += 1
+        if hqueue_empty(q):
+            continue
+
+        p = hqueue_pop(q)
+        d = hqueue_distance(q)
+        if d > max_distance:
+            break
+        pops += 1
+        if cancel is not None and pops & (_CANCEL_EVERY - 1) == 0 and cancel[0]:
+            break
+        status[p] = DONE
+        k = p // hw
+        l = (p - k * hw) // w
+        c = p - k * hw - l * w
+        for j in range(len(neighbours)):
+            nl, nc = l + neighbours[j][0], c + neighbours[j][1]
+            if nl < 0 or nc < 0 or nl >= h or nc >= w:
+                continue
+            n = k * hw + nl * w + nc
+            if status[n] == DONE or (roi.size > 0 and not roi[nl, nc]):
+                continue
+            cost = np.int64(_cost(img, l, c, nl, nc, metric))
+            if d + cost < dist[k, nl, nc] and d + cost <= max_distance:
+                if status[n] == QUEUED:
+                    hqueue_remove(q, n)
+                dist[k, nl, nc] = d + cost
+                if labels.size > 0:
+                    labels[nl, nc] = labels[l, c]
+                status[n] = QUEUED
+                hqueue_push(q, n, cost)
+
+
+@functools.cache
+def _kernels(connectivity: int, spatial: bool) -> tuple:
+    # (_iter, _iter_parallel, _dial) over the edges of the connectivity: the
+    # neighbourhood is a constant of the compiled loops, so each connectivity
+    # gets its own kernels. Without spatial term, the cost of an edge is the
+    # difference of its pixels. With it, the cost is the GeoS one,
+    # sqrt(length^2 + gamma * difference^2), which adds the Euclidean length
+    # of the edge, as in the 3x3 (4 or 8-connected) or 5x5 (16-connected)
+    # chamfer masks. The kernels only close over tuples, which numba can
+    # hash to cache them on disk (not over _relax, a dispatcher).
+    half, lengths, neighbours = _neighbourhood(connectivity)
+
+    @njit(nogil=True, cache=True)
+    def iter_(
+        img: np.ndarray,
+        dist: np.ndarray,
+        labels: np.ndarray,
+        roi: np.ndarray,
+        max_distance: float,
+        forward: bool,
+        metric: int = 0,
+        gamma: float = 1.0,
+    ) -> float:
+        return _scan(
+            img,
+            dist,
+            labels,
+            roi,
+            max_distance,
+            forward,
+            metric,
+            gamma,
+            half,
+            lengths,
+            spatial,
+        )
+
+    @njit(nogil=True, parallel=True, cache=True)
+    def iter_parallel(
+        img: np.ndarray,
+        dist: np.ndarray,
+        labels: np.ndarray,
+        roi: np.ndarray,
+        max_distance: float,
+        forward: bool,
+        tile: int,
+        metric: int = 0,
+        gamma: float = 1.0,
+    ) -> float:
+        # Same pass as iter_, computed by tiles in parallel. Coordinates are
+        # taken in scan order (flipped for the backward pass). Tile (bl, bc)
+        # covers the rows [bl * tile, (bl + 1) * tile) and, on its r-th row,
+        # the columns [bc * tile - r, (bc + 1) * tile - r): this shear keeps
+        # the upper-right neighbour of its right border inside the tile, so a
+        # tile only depends on (bl, bc - 1) and (bl - 1, bc - 1 .. bc + 1).
+        # Tiles on the same front 2 * bl + bc are independent and every pixel
+        # sees exactly the values it sees in the serial pass, so the results
+        # are identical. This only holds for the neighbours of the 3x3 mask.
+        h, w = img.shape[0], img.shape[1]
+        nbl = (h + tile - 1) // tile
+        nbc = (w + 2 * tile - 2) // tile
+        deltas = np.zeros((nbl, nbc))
+
+        for t in range(2 * (nbl - 1) + nbc):
+            lo = max(0, (t - nbc + 2) // 2)
+            hi = min(nbl - 1, t // 2)
+            for bl in prange(lo, hi + 1):
+                bc = t - 2 * bl
+                delta = 0.0
+                for r in range(min(tile, h - bl * tile)):
+                    sl = bl * tile + r
+                    l = sl if forward else h - 1 - sl
+                    for sc in range(max(bc * tile - r, 0), min((bc + 1) * tile - r, w)):
+                        c = sc if forward else w - 1 - sc
+                        delta = max(
+                            delta,
+                            _relax(
+                                img,
+                                dist,
+                                labels,
+                                roi,
+                                max_distance,
+                                l,
+                                c,
+                                forward,
+                                metric,
+                                gamma,
+                                half,
+                                lengths,
+                                spatial,
+                            ),
+                        )
+                deltas[bl, bc] = delta
+        return deltas.max()
 
+    @njit(nogil=True, cache=True)
+    def dial(
+        img: np.ndarray,
+        dist: np.ndarray,
+        labels: np.ndarray,
+        seeds: np.ndarray,
+        nlevels: int,
+        roi: np.ndarray,
+        max_distance: float,
+        metric: int = 0,
+        cancel=None,
+    ):
+        _dial_from(
+            img,
+            dist,
+            labels,
+            seeds,
+            nlevels,
+            roi,
+            max_distance,
+            metric,
+            cancel,
+            neighbours,
+        )
+
+    return iter_, iter_parallel, dial
+
+
+# Kernels of the default 8-connected graph, with intensity costs only
+_iter, _iter_parallel, _dial = _kernels(8, False)
+
+
+def _sweep(
+    img: np.ndarray,
+    dist: np.ndarray,
+    labels: np.ndarray,
+    max_sweeps: int | None,
+    tol: float,
+    parallel: bool,
+    roi: np.ndarray = _NO_ROI,
+    max_distance: float = np.inf,
+    metric: int = 0,
+    connectivity: int = 8,
+    gamma: float | None = None,
+    cancel: np.ndarray | None = None,
+) -> int:
+    # Forward/backward passes until no distance decreases by more than tol,
+    # or at most max_sweeps of them, or until cancel[0] is set. The 5x5 mask
+    # is always swept serially. Returns the number of sweeps.
+    iter_, iter_parallel, _ = _kernels(connectivity, gamma is not None)
+    gamma = 1.0 if gamma is None else float(gamma)
+    parallel = parallel and connectivity != 16
+    n = 0
     changed = True
-    while changed:
-        c1 = _iter(img, res, True)
-        c2 = _iter(img, res, False)
-        changed = c1 or c2
+    while changed and (max_sweeps is None or n < max_sweeps):
+        deltas = []
+        for forward in (True, False):
+            if cancel is not None and cancel[0]:
+                return n
+            args = (img, dist, labels, roi, max_distance, forward)
+            if parallel:
+                deltas.append(iter_parallel(*args, _TILE, metric, gamma))
+            else:
+                deltas.append(iter_(*args, metric, gamma))
+        changed = max(deltas) > tol
+        n += 1
+    return n
+
+
+def _solve(
+    img: np.ndarray,
+    dist: np.ndarray,
+    labels: np.ndarray,
+    method: str,
+    max_sweeps: int | None,
+    tol: float,
+    parallel: bool,
+    roi=None,
+    max_distance: float | None = None,
+    metric: str = "l1",
+    connectivity: int = 8,
+    gamma: float | None = None,
+    cancel: np.ndarray | None = None,
+):
+    # The roi is a box (l0, c0, l1, c1) or a mask: only its bounding box is
+    # swept or flooded, and the pixels of the mask
+    metric = _metric(img, metric)
+    if img.dtype == np.bool_:
+        img = img.view(np.uint8)
+    if gamma is not None and gamma < 0:
+        raise ValueError(f"gamma must be positive, not {gamma}")
+    mask, (l0, c0, l1, c1) = _as_roi(roi, img.shape[:2])
+    if (l0, c0, l1, c1) != (0, 0) + img.shape[:2]:
+        img = img[l0:l1, c0:c1]
+        dist = dist[:, l0:l1, c0:c1]
+        if labels.size > 0:
+            labels = labels[l0:l1, c0:c1]
+        if mask.size > 0:
+            mask = mask[l0:l1, c0:c1]
+    max_distance = np.inf if max_distance is None else float(max_distance)
+    if img.size == 0:
+        return
+
+    if method == "sweep":
+        with stage("gdt", method=method, layers=dist.shape[0]) as entry:
+            n = _sweep(
+                img,
+                dist,
+                labels,
+                max_sweeps,
+                tol,
+                parallel,
+                mask,
+                max_distance,
+                metric,
+                connectivity,
+                gamma,
+                cancel,
+            )
+            if entry is not None:
+                entry["sweeps"] = n
+    elif method == "dial":
+        if not np.issubdtype(img.dtype, np.integer):
+            raise ValueError("The dial method requires an integer image")
+        if img.ndim == 3 and metric == _METRICS["l2"]:
+            raise ValueError("The dial method requires integer costs (l1 or max)")
+        if gamma is not None:
+            raise ValueError("The dial method requires integer costs (no gamma)")
+        seeds = np.flatnonzero(dist == 0)
+        if mask.size > 0:
+            seeds = seeds[mask.ravel()[seeds % mask.size]]
+        nlevels = _nlevels(img, metric)
+        dial = _kernels(connectivity, False)[2]
+        with stage("gdt", method=method, layers=dist.shape[0]):
+            dial(img, dist, labels, seeds, nlevels, mask, max_distance, metric, cancel)
+    else:
+        raise ValueError(f"Unknown method: {method}")
+
+
+def _metric(img: np.ndarray, metric: str) -> int:
+    # Metric of the channels of img, which is (h, w) or (h, w, C)
+    if img.ndim not in (2, 3):
+        raise ValueError(f"Expected an image (h, w) or (h, w, C), not {img.shape}")
+    if metric not in _METRICS:
+        raise ValueError(f"Unknown metric: {metric}")
+    return _METRICS[metric]
+
+
+def _nlevels(img: np.ndarray, metric: int = 0) -> int:
+    # Number of levels of the bucket queue: more than the largest edge cost,
+    # which adds up over the channels with the L1 metric
+    if np.issubdtype(img.dtype, np.integer) and img.dtype.itemsize <= 2:
+        info = np.iinfo(img.dtype)
+        span = int(info.max) - int(info.min)
+    else:
+        span = int(img.max()) - int(img.min()) if img.size > 0 else 0
+    if img.ndim == 3 and metric == _METRICS["l1"]:
+        span *= img.shape[2]
+    return span + 1
+
+
+def _distances(shape: tuple, out: np.ndarray | None) -> np.ndarray:
+    # Distances at 1e10 (unreached), in out when given
+    if out is None:
+        return np.full(shape, dtype=np.float32, fill_value=1e10)
+    if out.shape != shape:
+        raise ValueError(f"out has shape {out.shape} instead of {shape}")
+    if not np.issubdtype(out.dtype, np.floating):
+        raise ValueError(f"Distances must be floating point, not {out.dtype}")
+    out.fill(1e10)
+    return out
+
+
+def geodesic_distance_transform(
+    img: np.ndarray,
+    mask: np.ndarray,
+    method: str = "sweep",
+    max_sweeps: int | None = None,
+    tol: float = 0.0,
+    parallel: bool = False,
+    out: np.ndarray | None = None,
+    max_distance: float | None = None,
+    roi=None,
+    metric: str = "l1",
+    connectivity: int = 8,
+    gamma: float | None = None,
+    cancel: np.ndarray | None = None,
+) -> np.ndarray:
+    # method is "sweep" (raster sweeps, which can be stopped early with
+    # max_sweeps/tol for an approximate result, and run on all the cores with
+    # parallel=True) or "dial" (exact, single pass, integer images only).
+    # The distances are float32, or written to out (float32 or float64).
+    # Distances can be bounded to max_distance, and paths to a region of
+    # interest (a box (l0, c0, l1, c1) or a mask), only the bounding box of
+    # which is computed. Pixels that are not reached stay at 1e10; markers
+    # outside of the roi stay at 0 but are not propagated from.
+    # img may have channels (h, w, C) (color or multispectral): the cost of an
+    # edge is then the "l1", "l2" or "max" norm of the difference of its
+    # pixels (the dial method needs l1 or max).
+    # Paths go through the 4 or 8 neighbours of each pixel, or the 16 of the
+    # 5x5 chamfer mask (8 neighbours and knight moves). The cost of an edge is
+    # the difference of its pixels, or with gamma the GeoS cost
+    # sqrt(length^2 + gamma * difference^2), length being the Euclidean length
+    # of the edge, which the dial method does not handle.
+    # Setting cancel[0] (a boolean array of one value) from another thread
+    # stops the computation soon after, leaving the distances partial.
+    res = _distances(img.shape[:2], out)
+    res[mask] = 0
+
+    _solve(
+        img,
+        res[None],
+        np.empty((0, 0), dtype=np.uint8),
+        method,
+        max_sweeps,
+        tol,
+        parallel,
+        roi,
+        max_distance,
+        metric,
+        connectivity,
+        gamma,
+        cancel,
+    )
 
     return res
+
+
+def multi_label_geodesic_distance_transform(
+    img: np.ndarray,
+    labels: np.ndarray,
+    per_label: bool = False,
+    nlabels: int | None = None,
+    method: str = "sweep",
+    max_sweeps: int | None = None,
+    tol: float = 0.0,
+    parallel: bool = False,
+    out: np.ndarray | None = None,
+    max_distance: float | None = None,
+    roi=None,
+    metric: str = "l1",
+    connectivity: int = 8,
+    gamma: float | None = None,
+    cancel: np.ndarray | None = None,
+) -> np.ndarray | tuple[np.ndarray, np.ndarray]:
+    # `labels` is a label image (0 for unlabeled pixels, k > 0 for the markers
+    # of label k), with nlabels labels (its maximum by default). The distances
+    # may be written to out, of shape (nlabels, h, w) if per_label, and be
+    # bounded or cancelled as in geodesic_distance_transform, whose channel
+    # metric, connectivity and costs apply as well.
+    if nlabels is None:
+        nlabels = int(labels.max())
+
+    if per_label:
+        # One layer per label, each one equal to a single label transform
+        res = _distances((nlabels,) + img.shape[:2], out)
+        for k in range(nlabels):
+            res[k][labels == k + 1] = 0
+        _solve(
+            img,
+            res,
+            np.empty((0, 0), dtype=np.uint8),
+            method,
+            max_sweeps,
+            tol,
+            parallel,
+            roi,
+            max_distance,
+            metric,
+            connectivity,
+            gamma,
+            cancel,
+        )
+        return res
+
+    # A single layer swept from all the markers, which carries the labels
+    res = _distances(img.shape[:2], out)
+    res[labels > 0] = 0
+    L = labels.astype(np.min_scalar_type(nlabels))
+    _solve(
+        img,
+        res[None],
+        L,
+        method,
+        max_sweeps,
+        tol,
+        parallel,
+        roi,
+        max_distance,
+        metric,
+        connectivity,
+        gamma,
+        cancel,
+    )
+
+    return L, res
+
+
+def geodesic_distance_transform_update(
+    img: np.ndarray,
+    dist: np.ndarray,
+    seeds: np.ndarray,
+    metric: str = "l1",
+    connectivity: int = 8,
+    gamma: float | None = None,
+) -> np.ndarray:
+    # Update in place a transform `dist` of img after adding the seeds
+    # (coordinates of new marker pixels), on the graph and with the costs of
+    # the transform (connectivity, metric and gamma, see
+    # geodesic_distance_transform). For integer costs (integer images, with
+    # the l1 or max metric when they have channels, without gamma), only the
+    # region where the distances decrease is visited and the result is the
+    # exact transform of all the markers. Other images are swept again from
+    # dist.
+    metric = _metric(img, metric)
+    if gamma is not None and gamma < 0:
+        raise ValueError(f"gamma must be positive, not {gamma}")
+    if img.dtype == np.bool_:
+        img = img.view(np.uint8)
+    seeds = np.asarray(seeds, dtype=np.int64).reshape(-1, 2)
+    assert np.all((seeds >= 0) & (seeds < img.shape[:2]))
+    dist[seeds[:, 0], seeds[:, 1]] = 0
+
+    no_labels = np.empty((0, 0), dtype=np.uint8)
+    integer = np.issubdtype(img.dtype, np.integer) and metric != _METRICS["l2"]
+    if integer and gamma is None:
+        p = seeds[:, 0] * img.shape[1] + seeds[:, 1]
+        nlevels = _nlevels(img, metric)
+        dial = _kernels(connectivity, False)[2]
+        dial(img, dist[None], no_labels, p, nlevels, _NO_ROI, np.inf, metric)
+    else:
+        _sweep(
+            img,
+            dist[None],
+            no_labels,
+            None,
+            0.0,
+            False,
+            metric=metric,
+            connectivity=connectivity,
+            gamma=gamma,
+        )
+
+    return dist
@@ -1,29 +1,34 @@
 import numpy as np
 
+from .instrument import stage
 
-def immersion(input: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
-    h, w = input.shape
-    out_h = 2 * h - 1
-    out_w = 2 * w - 1
-
-    M = np.empty((out_h, out_w), dtype=input.dtype)
-    m = np.empty_like(M)
-
-    M[::2, ::2] = input
-    m[::2, ::2] = input
-
-    M[::2, 1::2] = np.maximum(input[:, :-1], input[:, 1:])
-    m[::2, 1::2] = np.minimum(input[:, :-1], input[:, 1:])
 
-    M[1::2, ::2] = np.maximum(input[:-1, :], input[1:, :])
-    m[1::2, ::2] = np.minimum(input[:-1, :], input[1:, :])
-
-    tmp_max1 = np.maximum(input[:-1, :-1], input[:-1, 1:])
-    tmp_max2 = np.maximum(input[1:, :-1], input[1:, 1:])
-    M[1::2, 1::2] = np.maximum(tmp_max1, tmp_max2)
-
-    tmp_min1 = np.minimum(input[:-1, :-1], input[:-1, 1:])
-    tmp_min2 = np.minimum(input[1:, :-1], input[1:, 1:])
-    m[1::2, 1::2] = np.minimum(tmp_min1, tmp_min2)
-
-    return (m, M)
+def immersion(input: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Cubical complex of an image of any dimension (2D images, 3D volumes):
+    # faces of even coordinates along all the axes are the pixels, the other
+    # ones the bounds of the pixels they are between. The faces that are odd
+    # along an axis are computed from their two neighbours along that axis,
+    # axis after axis, directly in m and M.
+    with stage("immersion"):
+        ndim = input.ndim
+        shape = tuple(2 * n - 1 for n in input.shape)
+
+        M = np.empty(shape, dtype=input.dtype)
+        m = np.empty_like(M)
+
+        pixels = (slice(None, None, 2),) * ndim
+        M[pixels] = input
+        m[pixels] = input
+
+        for axis in range(ndim):
+            # Faces already computed along the previous axes, pixels along the
+            # next ones
+            before = (slice(None),) * axis
+            after = (slice(None, None, 2),) * (ndim - axis - 1)
+            odd = before + (slice(1, None, 2),) + after
+            prev = before + (slice(0, -1, 2),) + after
+            next = before + (slice(2, None, 2),) + after
+            np.maximum(M[prev], M[next], out=M[odd])
+            np.minimum(m[prev], m[next], out=m[odd])
+
+        return (m, M)
@@ -0,0 +1,125 @@
+import contextlib
+import json
+import threading
+import time
+import tracemalloc
+
+# Opt-in instrumentation of the transforms. Inside `with record() as rec:`,
+# the stages run by the same thread (immersion, seed extraction, LLDT floods,
+# GDT sweeps, and the stages of the GUI) are appended to rec.stages, each one
+# as a dict with its name, its wall time (s), the peak of the memory allocated
+# during the stage (bytes) and the statistics of the stage: number of sweeps
+# of the GDT, queue statistics of the LLDT (faces pushed, largest bucket,
+# levels the queue went through). Outside of record(), stage() only costs a
+# lookup.
+# The memory is measured with tracemalloc, which sees the arrays allocated by
+# numpy but not the buffers allocated inside the compiled kernels (the queues),
+# and is shared by the whole process: stages running at the same time in other
+# threads add to each other's peaks.
+
+_local = threading.local()
+_lock = threading.Lock()
+_tracing = 0
+
+
+class Recorder:
+    """Stages recorded by `record()`, in the order they ended.
+
+    `callback(stage)`, if given, is called as each stage ends, from the thread
+    that ran it.
+    """
+
+    def __init__(self, memory: bool = True, callback=None):
+        self.memory = memory
+        self.callback = callback
+        self.stages: list[dict] = []
+        self._open: list[dict] = []
+
+    def to_json(self, indent: int | None = 2) -> str:
+        return json.dumps(self.stages, indent=indent)
+
+    def summary(self) -> str:
+        # One line per stage, nested stages being indented
+        lines = []
+        for stage in self.stages:
+            line = f"{'  ' * stage['depth']}{stage['name']:<16} {stage['time']:8.3f} s"
+            if "peak_bytes" in stage:
+                line += f" {stage['peak_bytes'] / 2**20:9.1f} MB"
+            stats = [
+                f"{k}={v}"
+                for k, v in stage.items()
+                if k not in ("name", "depth", "time", "peak_bytes")
+            ]
+            lines.append(" ".join([line] + stats))
+        return "\n".join(lines)
+
+
+def active() -> Recorder | None:
+    # Recorder of the calling thread, if it is recording
+    return getattr(_local, "recorder", None)
+
+
+@contextlib.contextmanager
+def record(memory: bool = True, callback=None):
+    global _tracing
+    previous = active()
+    recorder = Recorder(memory, callback)
+    started = False
+    if memory:
+        with _lock:
+            # Tracing started elsewhere is left running
+            if _tracing > 0 or not tracemalloc.is_tracing():
+                if _tracing == 0:
+                    tracemalloc.start()
+                _tracing += 1
+                started = True
+    _local.recorder = recorder
+    try:
+        yield recorder
+    finally:
+        _local.recorder = previous
+        if started:
+            with _lock:
+                _tracing -= 1
+                if _tracing == 0:
+                    tracemalloc.stop()
+
+
+@contextlib.contextmanager
+def stage(name: str, **info):
+    # Records the body as a stage of the active recorder. The dict of the
+    # stage is yielded so that statistics can be added to it (None when
+    # nothing is recorded).
+    recorder = active()
+    if recorder is None:
+        yield None
+        return
+
+    entry = {"name": name, "depth": len(recorder._open), **info}
+    memory = recorder.memory and tracemalloc.is_tracing()
+    if memory:
+        current, peak = tracemalloc.get_traced_memory()
+        # The peak of the enclosing stage so far, before it is reset
+        if recorder._open:
+            parent = recorder._open[-1]
+            parent["_peak"] = max(parent["_peak"], peak)
+        tracemalloc.reset_peak()
+        entry["_start"] = current
+        entry["_peak"] = current
+    recorder._open.append(entry)
+    t = time.perf_counter()
+    try:
+        yield entry
+    finally:
+        entry["time"] = time.perf_counter() - t
+        recorder._open.pop()
+        if memory:
+            peak = max(entry.pop("_peak"), tracemalloc.get_traced_memory()[1])
+            entry["peak_bytes"] = peak - entry.pop("_start")
+            tracemalloc.reset_peak()
+            if recorder._open:
+                parent = recorder._open[-1]
+                parent["_peak"] = max(parent["_peak"], peak)
+        recorder.stages.append(entry)
+        if recorder.callback is not None:
+            recorder.callback(entry)
@@ -1,17 +1,475 @@
 import numpy as np
+from numba import njit
+from numba.extending import overload
 
 from .pqueue import PQueue
-from .utils import in_domain, C4, clamp
+from .utils import in_domain, C4, C6, clamp, get_coordinates, _as_roi
+from .instrument import active, stage
 
 
-def level_lines_distance_transform(
-    m: np.ndarray, M: np.ndarray, seeds: list[tuple[int, int]] = [(0, 0)]
+def _interval(img: np.ndarray, x: np.ndarray):
+    # [m, M] of the face x of the immersion of img: bounds of the pixels around
+    # it (one, two or four of them in 2D, up to eight in 3D, depending on the
+    # parity of the coordinates of x)
+    lo = tuple(v >> 1 for v in x)
+    hi = tuple((v + 1) >> 1 for v in x)
+    around = img[tuple(slice(a, b + 1) for a, b in zip(lo, hi))]
+    return around.min(), around.max()
+
+
+@overload(_interval)
+def _interval_impl(img, x):
+    # Compiled version of _interval, one per number of dimensions of img
+    if img.ndim == 2:
+
+        def interval(img, x):
+            l0, c0 = x[0] >> 1, x[1] >> 1
+            l1, c1 = (x[0] + 1) >> 1, (x[1] + 1) >> 1
+            a, b, e, f = img[l0, c0], img[l0, c1], img[l1, c0], img[l1, c1]
+            return min(min(a, b), min(e, f)), max(max(a, b), max(e, f))
+
+        return interval
+
+    def interval(img, x):
+        z0, l0, c0 = x[0] >> 1, x[1] >> 1, x[2] >> 1
+        z1, l1, c1 = (x[0] + 1) >> 1, (x[1] + 1) >> 1, (x[2] + 1) >> 1
+        lo = img[z0, l0, c0]
+        hi = lo
+        for a in (z0, z1):
+            for b in (l0, l1):
+                for e in (c0, c1):
+                    v = img[a, b, e]
+                    lo = min(lo, v)
+                    hi = max(hi, v)
+        return lo, hi
+
+    return interval
+
+
+def _at(arr: np.ndarray, x: np.ndarray):
+    # Value of arr at the coordinates x
+    return arr[tuple(x)]
+
+
+@overload(_at)
+def _at_impl(arr, x):
+    if arr.ndim == 2:
+        return lambda arr, x: arr[x[0], x[1]]
+    return lambda arr, x: arr[x[0], x[1], x[2]]
+
+
+# Neighbours of a face of the Khalimsky grid, in the order of C4 (2D) and C6
+# (3D), as (axis, step) pairs
+_FACE_NEIGHBOURS = {
+    len(offsets[0]): tuple(
+        (axis, offset[axis])
+        for offset in offsets
+        for axis in range(len(offset))
+        if offset[axis] != 0
+    )
+    for offsets in (C4, C6)
+}
+
+
+def _face_neighbours(img: np.ndarray) -> tuple:
+    return _FACE_NEIGHBOURS[img.ndim]
+
+
+@overload(_face_neighbours)
+def _face_neighbours_impl(img):
+    # A constant of the compiled loops
+    neighbours = _FACE_NEIGHBOURS[img.ndim]
+    return lambda img: neighbours
+
+
+@njit(inline="always")
+def _unravel(r: int, strides: np.ndarray, x: np.ndarray):
+    # Coordinates x of the linear index r of the grid
+    for a in range(x.size - 1):
+        x[a] = r // strides[a]
+        r -= x[a] * strides[a]
+    x[x.size - 1] = r
+
+
+# State of the queue of _flood_front, kept between its calls
+_DIST = 0
+_CUR = 1
+_FREE = 2
+_TOP = 3
+_SIZE = 4
+_OVERFLOW = 5
+_NEXT = 6
+
+# Statistics of the queue of _flood_front, when asked for: faces pushed,
+# largest number of faces in a bucket, levels the queue went through, then the
+# current size of each bucket
+_PUSHES = 0
+_MAX_BUCKET = 1
+_LEVELS = 2
+_NSTATS = 3
+_NO_STATS = np.empty(0, dtype=np.int64)
+_NO_DISTS = np.empty(0, dtype=np.int64)
+
+# The flag of a cancellable computation is a boolean array of one value, read
+# by the kernels every _CANCEL_EVERY faces (a power of 2)
+_CANCEL_EVERY = 4096
+_NO_CANCEL = np.zeros(0, dtype=np.bool_)
+
+
+@njit(nogil=True, cache=True)
+def _flood_front(
+    m: np.ndarray,
+    M: np.ndarray,
+    implicit: bool,
+    F: np.ndarray,
+    D: np.ndarray,
+    L: np.ndarray,
+    roi: np.ndarray,
+    bounds: np.ndarray,
+    max_distance: int,
+    lower: bool,
+    seen: np.ndarray,
+    seeds: np.ndarray,
+    seed_dists: np.ndarray,
+    seed_labels: np.ndarray,
+    head: np.ndarray,
+    items: np.ndarray,
+    values: np.ndarray,
+    links: np.ndarray,
+    state: np.ndarray,
+    stats: np.ndarray,
+    cancel: np.ndarray,
+) -> bool:
+    # Flood until the queue is empty or the flood is cancelled (True), or may
+    # run out of slots (False). Slots are only counted here, growing the
+    # buffers in this loop would slow it down a lot. The queue statistics are
+    # counted in stats when it is not empty. See _propagate_front for the
+    # arguments.
+    ndim = m.ndim
+    x = np.empty(ndim, dtype=np.int64)
+    strides = np.empty(ndim, dtype=np.int64)
+    pixel_strides = np.empty(ndim, dtype=np.int64)
+    size_ = 1
+    pixels = 1
+    for a in range(ndim - 1, -1, -1):
+        n = 2 * m.shape[a] - 1 if implicit else m.shape[a]
+        strides[a] = size_
+        pixel_strides[a] = pixels
+        size_ *= n
+        pixels *= (n + 1) // 2
+    K = D.shape[0]
+    pixels_only = D.shape[1] != size_
+    UNSEEN = np.iinfo(D.dtype).max
+    nlevels = head.size
+    capacity = items.size
+    # Popping a face frees a slot and pushes at most 2 * ndim - 1 faces (it
+    # was reached from another one, or it is a seed)
+    room = 2 * ndim
+    dist, cur = state[_DIST], state[_CUR]
+    free, top, size = state[_FREE], state[_TOP], state[_SIZE]
+    nxt = state[_NEXT]
+    count = stats.size > 0
+    pops = 0
+
+    done = True
+    while size > 0 or nxt < seeds.size:
+        if size + room > capacity:
+            done = False
+            break
+        pops += 1
+        if cancel.size > 0 and pops & (_CANCEL_EVERY - 1) == 0 and cancel[0]:
+            break
+
+        if nxt < seeds.size:
+            # The seeds enter the queue once the front reaches their distance
+            sd = seed_dists[nxt]
+            if size == 0 and sd > dist:
+                cur = (cur + sd - dist) % nlevels
+                dist = sd
+            if sd <= dist:
+                p = seeds[nxt]
+                k = p // size_ if K > 1 else 0
+                r = p - k * size_
+                _unravel(r, strides, x)
+                if implicit:
+                    v = _interval(m, x)[0]
+                else:
+                    v = _at(m, x)
+                if not pixels_only:
+                    D[k, r] = sd
+                    if F.size > 0:
+                        F[k, r] = v
+                    if L.size > 0:
+                        L[r] = seed_labels[nxt]
+                else:
+                    even = True
+                    i = 0
+                    for a in range(ndim):
+                        even = even and x[a] % 2 == 0
+                        i += (x[a] >> 1) * pixel_strides[a]
+                    if even:
+                        D[k, i] = sd
+                        if F.size > 0:
+                            F[k, i] = v
+                if free != -1:
+                    t = free
+                    free = links[t]
+                else:
+                    t = top
+                    top += 1
+                items[t] = p
+                values[t] = v
+                links[t] = head[cur]
+                head[cur] = t
+                size += 1
+                nxt += 1
+                if count:
+                    stats[_PUSHES] += 1
+                    stats[_NSTATS + cur] += 1
+                    stats[_MAX_BUCKET] = max(stats[_MAX_BUCKET], stats[_NSTATS + cur])
+                continue
+
+        while head[cur] == -1:
+            dist += 1
+            cur += 1
+            if cur == nlevels:
+                cur = 0
+            if nxt < seeds.size and seed_dists[nxt] <= dist:
+                break
+        if head[cur] == -1 or (nxt < seeds.size and seed_dists[nxt] <= dist):
+            continue
+        s = head[cur]
+        head[cur] = links[s]
+        links[s] = free
+        free = s
+        size -= 1
+        if count:
+            stats[_NSTATS + cur] -= 1
+
+        p = items[s]
+        f = values[s]
+        k = p // size_ if K > 1 else 0
+        r = p - k * size_
+        _unravel(r, strides, x)
+        odd = 0
+        if pixels_only:
+            for a in range(ndim):
+                odd += x[a] & 1
+        for a, step in _face_neighbours(m):
+            xa = x[a]
+            na = xa + step
+            rn = r + step * strides[a]
+            n = k * size_ + rn
+            if (
+                na >= bounds[a]
+                and na < bounds[ndim + a]
+                and not seen[n >> 3] & (1 << (n & 7))
+                and (roi.size == 0 or roi[rn])
+            ):
+                seen[n >> 3] |= 1 << (n & 7)
+                x[a] = na
+                if implicit:
+                    lo, hi = _interval(m, x)
+                else:
+                    lo, hi = _at(m, x), _at(M, x)
+                # Index of the pixel of the face, if it is one
+                i = -1
+                if pixels_only and odd - (xa & 1) + (na & 1) == 0:
+                    i = 0
+                    for b in range(ndim):
+                        i += (x[b] >> 1) * pixel_strides[b]
+                x[a] = xa
+                v = f
+                if v < lo:
+                    v = lo
+                elif v > hi:
+                    v = hi
+                diff = abs(np.int64(f) - np.int64(v))
+                d = dist + diff
+                if d > max_distance:
+                    # Left unreached, as it would be reached too far
+                    continue
+                if lower and d >= D[k, rn]:
+                    # Kept, and left for a face of the front that reaches it
+                    # lower
+                    seen[n >> 3] &= np.uint8(255 - (1 << (n & 7)))
+                    continue
+                if d >= UNSEEN:
+                    d = UNSEEN - 1
+                    state[_OVERFLOW] = 1
+                if not pixels_only:
+                    D[k, rn] = d
+                    if F.size > 0:
+                        F[k, rn] = v
+                    if L.size > 0:
+                        L[rn] = L[r]
+                elif i >= 0:
+                    D[k, i] = d
+                    if F.size > 0:
+                        F[k, i] = v
+
+                if free != -1:
+                    t = free
+                    free = links[t]
+                else:
+                    t = top
+                    top += 1
+                j = cur + diff
+                if j >= nlevels:
+                    j -= nlevels
+                items[t] = n
+                values[t] = v
+                links[t] = head[j]
+                head[j] = t
+                size += 1
+                if count:
+                    stats[_PUSHES] += 1
+                    stats[_NSTATS + j] += 1
+                    stats[_MAX_BUCKET] = max(stats[_MAX_BUCKET], stats[_NSTATS + j])
+
+    state[_DIST], state[_CUR] = dist, cur
+    state[_FREE], state[_TOP], state[_SIZE] = free, top, size
+    state[_NEXT] = nxt
+    return done
+
+
+@njit(nogil=True, cache=True)
+def _propagate_front(
+    m: np.ndarray,
+    M: np.ndarray,
+    implicit: bool,
+    seeds: np.ndarray,
+    seed_dists: np.ndarray,
+    F: np.ndarray,
+    D: np.ndarray,
+    L: np.ndarray,
+    seed_labels: np.ndarray,
+    roi: np.ndarray,
+    bounds: np.ndarray,
+    max_distance: int,
+    lower: bool,
+    seen: np.ndarray,
+    nlevels: int,
+    stats: np.ndarray,
+    cancel: np.ndarray,
+) -> bool:
+    # Flooding of the faces of the Khalimsky grid of a 2D image or a 3D
+    # volume, over their 4 or 6 neighbours. F and D are stacked layers,
+    # flattened as (K, n), and each layer k is flooded from the seeds
+    # (k, *x) independently of the others, all in the same queue. If L (the
+    # flattened grid) is not empty, the label of each seed is also propagated
+    # along.
+    # The seeds are at distance 0, or at seed_dists when not empty (sorted
+    # in increasing order): each seed then enters the queue once the front
+    # reaches its distance, which restarts a flood from the faces around a
+    # region to recompute.
+    # The queue stores the level of each face along with it and only holds
+    # the faces of the front, in slots recycled through a free list, so F is
+    # only an output and may be empty.
+    # The reached faces are marked in the bitmap `seen` (zeroed, of
+    # (K * n + 7) // 8 bytes).
+    # If implicit, m is the image itself and the interval of a face is
+    # computed from it when it is reached, without any immersion (M is not
+    # used). D and F are either over the whole Khalimsky grid, or over the
+    # pixels only (D.shape[1] is the number of pixels), the labels being
+    # propagated on the whole grid only.
+    # The flooding stays in the box bounds (lower then upper coordinates) and
+    # in the flattened mask roi when it is not empty, and does not go further
+    # than max_distance. The seeds must be inside.
+    # If lower, D holds the distances of a previous flooding over the whole
+    # grid, and a face is only reached (and propagated from) when it gets a
+    # distance lower than its own; the others keep their F and D.
+    # If stats is not empty (zeroed, of _NSTATS + nlevels values), the
+    # statistics of the queue are counted in it. If cancel is not empty, the
+    # flood stops early once cancel[0] is set, leaving D partial.
+    # Returns False if some distances did not fit in the dtype of D.
+    ndim = m.ndim
+    strides = np.empty(ndim, dtype=np.int64)
+    size_ = 1
+    for a in range(ndim - 1, -1, -1):
+        strides[a] = size_
+        size_ *= 2 * m.shape[a] - 1 if implicit else m.shape[a]
+
+    # A duplicated seed is popped at its last push, so keep that one only
+    keep = np.zeros(seeds.shape[0], dtype=np.bool_)
+    for i in range(seeds.shape[0] - 1, -1, -1):
+        p = seeds[i, 0] * size_
+        for a in range(ndim):
+            p += seeds[i, 1 + a] * strides[a]
+        if not seen[p >> 3] & (1 << (p & 7)):
+            seen[p >> 3] |= 1 << (p & 7)
+            keep[i] = True
+    n = np.count_nonzero(keep)
+    faces = np.empty(n, dtype=np.int64)
+    dists = np.zeros(n, dtype=np.int64)
+    labels = np.empty(n if seed_labels.size > 0 else 0, dtype=seed_labels.dtype)
+    j = 0
+    for i in range(seeds.shape[0]):
+        if keep[i]:
+            faces[j] = seeds[i, 0] * size_
+            for a in range(ndim):
+                faces[j] += seeds[i, 1 + a] * strides[a]
+            if seed_dists.size > 0:
+                dists[j] = seed_dists[i]
+            if labels.size > 0:
+                labels[j] = seed_labels[i]
+            j += 1
+
+    capacity = max(n + 2 * ndim, 1024)
+    head = np.full(nlevels, -1, dtype=np.int64)
+    items = np.empty(capacity, dtype=np.int64)
+    values = np.empty(capacity, dtype=m.dtype)
+    links = np.empty(capacity, dtype=np.int64)
+    state = np.zeros(7, dtype=np.int64)
+    state[_FREE] = -1
+
+    while not _flood_front(
+        m,
+        M,
+        implicit,
+        F,
+        D,
+        L,
+        roi,
+        bounds,
+        max_distance,
+        lower,
+        seen,
+        faces,
+        dists,
+        labels,
+        head,
+        items,
+        values,
+        links,
+        state,
+        stats,
+        cancel,
+    ):
+        # All the slots are in use
+        items = np.concatenate((items, np.empty_like(items)))
+        values = np.concatenate((values, np.empty_like(values)))
+        links = np.concatenate((links, np.empty_like(links)))
+
+    if stats.size > 0:
+        stats[_LEVELS] = state[_DIST] + 1
+    return state[_OVERFLOW] == 0
+
+
+@njit(cache=True)
+def _nlevels(m: np.ndarray, M: np.ndarray) -> int:
+    # Largest possible step between two neighbouring levels, plus one
+    return np.int64(M.max()) - np.int64(m.min()) + 1 if m.size > 0 else 1
+
+
+def _level_lines_distance_transform_python(
+    m: np.ndarray, M: np.ndarray, seeds
 ) -> tuple[np.ndarray, np.ndarray]:
     # Initialize structures
     UNSEEN = np.iinfo(np.uint32).max
     F = np.empty_like(m)
     D = np.full(m.shape, dtype=np.uint32, fill_value=UNSEEN)
-    q = PQueue()
+    q = PQueue(_nlevels(m, M))
 
     # Process initial points
     for l, c in seeds:
@@ -32,3 +490,409 @@ def level_lines_distance_transform(
                 q.push((nl, nc), diff)
 
     return F, D
+
+
+def _buffers(
+    shape: tuple,
+    dtype,
+    out: np.ndarray | None,
+    dist_out: np.ndarray | None,
+    levels_dtype,
+    return_levels: bool,
+) -> tuple[np.ndarray, np.ndarray]:
+    # F and D of the given shape, taken from out and dist_out when given.
+    # D is reset to the largest value of its dtype (unreached faces). F is
+    # empty if the levels are not returned.
+    if dist_out is None:
+        dtype = np.dtype(dtype)
+        if not np.issubdtype(dtype, np.unsignedinteger):
+            raise ValueError(f"Distances must be unsigned integers, not {dtype}")
+        D = np.full(shape, dtype=dtype, fill_value=np.iinfo(dtype).max)
+    else:
+        if dist_out.shape != shape:
+            raise ValueError(f"dist_out has shape {dist_out.shape} instead of {shape}")
+        if not np.issubdtype(dist_out.dtype, np.unsignedinteger):
+            raise ValueError(
+                f"Distances must be unsigned integers, not {dist_out.dtype}"
+            )
+        if not dist_out.flags.c_contiguous:
+            raise ValueError("dist_out must be C-contiguous")
+        D = dist_out
+        D.fill(np.iinfo(D.dtype).max)
+
+    if not return_levels:
+        F = np.empty((0,) * len(shape), dtype=levels_dtype)
+    elif out is None:
+        F = np.empty(shape, dtype=levels_dtype)
+    else:
+        if out.shape != shape or out.dtype != levels_dtype:
+            raise ValueError(
+                f"out must have shape {shape} and dtype {np.dtype(levels_dtype)}"
+            )
+        if not out.flags.c_contiguous:
+            raise ValueError("out must be C-contiguous")
+        F = out
+    return F, D
+
+
+def _flood(
+    m: np.ndarray,
+    M: np.ndarray,
+    implicit: bool,
+    seeds: np.ndarray,
+    F: np.ndarray,
+    D: np.ndarray,
+    L: np.ndarray,
+    seed_labels: np.ndarray,
+    nlevels: int,
+    roi=None,
+    max_distance: int | None = None,
+    seed_dists: np.ndarray = _NO_DISTS,
+    cancel: np.ndarray | None = None,
+    lower: bool = False,
+):
+    # Run _propagate_front on stacked (K, ...) F and D, from the seeds inside
+    # the roi (at seed_dists when not empty), on top of the distances in D if
+    # lower. F and D must be contiguous.
+    ndim = m.ndim
+    shape = tuple(2 * n - 1 for n in m.shape) if implicit else m.shape
+    if roi is None:
+        mask, bounds = np.empty((0,) * ndim, dtype=np.bool_), (0,) * ndim + shape
+    else:
+        mask, bounds = _as_roi(roi, shape)
+    x = seeds[:, 1:]
+    inside = np.all((x >= bounds[:ndim]) & (x < bounds[ndim:]), axis=1)
+    if mask.size > 0:
+        inside &= mask[tuple(x.T)]
+    if not inside.all():
+        seeds = seeds[inside]
+        if seed_labels.size > 0:
+            seed_labels = seed_labels[inside]
+        if seed_dists.size > 0:
+            seed_dists = seed_dists[inside]
+
+    max_distance = np.iinfo(np.int64).max if max_distance is None else int(max_distance)
+    seen = np.zeros((D.shape[0] * int(np.prod(shape)) + 7) // 8, dtype=np.uint8)
+    # The queue is only counted when recording
+    stats = _NO_STATS if active() is None else np.zeros(_NSTATS + nlevels, np.int64)
+    with stage("lldt", layers=D.shape[0]) as entry:
+        fits = _propagate_front(
+            m,
+            M,
+            implicit,
+            seeds,
+            seed_dists,
+            _flat(F),
+            _flat(D),
+            L.reshape(-1),
+            seed_labels,
+            mask.reshape(-1),
+            np.array(bounds, dtype=np.int64),
+            max_distance,
+            lower,
+            seen,
+            nlevels,
+            stats,
+            _NO_CANCEL if cancel is None else cancel,
+        )
+        if entry is not None:
+            entry["pushes"] = int(stats[_PUSHES])
+            entry["max_bucket"] = int(stats[_MAX_BUCKET])
+            entry["levels"] = int(stats[_LEVELS])
+    if not fits:
+        raise OverflowError(f"Distances do not fit in {D.dtype}")
+
+
+def _flat(a: np.ndarray) -> np.ndarray:
+    # Stacked (K, ...) layers as a (K, n) view
+    return a.reshape(len(a), -1) if len(a) > 0 else a.reshape(0, 0)
+
+
+def _levels(m: np.ndarray, M: np.ndarray) -> int:
+    # Number of levels of the queue, without a pass over the image when it is
+    # given by the dtype
+    if np.issubdtype(m.dtype, np.integer) and m.dtype.itemsize <= 2:
+        info = np.iinfo(m.dtype)
+        return int(info.max) - int(info.min) + 1
+    return _nlevels(m, M)
+
+
+def level_lines_distance_transform(
+    m: np.ndarray,
+    M: np.ndarray,
+    seeds: np.ndarray = [(0, 0)],
+    engine: str = "numba",
+    out: np.ndarray | None = None,
+    dist_out: np.ndarray | None = None,
+    dtype=np.uint32,
+    return_levels: bool = True,
+    max_distance: int | None = None,
+    roi=None,
+    cancel: np.ndarray | None = None,
+) -> tuple[np.ndarray | None, np.ndarray]:
+    # The numba engine can write F and D to existing buffers (out and
+    # dist_out), store D with another unsigned dtype (uint16 halves its size,
+    # an OverflowError is raised if a distance does not fit) and skip F (the
+    # levels propagated to each face) with return_levels=False, in which case
+    # None is returned instead.
+    # The flooding can be bounded to the faces at most at max_distance from
+    # the seeds, and to a region of interest (a box (l0, c0, l1, c1) or a
+    # mask over the grid), seeds outside of it being ignored. Faces that are
+    # not reached keep the largest value of the dtype of D (and F is not
+    # defined there). The distances up to max_distance are the same as the
+    # ones of the whole flooding.
+    # Setting cancel[0] (a boolean array of one value) from another thread
+    # stops the flooding soon after, leaving F and D partial.
+    # The python engine is the reference implementation, without any of
+    # these options.
+    if engine == "python":
+        options = {
+            "out": out is not None,
+            "dist_out": dist_out is not None,
+            "dtype": np.dtype(dtype) != np.uint32,
+            "return_levels": not return_levels,
+            "max_distance": max_distance is not None,
+            "roi": roi is not None,
+            "cancel": cancel is not None,
+        }
+        unsupported = [name for name, given in options.items() if given]
+        if unsupported:
+            raise ValueError(
+                f"The python engine does not support {', '.join(unsupported)}"
+            )
+        return _level_lines_distance_transform_python(m, M, seeds)
+    if engine != "numba":
+        raise ValueError(f"Unknown engine: {engine}")
+
+    seeds = _as_seeds(seeds, m.shape)
+    F, D = _buffers(m.shape, dtype, out, dist_out, m.dtype, return_levels)
+    no_labels = np.empty((0, 0), dtype=np.uint8)
+    _flood(
+        m,
+        M,
+        False,
+        _stack_seeds([seeds]),
+        F[None],
+        D[None],
+        no_labels,
+        no_labels.ravel(),
+        _levels(m, M),
+        roi,
+        max_distance,
+        cancel=cancel,
+    )
+
+    return (F if return_levels else None), D
+
+
+def multi_label_level_lines_distance_transform(
+    m: np.ndarray,
+    M: np.ndarray,
+    labels: np.ndarray | list[np.ndarray],
+    per_label: bool = False,
+    dist_out: np.ndarray | None = None,
+    dtype=np.uint32,
+    max_distance: int | None = None,
+    roi=None,
+    cancel: np.ndarray | None = None,
+) -> np.ndarray | tuple[np.ndarray, np.ndarray]:
+    # `labels` is either a label image over the Khalimsky grid (0 for unlabeled
+    # faces, k > 0 for the seeds of label k) or a list of seed sets, the k-th
+    # one holding the seeds of label k + 1. The distances can be written to
+    # dist_out, stored with another unsigned dtype, and bounded or cancelled
+    # as in level_lines_distance_transform (unreached faces have label 0).
+    if isinstance(labels, np.ndarray) and labels.shape == m.shape:
+        nlabels = int(labels.max())
+        seed_sets = [get_coordinates(labels == k) for k in range(1, nlabels + 1)]
+        # Seeds of the single layer flood are taken in raster order
+        seeds = get_coordinates(labels > 0)
+        seed_labels = labels[seeds[:, 0], seeds[:, 1]]
+    else:
+        nlabels = len(labels)
+        seed_sets = [_as_seeds(seeds, m.shape) for seeds in labels]
+        seeds = np.concatenate([np.empty((0, 2), dtype=np.int64)] + seed_sets)
+        seed_labels = np.repeat(
+            np.arange(1, nlabels + 1, dtype=np.min_scalar_type(nlabels)),
+            [len(seeds) for seeds in seed_sets],
+        )
+
+    shape = (nlabels,) + m.shape if per_label else m.shape
+    F, D = _buffers(shape, dtype, None, dist_out, m.dtype, False)
+    no_labels = np.empty((0, 0), dtype=np.uint8)
+
+    if per_label:
+        # One layer per label, each one equal to a single label transform
+        _flood(
+            m,
+            M,
+            False,
+            _stack_seeds(seed_sets),
+            F[None],
+            D,
+            no_labels,
+            no_labels.ravel(),
+            _levels(m, M),
+            roi,
+            max_distance,
+            cancel=cancel,
+        )
+        return D
+
+    # A single layer flooded from all the seeds, which carries the labels
+    L = np.zeros(m.shape, dtype=seed_labels.dtype)
+    _flood(
+        m,
+        M,
+        False,
+        _stack_seeds([seeds]),
+        F[None],
+        D[None],
+        L,
+        seed_labels,
+        _levels(m, M),
+        roi,
+        max_distance,
+        cancel=cancel,
+    )
+
+    return L, D
+
+
+def implicit_level_lines_distance_transform(
+    img: np.ndarray,
+    seeds: np.ndarray = [(0, 0)],
+    pixels_only: bool = False,
+    out: np.ndarray | None = None,
+    dist_out: np.ndarray | None = None,
+    dtype=np.uint32,
+    return_levels: bool = True,
+    max_distance: int | None = None,
+    roi=None,
+    cancel: np.ndarray | None = None,
+) -> tuple[np.ndarray | None, np.ndarray]:
+    # Same as level_lines_distance_transform(*immersion(img), seeds) without
+    # building the immersion: the interval of each face is computed from img
+    # during the flooding. Seeds are faces of the Khalimsky grid. With
+    # pixels_only, F and D are only kept at the 2-faces (the pixels of img),
+    # which is F[::2, ::2] and D[::2, ::2] of the whole transform. The roi is
+    # over the Khalimsky grid in both cases.
+    h, w = img.shape
+    shape = (h, w) if pixels_only else (2 * h - 1, 2 * w - 1)
+    seeds = _as_seeds(seeds, (2 * h - 1, 2 * w - 1))
+
+    F, D = _buffers(shape, dtype, out, dist_out, img.dtype, return_levels)
+    no_labels = np.empty((0, 0), dtype=np.uint8)
+    _flood(
+        img,
+        img,
+        True,
+        _stack_seeds([seeds]),
+        F[None],
+        D[None],
+        no_labels,
+        no_labels.ravel(),
+        _levels(img, img),
+        roi,
+        max_distance,
+        cancel=cancel,
+    )
+
+    return (F if return_levels else None), D
+
+
+def level_lines_distance_transform_update(
+    m: np.ndarray,
+    M: np.ndarray,
+    F: np.ndarray,
+    D: np.ndarray,
+    seeds: np.ndarray,
+    max_distance: int | None = None,
+    roi=None,
+    cancel: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    # Update in place the (F, D) returned by level_lines_distance_transform
+    # after adding seeds, flooding from the new seeds only into the faces
+    # where the distances decrease (bounded and cancelled as in
+    # level_lines_distance_transform).
+    # This is an approximation of a new transform from all the seeds, see
+    # _update.
+    return _update(m, M, False, F, D, seeds, max_distance, roi, cancel)
+
+
+def implicit_level_lines_distance_transform_update(
+    img: np.ndarray,
+    F: np.ndarray,
+    D: np.ndarray,
+    seeds: np.ndarray,
+    max_distance: int | None = None,
+    roi=None,
+    cancel: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    # Same as level_lines_distance_transform_update for the (F, D) returned by
+    # implicit_level_lines_distance_transform over the whole grid
+    return _update(img, img, True, F, D, seeds, max_distance, roi, cancel)
+
+
+def _update(
+    m: np.ndarray,
+    M: np.ndarray,
+    implicit: bool,
+    F: np.ndarray,
+    D: np.ndarray,
+    seeds: np.ndarray,
+    max_distance: int | None,
+    roi,
+    cancel: np.ndarray | None,
+) -> tuple[np.ndarray, np.ndarray]:
+    # The faces that the new seeds do not bring closer keep the levels of
+    # the previous flooding, while the level propagated to a face depends on
+    # the flood that reaches it first: a new transform from all the seeds can
+    # reach them from another side and give them other levels, and then other
+    # distances further on. The distances never increase and are exact at the
+    # new seeds, but elsewhere they can differ from those of a new transform.
+    # On smooth 48x56 images, 3 seeds added to 8 change 1 to 55% of the
+    # faces, by 0.3 to 7% of the total distance, about as much as reordering
+    # the seeds of a new transform does (the flooding breaks the ties between
+    # levels in the order of its queue).
+    shape = tuple(2 * n - 1 for n in m.shape) if implicit else m.shape
+    if F.shape != shape or D.shape != shape:
+        raise ValueError(f"F and D must be over the whole grid, of shape {shape}")
+    if not (F.flags.c_contiguous and D.flags.c_contiguous):
+        raise ValueError("F and D must be C-contiguous")
+    no_labels = np.empty((0, 0), dtype=np.uint8)
+    _flood(
+        m,
+        M,
+        implicit,
+        _stack_seeds([_as_seeds(seeds, shape)]),
+        F[None],
+        D[None],
+        no_labels,
+        no_labels.ravel(),
+        _levels(m, M),
+        roi,
+        max_distance,
+        cancel=cancel,
+        lower=True,
+    )
+
+    return F, D
+
+
+def _as_seeds(seeds, shape: tuple[int, ...]) -> np.ndarray:
+    seeds = np.asarray(seeds, dtype=np.int64).reshape(-1, len(shape))
+    assert np.all((seeds >= 0) & (seeds < shape))
+    return seeds
+
+
+def _stack_seeds(seed_sets: list[np.ndarray]) -> np.ndarray:
+    # (k, l, c) rows (or (k, z, l, c) for volumes), where k is the index of
+    # the seed set
+    ndim = seed_sets[0].shape[1] if seed_sets else 2
+    return np.concatenate(
+        [np.empty((0, 1 + ndim), dtype=np.int64)]
+        + [
+            np.hstack((np.full((len(seeds), 1), k, dtype=np.int64), seeds))
+            for k, seeds in enumerate(seed_sets)
+        ]
+    )
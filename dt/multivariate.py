@@ -0,0 +1,90 @@
+import numpy as np
+
+from .level_lines_distance_transform import (
+    _as_seeds,
+    _stack_seeds,
+    _buffers,
+    _flat,
+    _levels,
+    _NO_CANCEL,
+)
+from .geodesic_distance_transform import _METRICS
+from .batch import _flood_stack
+
+# Level lines distance of images with channels (h, w, C), such as color or
+# multispectral images. Level lines are not defined for vectors, so the
+# transform is marginal: each channel is flooded on its own (the interval
+# immersion of the channel, from the same seeds), all of them at once in the
+# compiled loop of the batch transforms, and the distances of the channels are
+# combined at each face by the L1 (sum), L2 or max norm. A path crossing the
+# level lines of several channels is counted for each of them, but the
+# shortest paths of the channels may differ.
+
+
+def multivariate_level_lines_distance_transform(
+    img: np.ndarray,
+    seeds: np.ndarray = [(0, 0)],
+    pixels_only: bool = False,
+    metric: str = "l1",
+    dtype=np.uint32,
+    return_levels: bool = True,
+    cancel: np.ndarray | None = None,
+) -> tuple[np.ndarray | None, np.ndarray]:
+    # implicit_level_lines_distance_transform(img[..., k], seeds, pixels_only)
+    # of each channel k, combined by the metric. With "l1" and "max", D has
+    # the given unsigned dtype (an OverflowError is raised if a distance does
+    # not fit) and unreached faces have its largest value. With "l2", D is
+    # float32 and unreached faces stay at 1e10, as in the GDT. F holds the
+    # level of each channel, stacked on the last axis. The flooding can be
+    # cancelled as in level_lines_distance_transform.
+    if img.ndim != 3:
+        raise ValueError(f"Expected an image with channels (h, w, C), not {img.shape}")
+    if metric not in _METRICS:
+        raise ValueError(f"Unknown metric: {metric}")
+    h, w, n = img.shape
+    grid = (2 * h - 1, 2 * w - 1)
+    seeds = _stack_seeds([_as_seeds(seeds, grid)])
+
+    # The channels are flooded as a stack of images, all from the same seeds
+    channels = np.ascontiguousarray(np.moveaxis(img, -1, 0))
+    offsets = np.arange(n + 1, dtype=np.int64) * len(seeds)
+    F, D = _buffers(
+        (n,) + ((h, w) if pixels_only else grid),
+        dtype,
+        None,
+        None,
+        img.dtype,
+        return_levels,
+    )
+    fits = _flood_stack(
+        channels,
+        np.tile(seeds, (n, 1)),
+        offsets,
+        _flat(F),
+        _flat(D),
+        np.iinfo(np.int64).max,
+        _levels(channels, channels),
+        _NO_CANCEL if cancel is None else cancel,
+        channels=n,
+    )
+    if not fits.all():
+        raise OverflowError(f"Distances do not fit in {D.dtype}")
+
+    # All the channels reach the same faces, unless the flood was cancelled
+    UNSEEN = np.iinfo(D.dtype).max
+    unreached = np.any(D == UNSEEN, axis=0)
+    if metric == "l2":
+        res = np.sqrt(np.sum(np.square(D, dtype=np.float64), axis=0))
+        res = res.astype(np.float32)
+        res[unreached] = 1e10
+    else:
+        if metric == "l1":
+            res = np.sum(D, axis=0, dtype=np.uint64)
+        else:
+            res = D.max(axis=0)
+        res[unreached] = UNSEEN
+        if (res[~unreached] >= UNSEEN).any():
+            raise OverflowError(f"Distances do not fit in {D.dtype}")
+        res = res.astype(D.dtype, copy=False)
+
+    return (np.moveaxis(F, 0, -1) if return_levels else None), res
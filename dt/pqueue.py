@@ -1,24 +1,32 @@
+from collections import namedtuple
+
+import numpy as np
+from numba import njit
+
+
 class PQueue:
-    def __init__(self):
-        self._queues = [[] for _ in range(256)]
+    def __init__(self, nlevels: int = 256):
+        self._nlevels = nlevels
+        self._queues = [[] for _ in range(nlevels)]
         self._dist = 0
         self._size = 0
 
     def push(self, p: tuple[int, int], d: int):
-        i = (self._dist + d) % 256
+        assert d < self._nlevels
+        i = (self._dist + d) % self._nlevels
         self._queues[i].append(p)
         self._size += 1
 
     def advance(self):
         assert not self.empty()
-        while len(self._queues[self._dist % 256]) == 0:
+        while len(self._queues[self._dist % self._nlevels]) == 0:
             self._dist += 1
 
     def pop(self) -> tuple[int, int]:
         assert not self.empty()
         self.advance()
         self._size -= 1
-        return self._queues[self._dist % 256].pop()
+        return self._queues[self._dist % self._nlevels].pop()
 
     def empty(self) -> bool:
         return self._size == 0
@@ -26,3 +34,90 @@ class PQueue:
     @property
     def distance(self) -> int:
         return self._dist
+
+
+# Array-backed counterpart of PQueue usable from numba-compiled code. It has
+# the same semantics (circular levels, LIFO inside a level) for linear indices
+# in [0, capacity): each level is a list threaded through `next`, so an index
+# can only be queued once at a time and the queue costs 8 bytes per index.
+# A removable queue also keeps `prev` links (the level of the first item of a
+# list is stored there as -1 - level) for 8 more bytes per index.
+# `state` holds the current distance, the current level and the size.
+# It is the queue of the dial GDT and of its update. The LLDT flood keeps its
+# own buckets (see _flood_front), which only hold the faces of the front.
+HQueue = namedtuple("HQueue", ["head", "next", "prev", "state"])
+
+_DIST = 0
+_CUR = 1
+_SIZE = 2
+
+
+@njit(cache=True)
+def hqueue(nlevels: int, capacity: int, removable: bool = False) -> HQueue:
+    return HQueue(
+        np.full(nlevels, -1, dtype=np.int64),
+        np.empty(capacity, dtype=np.int64),
+        np.empty(capacity if removable else 0, dtype=np.int64),
+        np.zeros(3, dtype=np.int64),
+    )
+
+
+@njit(inline="always")
+def hqueue_push(q: HQueue, p: int, d: int):
+    i = q.state[_CUR] + d
+    if i >= q.head.size:
+        i -= q.head.size
+    n = q.head[i]
+    q.next[p] = n
+    q.head[i] = p
+    if q.prev.size > 0:
+        q.prev[p] = -1 - i
+        if n != -1:
+            q.prev[n] = p
+    q.state[_SIZE] += 1
+
+
+@njit(inline="always")
+def hqueue_pop(q: HQueue) -> int:
+    while q.head[q.state[_CUR]] == -1:
+        q.state[_DIST] += 1
+        q.state[_CUR] += 1
+        if q.state[_CUR] == q.head.size:
+            q.state[_CUR] = 0
+    p = q.head[q.state[_CUR]]
+    n = q.next[p]
+    q.head[q.state[_CUR]] = n
+    if q.prev.size > 0 and n != -1:
+        q.prev[n] = -1 - q.state[_CUR]
+    q.state[_SIZE] -= 1
+    return p
+
+
+@njit(inline="always")
+def hqueue_remove(q: HQueue, p: int):
+    # Only for removable queues, p being queued
+    n = q.next[p]
+    pr = q.prev[p]
+    if pr >= 0:
+        q.next[pr] = n
+    else:
+        q.head[-1 - pr] = n
+    if n != -1:
+        q.prev[n] = pr
+    q.state[_SIZE] -= 1
+
+
+@njit(inline="always")
+def hqueue_empty(q: HQueue) -> bool:
+    return q.state[_SIZE] == 0
+
+
+@njit(inline="always")
+def hqueue_distance(q: HQueue) -> int:
+    return q.state[_DIST]
+
+
+@njit(inline="always")
+def hqueue_skip_to(q: HQueue, d: int):
+    # Only for an empty queue: moves its current distance forward to d
+    q.state[_DIST] = d
@@ -0,0 +1,208 @@
+import math
+import tempfile
+
+import numpy as np
+
+from .immersion import immersion
+from .level_lines_distance_transform import (
+    _as_seeds,
+    _stack_seeds,
+    _propagate_front,
+    _NO_DISTS,
+    _NO_STATS,
+    _NO_CANCEL,
+)
+from .geodesic_distance_transform import _sweep, _nlevels
+
+# Out-of-core versions of the transforms, for images that do not fit in
+# memory. Inputs and outputs may be np.memmap arrays (for instance from
+# np.lib.format.open_memmap), of which only parts of about max_bytes are
+# loaded at a time. Results are the same as the in-memory functions.
+
+MAX_BYTES = 256 * 2**20
+
+
+def _allocate(arrays: list, max_bytes: int) -> list:
+    # Zeroed arrays of the given (shape, dtype), in memory as long as their
+    # total size fits in max_bytes, then backed by temporary files
+    res = []
+    for shape, dtype in arrays:
+        nbytes = math.prod(shape) * np.dtype(dtype).itemsize
+        if nbytes <= max_bytes:
+            res.append(np.zeros(shape, dtype=dtype))
+            max_bytes -= nbytes
+            continue
+        with tempfile.TemporaryFile() as f:
+            # the mapping stays valid after the file is closed
+            res.append(np.memmap(f, dtype=dtype, mode="w+", shape=shape))
+    return res
+
+
+def _rows(shape: tuple, itemsize: int, max_bytes: int) -> int:
+    # Number of rows of an array of the given shape that fit in max_bytes
+    return max(max_bytes // max(math.prod(shape[1:]) * itemsize, 1), 1)
+
+
+def _fill(arr: np.ndarray, value, max_bytes: int):
+    step = _rows(arr.shape, arr.itemsize, max_bytes)
+    for r in range(0, arr.shape[0], step):
+        arr[r : r + step] = value
+
+
+def tiled_immersion(
+    img: np.ndarray,
+    m: np.ndarray | None = None,
+    M: np.ndarray | None = None,
+    max_bytes: int = MAX_BYTES,
+) -> tuple[np.ndarray, np.ndarray]:
+    # immersion(img) computed over bands of rows of img, written to m and M of
+    # shape (2h-1, 2w-1) (allocated when not given). Consecutive bands share
+    # a row, so that the faces between them are computed too.
+    h, w = img.shape
+    shape = (2 * h - 1, 2 * w - 1)
+    missing = [(shape, img.dtype)] * ((m is None) + (M is None))
+    allocated = _allocate(missing, max_bytes)
+    if m is None:
+        m = allocated.pop(0)
+    if M is None:
+        M = allocated.pop(0)
+
+    # immersion holds about 12 rows of img per row of the band
+    step = max(_rows(img.shape, 12 * img.itemsize, max_bytes), 1)
+    r0 = 0
+    while True:
+        r1 = min(r0 + step, h - 1)
+        bm, bM = immersion(np.asarray(img[r0 : r1 + 1]))
+        m[2 * r0 : 2 * r1 + 1] = bm
+        M[2 * r0 : 2 * r1 + 1] = bM
+        if r1 == h - 1:
+            break
+        r0 = r1
+
+    return m, M
+
+
+def tiled_level_lines_distance_transform(
+    img: np.ndarray,
+    seeds: np.ndarray = [(0, 0)],
+    F: np.ndarray | None = None,
+    D: np.ndarray | None = None,
+    pixels_only: bool = False,
+    max_bytes: int = MAX_BYTES,
+    return_levels: bool = True,
+) -> tuple[np.ndarray | None, np.ndarray]:
+    # Same as implicit_level_lines_distance_transform, with img, F and D
+    # possibly memory-mapped (F and D are allocated when not given). The
+    # flooding order is global, so splitting it into tiles would change the
+    # result: the flood runs over the mapped arrays instead, which the system
+    # pages in and out as the front moves. Only the front is held in memory,
+    # and, as far as max_bytes allows, the bitmap of the faces already
+    # reached, then D, then F. With return_levels=False, F is not computed.
+    h, w = img.shape
+    shape = (h, w) if pixels_only else (2 * h - 1, 2 * w - 1)
+    seeds = _as_seeds(seeds, (2 * h - 1, 2 * w - 1))
+    missing = [((((2 * h - 1) * (2 * w - 1) + 7) // 8,), np.uint8)]
+    if D is None:
+        missing.append((shape, np.uint32))
+    if F is None and return_levels:
+        missing.append((shape, img.dtype))
+    seen, *allocated = _allocate(missing, max_bytes)
+    if D is None:
+        D = allocated.pop(0)
+    if not return_levels:
+        F = np.empty((0, 0), dtype=img.dtype)
+    elif F is None:
+        F = allocated.pop(0)
+    assert F.shape == shape or not return_levels
+    assert D.shape == shape and np.issubdtype(D.dtype, np.unsignedinteger)
+
+    _fill(D, np.iinfo(D.dtype).max, max_bytes)
+    no_labels = np.empty(0, dtype=np.uint8)
+    no_roi = np.empty(0, dtype=np.bool_)
+    bounds = np.array([0, 0, 2 * h - 1, 2 * w - 1], dtype=np.int64)
+    fits = _propagate_front(
+        np.asarray(img),
+        np.asarray(img),
+        True,
+        _stack_seeds([seeds]),
+        _NO_DISTS,
+        np.asarray(F).reshape(1, -1),
+        np.asarray(D).reshape(1, -1),
+        no_labels,
+        no_labels,
+        no_roi,
+        bounds,
+        np.iinfo(np.int64).max,
+        False,
+        np.asarray(seen),
+        _nlevels(img),
+        _NO_STATS,
+        _NO_CANCEL,
+    )
+    if not fits:
+        raise OverflowError(f"Distances do not fit in {D.dtype}")
+
+    return (F if return_levels else None), D
+
+
+def tiled_geodesic_distance_transform(
+    img: np.ndarray,
+    mask: np.ndarray,
+    out: np.ndarray | None = None,
+    max_bytes: int = MAX_BYTES,
+) -> np.ndarray:
+    # Same as geodesic_distance_transform(img, mask), written to out (allocated
+    # when not given). The image is split into square tiles, each one loaded
+    # with a one pixel halo from its neighbours and swept until it converges.
+    # When the border of a tile changes, the tiles next to it are swept again
+    # with the new halo, until no tile changes. The result is the same fixed
+    # point as the in-memory sweeps.
+    h, w = img.shape
+    if out is None:
+        (out,) = _allocate([((h, w), np.float32)], max_bytes)
+    assert out.shape == (h, w) and out.dtype == np.float32
+
+    # A tile and its halo, with the image and the distances
+    size = max(math.isqrt(max_bytes // (img.itemsize + 4)) - 2, 16)
+    nty, ntx = -(-h // size), -(-w // size)
+
+    # Only the tiles holding markers have something to do at first
+    dirty = np.zeros((nty, ntx), dtype=np.bool_)
+    for ty in range(nty):
+        for tx in range(ntx):
+            tile = np.s_[ty * size : (ty + 1) * size, tx * size : (tx + 1) * size]
+            marked = np.asarray(mask[tile], dtype=np.bool_)
+            out[tile] = np.where(marked, np.float32(0), np.float32(1e10))
+            dirty[ty, tx] = marked.any()
+
+    no_labels = np.empty((0, 0), dtype=np.uint8)
+    while dirty.any():
+        for ty, tx in zip(*np.nonzero(dirty)):
+            dirty[ty, tx] = False
+            y0, y1 = ty * size, min((ty + 1) * size, h)
+            x0, x1 = tx * size, min((tx + 1) * size, w)
+            hy0, hy1 = max(y0 - 1, 0), min(y1 + 1, h)
+            hx0, hx1 = max(x0 - 1, 0), min(x1 + 1, w)
+            tile_img = np.array(img[hy0:hy1, hx0:hx1])
+            dist = np.array(out[hy0:hy1, hx0:hx1], dtype=np.float32)
+            before = dist.copy()
+            _sweep(tile_img, dist[None], no_labels, None, 0.0, False)
+
+            inner = np.s_[y0 - hy0 : y1 - hy0, x0 - hx0 : x1 - hx0]
+            changed = dist[inner] != before[inner]
+            if not changed.any():
+                continue
+            out[y0:y1, x0:x1] = dist[inner]
+
+            # Neighbours along the sides of the tile that changed
+            ys, xs = slice(max(ty - 1, 0), ty + 2), slice(max(tx - 1, 0), tx + 2)
+            if ty > 0 and changed[0].any():
+                dirty[ty - 1, xs] = True
+            if ty < nty - 1 and changed[-1].any():
+                dirty[ty + 1, xs] = True
+            if tx > 0 and changed[:, 0].any():
+                dirty[ys, tx - 1] = True
+            if tx < ntx - 1 and changed[:, -1].any():
+                dirty[ys, tx + 1] = True
+
+    return out
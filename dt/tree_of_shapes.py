@@ -0,0 +1,210 @@
+import numpy as np
+from numba import njit
+
+from .immersion import immersion
+from .utils import C4
+
+
+@njit(nogil=True, cache=True)
+def _sort(m: np.ndarray, M: np.ndarray, nlevels: int, vmin: int):
+    # Propagation order of the faces of the immersion (m, M) from the face
+    # (0, 0), always going on with the faces at the current
+    # level, and then moving to the closest level that has faces waiting.
+    # Returns the order R and the level u of each face, the lower bound of
+    # its interval being vmin.
+    h, w = m.shape
+    n = h * w
+    head = np.full(nlevels, -1, dtype=np.int64)
+    nxt = np.empty(n, dtype=np.int64)
+    seen = np.zeros(n, dtype=np.bool_)
+    R = np.empty(n, dtype=np.int64)
+    u = np.empty((h, w), dtype=m.dtype)
+
+    cur = np.int64(m[0, 0]) - vmin
+    head[cur] = 0
+    nxt[0] = -1
+    seen[0] = True
+    for i in range(n):
+        if head[cur] == -1:
+            # closest non empty level, going up first
+            for d in range(1, nlevels):
+                if cur + d < nlevels and head[cur + d] != -1:
+                    cur += d
+                    break
+                if cur - d >= 0 and head[cur - d] != -1:
+                    cur -= d
+                    break
+        p = head[cur]
+        head[cur] = nxt[p]
+        R[i] = p
+        l = p // w
+        c = p - l * w
+        u[l, c] = cur + vmin
+        for dl, dc in C4:
+            nl, nc = l + dl, c + dc
+            if nl >= 0 and nc >= 0 and nl < h and nc < w:
+                q = nl * w + nc
+                if not seen[q]:
+                    seen[q] = True
+                    lo = np.int64(m[nl, nc]) - vmin
+                    hi = np.int64(M[nl, nc]) - vmin
+                    k = lo if lo > cur else (hi if hi < cur else cur)
+                    nxt[q] = head[k]
+                    head[k] = q
+    return R, u
+
+
+@njit(inline="always")
+def _find(zpar: np.ndarray, p: int) -> int:
+    # path halving
+    while zpar[p] != p:
+        zpar[p] = zpar[zpar[p]]
+        p = zpar[p]
+    return p
+
+
+@njit(nogil=True, cache=True)
+def _parents(R: np.ndarray, u: np.ndarray) -> np.ndarray:
+    # Tree of the faces in the order R (the max-tree of u for this order),
+    # with the parents of the faces of a node pointing to its canonical face
+    h, w = u.shape
+    n = h * w
+    flat = u.ravel()
+    parent = np.empty(n, dtype=np.int64)
+    zpar = np.full(n, -1, dtype=np.int64)
+    for i in range(n - 1, -1, -1):
+        p = R[i]
+        parent[p] = p
+        zpar[p] = p
+        l = p // w
+        c = p - l * w
+        for dl, dc in C4:
+            nl, nc = l + dl, c + dc
+            if nl >= 0 and nc >= 0 and nl < h and nc < w:
+                q = nl * w + nc
+                if zpar[q] != -1:
+                    r = _find(zpar, q)
+                    if r != p:
+                        parent[r] = p
+                        zpar[r] = p
+
+    # canonicalization
+    for i in range(n):
+        p = R[i]
+        q = parent[p]
+        if flat[parent[q]] == flat[q]:
+            parent[p] = parent[q]
+    return parent
+
+
+@njit(nogil=True, cache=True)
+def _nodes(R: np.ndarray, parent: np.ndarray, u: np.ndarray):
+    # Numbers the nodes in the order R (a parent before its children).
+    # Returns the node of each face, and the parent and level of each node.
+    flat = u.ravel()
+    n = R.size
+    node = np.empty(n, dtype=np.int64)
+    node_parent = np.empty(n, dtype=np.int64)
+    level = np.empty(n, dtype=u.dtype)
+    nnodes = 0
+    for i in range(n):
+        p = R[i]
+        q = parent[p]
+        if p == q or flat[q] != flat[p]:
+            # canonical face
+            node[p] = nnodes
+            node_parent[nnodes] = node[q] if p != q else nnodes
+            level[nnodes] = flat[p]
+            nnodes += 1
+        else:
+            node[p] = node[q]
+
+    return node, node_parent[:nnodes].copy(), level[:nnodes].copy()
+
+
+@njit(nogil=True, cache=True)
+def _tree_distance(
+    node_parent: np.ndarray, level: np.ndarray, sources: np.ndarray
+) -> np.ndarray:
+    # Distance on the tree from each node to the closest source node, the edge
+    # between a node and its parent weighing their difference of levels. A
+    # pass from the leaves to the root gives the distance to the sources of
+    # each subtree, a pass from the root to the leaves completes it.
+    n = node_parent.size
+    INF = np.iinfo(np.int64).max
+    dist = np.full(n, INF, dtype=np.int64)
+    for s in sources:
+        dist[s] = 0
+    for k in range(n - 1, 0, -1):
+        if dist[k] != INF:
+            p = node_parent[k]
+            d = dist[k] + abs(np.int64(level[k]) - np.int64(level[p]))
+            if d < dist[p]:
+                dist[p] = d
+    for k in range(1, n):
+        p = node_parent[k]
+        if dist[p] != INF:
+            d = dist[p] + abs(np.int64(level[k]) - np.int64(level[p]))
+            if d < dist[k]:
+                dist[k] = d
+    return dist
+
+
+class TreeOfShapes:
+    """Tree of shapes of an image, built on its immersion from the face (0, 0).
+
+    distance gives the distance between faces in the tree: the sum of the
+    differences of levels along the path between their nodes, in two passes
+    over the nodes and a pass over the faces.
+
+    From the root (0, 0), it is the level lines distance. From other seeds,
+    it is not: the saddles of the image and the levels of the faces are
+    resolved as seen from (0, 0) instead of from the seeds, and the tree
+    distance can be smaller or larger than the LLDT of the seeds. On 64x64
+    images and 1 to 5 random seeds, it differs from the flood on 20 to 90% of
+    the faces, by 4 to 15% of the total distance on smooth images, 10 to 30%
+    on piecewise-constant ones and 40 to 50% on noise. The LLDT of arbitrary
+    seeds is given by level_lines_distance_transform.
+    """
+
+    def __init__(self, img: np.ndarray):
+        m, M = immersion(img)
+        if np.issubdtype(m.dtype, np.integer) and m.dtype.itemsize <= 2:
+            info = np.iinfo(m.dtype)
+            vmin, nlevels = int(info.min), int(info.max) - int(info.min) + 1
+        else:
+            vmin = int(m.min())
+            nlevels = int(M.max()) - vmin + 1
+        R, u = _sort(m, M, nlevels, vmin)
+        parent = _parents(R, u)
+        node, self.parent, self.level = _nodes(R, parent, u)
+        dtype = np.int32 if self.parent.size < 2**31 else np.int64
+        self.node = node.reshape(m.shape).astype(dtype)
+
+    @property
+    def nnodes(self) -> int:
+        return self.parent.size
+
+    @property
+    def nbytes(self) -> int:
+        return self.node.nbytes + self.parent.nbytes + self.level.nbytes
+
+    def distance(
+        self, seeds: np.ndarray = [(0, 0)], pixels_only: bool = False, dtype=np.uint32
+    ) -> np.ndarray:
+        # Distances in the tree from the seeds (faces of the immersion) to
+        # all the faces, or only to the 2-faces with pixels_only: the LLDT for
+        # the seed (0, 0) only (see above). Faces
+        # not reached (when there are no seeds) are set to the largest value
+        # of dtype.
+        seeds = np.asarray(seeds, dtype=np.int64).reshape(-1, 2)
+        assert np.all((seeds >= 0) & (seeds < self.node.shape))
+        node = self.node[::2, ::2] if pixels_only else self.node
+        if seeds.shape[0] == 0:
+            return np.full(node.shape, np.iinfo(dtype).max, dtype=dtype)
+        dist = _tree_distance(
+            self.parent, self.level, self.node[seeds[:, 0], seeds[:, 1]]
+        )
+        if dist.max() >= np.iinfo(dtype).max:
+            raise OverflowError(f"Distances do not fit in {np.dtype(dtype)}")
+        return dist.astype(dtype)[node]
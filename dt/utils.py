@@ -1,7 +1,10 @@
 import numpy as np
 
+from .instrument import stage
+
 C4 = ((0, -1), (1, 0), (0, 1), (-1, 0))
 C8 = ((0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1))
+C6 = ((0, 0, -1), (0, 1, 0), (0, 0, 1), (0, -1, 0), (1, 0, 0), (-1, 0, 0))
 
 
 def in_domain(shape: tuple[int, int], l: int, c: int) -> bool:
@@ -22,14 +25,56 @@ def is_2_face(l: int, c: int) -> bool:
 
 
 def get_coordinates(mask: np.ndarray) -> np.ndarray:
-    ml, mc = np.where(mask == 1)
-    return np.vstack((ml, mc)).T
+    return np.argwhere(mask == 1)
+
+
+def get_immersed_coordinates(mask: np.ndarray) -> np.ndarray:
+    # Same as get_coordinates(immersion(mask)[1] > 0) for a 0/1 mask (of any
+    # dimension), without building the immersed mask: a pixel p gives the
+    # face 2p and the faces around it, in raster order.
+    with stage("seeds"):
+        shape = tuple(2 * n - 1 for n in mask.shape)
+        pixels = np.argwhere(mask == 1)
+        offsets = np.indices((3,) * mask.ndim).reshape(mask.ndim, -1).T - 1
+        faces = 2 * pixels[:, None] + offsets
+        valid = np.all((faces >= 0) & (faces < shape), axis=2)
+        p = np.unique(np.ravel_multi_index(tuple(faces[valid].T), shape))
+        return np.column_stack(np.unravel_index(p, shape))
 
 
 def get_marker_image(img: np.ndarray, markers: np.ndarray):
     res = np.empty((img.shape[0], img.shape[1], 3), dtype=np.uint8)
-    for i in range(3):
-        res[:, :, i] = img
+    if img.ndim == 3:
+        # Color image
+        res[:] = img[:, :, :3]
+    else:
+        for i in range(3):
+            res[:, :, i] = img
     res[markers == 1] = [0, 0, 255]
     res[markers == 2] = [255, 0, 0]
     return res
+
+
+def _as_roi(
+    roi, shape: tuple[int, int]
+) -> tuple[np.ndarray, tuple[int, int, int, int]]:
+    # A region of interest is either a bounding box (l0, c0, l1, c1), covering
+    # the rows [l0, l1) and the columns [c0, c1), or a boolean mask of the
+    # given shape. Returns the mask (empty for a box or no roi) and the
+    # bounding box.
+    h, w = shape
+    if roi is None:
+        return np.empty((0, 0), dtype=np.bool_), (0, 0, h, w)
+    if isinstance(roi, np.ndarray) and roi.ndim == 2:
+        if roi.shape != shape:
+            raise ValueError(f"roi has shape {roi.shape} instead of {shape}")
+        roi = roi.astype(np.bool_, copy=False)
+        rows = np.flatnonzero(roi.any(axis=1))
+        cols = np.flatnonzero(roi.any(axis=0))
+        if rows.size == 0:
+            return roi, (0, 0, 0, 0)
+        return roi, (rows[0], cols[0], rows[-1] + 1, cols[-1] + 1)
+    l0, c0, l1, c1 = (int(v) for v in roi)
+    l0, c0 = max(l0, 0), max(c0, 0)
+    l1, c1 = min(l1, h), min(c1, w)
+    return np.empty((0, 0), dtype=np.bool_), (l0, c0, max(l1, l0), max(c1, c0))
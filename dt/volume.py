@@ -0,0 +1,167 @@
+import numpy as np
+from numba import njit
+
+from .level_lines_distance_transform import (
+    _as_seeds,
+    _buffers,
+    _flood,
+    _levels,
+    _stack_seeds,
+)
+from .geodesic_distance_transform import _distances
+
+# Transforms of 3D volumes (z, l, c), over the cubical complex given by
+# immersion: 6-connected faces for the LLDT, 6 or 26-connected voxels for the
+# GDT. A 512^3 volume has about 10^9 faces, so the distances are only kept
+# at the voxels when asked, and the implicit LLDT never builds the immersion.
+# The LLDT is the flood of the 2D transforms, over the faces of the volume.
+
+
+def _half_mask(connectivity: int) -> np.ndarray:
+    # Neighbours before a voxel in raster order, the ones after being their
+    # opposites
+    if connectivity == 6:
+        return np.array([(-1, 0, 0), (0, -1, 0), (0, 0, -1)], dtype=np.int64)
+    if connectivity == 26:
+        offsets = np.indices((3, 3, 3)).reshape(3, -1).T - 1
+        return offsets[:13].copy()
+    raise ValueError(f"Connectivity must be 6 or 26, not {connectivity}")
+
+
+def level_lines_distance_transform_3d(
+    m: np.ndarray,
+    M: np.ndarray,
+    seeds: np.ndarray = [(0, 0, 0)],
+    out: np.ndarray | None = None,
+    dist_out: np.ndarray | None = None,
+    dtype=np.uint32,
+    return_levels: bool = True,
+    max_distance: int | None = None,
+) -> tuple[np.ndarray | None, np.ndarray]:
+    # level_lines_distance_transform of the immersion (m, M) of a volume,
+    # seeds being faces (z, l, c), with the same buffer options
+    seeds = _as_seeds(seeds, m.shape)
+    F, D = _buffers(m.shape, dtype, out, dist_out, m.dtype, return_levels)
+    no_labels = np.empty((0,) * 3, dtype=np.uint8)
+    _flood(
+        m,
+        M,
+        False,
+        _stack_seeds([seeds]),
+        F[None],
+        D[None],
+        no_labels,
+        no_labels.ravel(),
+        _levels(m, M),
+        max_distance=max_distance,
+    )
+    return (F if return_levels else None), D
+
+
+def implicit_level_lines_distance_transform_3d(
+    img: np.ndarray,
+    seeds: np.ndarray = [(0, 0, 0)],
+    pixels_only: bool = False,
+    out: np.ndarray | None = None,
+    dist_out: np.ndarray | None = None,
+    dtype=np.uint32,
+    return_levels: bool = True,
+    max_distance: int | None = None,
+) -> tuple[np.ndarray | None, np.ndarray]:
+    # Same as level_lines_distance_transform_3d(*immersion(img), seeds), the
+    # intervals of the faces being computed from the volume when they are
+    # reached. With pixels_only, F and D are only kept at the voxels: with
+    # return_levels=False and dtype=np.uint16, a 512^3 volume then needs
+    # 256 MB for D and 128 MB for the faces already reached.
+    shape = tuple(2 * n - 1 for n in img.shape)
+    seeds = _as_seeds(seeds, shape)
+    F, D = _buffers(
+        img.shape if pixels_only else shape,
+        dtype,
+        out,
+        dist_out,
+        img.dtype,
+        return_levels,
+    )
+    no_labels = np.empty((0,) * 3, dtype=np.uint8)
+    _flood(
+        img,
+        img,
+        True,
+        _stack_seeds([seeds]),
+        F[None],
+        D[None],
+        no_labels,
+        no_labels.ravel(),
+        _levels(img, img),
+        max_distance=max_distance,
+    )
+    return (F if return_levels else None), D
+
+
+@njit(nogil=True, cache=True)
+def _iter(
+    img: np.ndarray,
+    dist: np.ndarray,
+    offsets: np.ndarray,
+    max_distance: float,
+    forward: bool,
+) -> float:
+    # One raster pass over the volume, forward or backward, each voxel taking
+    # its distance from the neighbours already visited
+    d, h, w = img.shape
+    sign = 1 if forward else -1
+    delta = 0.0
+    for i in range(d):
+        z = i if forward else d - 1 - i
+        for j in range(h):
+            l = j if forward else h - 1 - j
+            for k in range(w):
+                c = k if forward else w - 1 - k
+                v = np.float64(img[z, l, c])
+                best = dist[z, l, c]
+                for o in range(offsets.shape[0]):
+                    nz = z + sign * offsets[o, 0]
+                    nl = l + sign * offsets[o, 1]
+                    nc = c + sign * offsets[o, 2]
+                    if nz >= 0 and nl >= 0 and nc >= 0 and nz < d and nl < h and nc < w:
+                        d_new = dist[nz, nl, nc] + abs(v - np.float64(img[nz, nl, nc]))
+                        if d_new < best and d_new <= max_distance:
+                            best = d_new
+                if best < dist[z, l, c]:
+                    # Rounded to the precision of dist, best may not be
+                    # smaller, which must not count as a change
+                    old = dist[z, l, c]
+                    dist[z, l, c] = best
+                    delta = max(delta, old - dist[z, l, c])
+    return delta
+
+
+def geodesic_distance_transform_3d(
+    img: np.ndarray,
+    mask: np.ndarray,
+    connectivity: int = 26,
+    max_sweeps: int | None = None,
+    tol: float = 0.0,
+    out: np.ndarray | None = None,
+    max_distance: float | None = None,
+) -> np.ndarray:
+    # geodesic_distance_transform of a volume with raster sweeps, over the 6
+    # or 26 neighbours of each voxel. The distances are float32, or written
+    # to out (float32 or float64).
+    offsets = _half_mask(connectivity)
+    res = _distances(img.shape, out)
+    res[mask] = 0
+    max_distance = np.inf if max_distance is None else float(max_distance)
+    if img.dtype == np.bool_:
+        img = img.view(np.uint8)
+
+    n = 0
+    changed = True
+    while changed and (max_sweeps is None or n < max_sweeps):
+        d1 = _iter(img, res, offsets, max_distance, True)
+        d2 = _iter(img, res, offsets, max_distance, False)
+        changed = max(d1, d2) > tol
+        n += 1
+
+    return res
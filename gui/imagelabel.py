@@ -1,5 +1,6 @@
+import numpy as np
 from PySide6.QtWidgets import QLabel
-from PySide6.QtGui import QPixmap, QPainter, QColor
+from PySide6.QtGui import QPixmap, QPainter, QColor, QImage
 from PySide6.QtCore import Qt, Signal
 
 
@@ -10,9 +11,12 @@ class ImageLabel(QLabel):
         super().__init__(parent)
         self._pix = None
         self._orig_pix = None
+        self._labels = None
+        self._label_image = None
         self._has_painting = False
         self.drawing = False
         self.brush_color = QColor("blue")
+        self.brush_label = 1
         self.brush_radius = 8
 
     def set_brush_radius(self, r: int):
@@ -23,16 +27,36 @@ class ImageLabel(QLabel):
     def set_brush_color(self, color: QColor):
         self.brush_color = color
 
+    def set_brush_label(self, label: int):
+        self.brush_label = int(label)
+
+    @property
+    def markers(self) -> np.ndarray | None:
+        # Label of each pixel: 0 where nothing is painted, else the brush label
+        # of the last stroke over it
+        if self._labels is None:
+            return None
+        return self._labels[:, : self._pix.width()]
+
     def setPixmap(self, pixmap: QPixmap):
         # Keep an editable copy of the pixmap
         if pixmap is None:
             self._pix = None
             self._orig_pix = None
+            self._labels = None
+            self._label_image = None
             super().setPixmap(pixmap)
             return
         # keep original and editable copy
         self._orig_pix = pixmap.copy()
         self._pix = self._orig_pix.copy()
+        # Strokes are drawn the same way in a label image sharing the buffer
+        # of the markers, with rows padded to 4 bytes for QImage
+        w, h = pixmap.width(), pixmap.height()
+        self._labels = np.zeros((h, (w + 3) // 4 * 4), dtype=np.uint8)
+        self._label_image = QImage(
+            self._labels.data, w, h, self._labels.shape[1], QImage.Format_Grayscale8
+        )
         # reset painting state for new image
         self._has_painting = False
         try:
@@ -46,6 +70,7 @@ class ImageLabel(QLabel):
         if self._orig_pix is None:
             return
         self._pix = self._orig_pix.copy()
+        self._labels.fill(0)
         super().setPixmap(self._pix)
         if getattr(self, "_has_painting", False):
             self._has_painting = False
@@ -72,12 +97,17 @@ class ImageLabel(QLabel):
     def _paint_at(self, x, y):
         if self._pix is None:
             return
-        painter = QPainter(self._pix)
-        painter.setBrush(self.brush_color)
-        painter.setPen(Qt.NoPen)
         r = self.brush_radius
-        painter.drawEllipse(x - r, y - r, r * 2, r * 2)
-        painter.end()
+        k = self.brush_label
+        for device, color in (
+            (self._pix, self.brush_color),
+            (self._label_image, QColor(k, k, k)),
+        ):
+            painter = QPainter(device)
+            painter.setBrush(color)
+            painter.setPen(Qt.NoPen)
+            painter.drawEllipse(x - r, y - r, r * 2, r * 2)
+            painter.end()
         super().setPixmap(self._pix)
         if not getattr(self, "_has_painting", False):
             self._has_painting = True
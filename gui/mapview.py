@@ -0,0 +1,151 @@
+import math
+
+from PySide6.QtWidgets import QFrame, QGraphicsItem, QGraphicsScene, QGraphicsView
+from PySide6.QtGui import QImage, QPainter
+from PySide6.QtCore import QRect, QRectF, Qt, QTimer
+
+# Side of the tiles the levels are split into, so that only the visible
+# tiles are drawn
+TILE = 1024
+
+# Levels are halved until their largest side is below this
+MIN_LEVEL_SIZE = 256
+
+# Delay before the view is fitted again after its last resize (ms)
+RESIZE_DELAY = 100
+
+
+class _Tile(QGraphicsItem):
+    # Part of a level of the pyramid, drawn from the level itself: no copy of
+    # the image is made, and only the tiles in view are drawn
+
+    def __init__(self, image: QImage, rect: QRect):
+        super().__init__()
+        self._image = image
+        self._rect = rect
+
+    def boundingRect(self) -> QRectF:
+        return QRectF(0, 0, self._rect.width(), self._rect.height())
+
+    def paint(self, painter, option, widget=None):
+        painter.drawImage(self.boundingRect(), self._image, QRectF(self._rect))
+
+
+class MapView(QGraphicsView):
+    """View of a (possibly huge) image, with zoom (wheel) and pan (drag).
+
+    The image is shown through a pyramid of levels, each one half the size of
+    the previous one and split into tiles, drawn from the level closest to the
+    zoom. The first level is the image itself, which must outlive the view.
+    The image is fitted to the view until it is zoomed, and fitted again on a
+    double click. Fitting after a resize is delayed until the resize ends,
+    and skipped while the view is hidden.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setScene(QGraphicsScene(self))
+        self.setFrameShape(QFrame.NoFrame)
+        self.setAlignment(Qt.AlignCenter)
+        self.setDragMode(QGraphicsView.ScrollHandDrag)
+        self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
+        self.setRenderHint(QPainter.SmoothPixmapTransform)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+
+        self._levels = []
+        self._level = -1
+        self._fit = True
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(RESIZE_DELAY)
+        self._timer.timeout.connect(self._refresh)
+
+    def set_image(self, image: QImage):
+        scene = self.scene()
+        scene.clear()
+        self._levels = []
+        self._level = -1
+        if image is None or image.isNull():
+            return
+
+        # Pyramid of the image, level k being drawn scaled by 2^k
+        level = image
+        scale = 1
+        while True:
+            items = []
+            for y in range(0, level.height(), TILE):
+                for x in range(0, level.width(), TILE):
+                    rect = QRect(
+                        x,
+                        y,
+                        min(TILE, level.width() - x),
+                        min(TILE, level.height() - y),
+                    )
+                    item = _Tile(level, rect)
+                    item.setPos(x * scale, y * scale)
+                    item.setScale(scale)
+                    item.setVisible(False)
+                    scene.addItem(item)
+                    items.append(item)
+            self._levels.append(items)
+            if max(level.width(), level.height()) <= MIN_LEVEL_SIZE:
+                break
+            level = level.scaled(
+                max(level.width() // 2, 1),
+                max(level.height() // 2, 1),
+                Qt.IgnoreAspectRatio,
+                Qt.SmoothTransformation,
+            )
+            scale *= 2
+
+        scene.setSceneRect(0, 0, image.width(), image.height())
+        self._fit = True
+        self._refresh()
+
+    def _refresh(self):
+        if not self.isVisible() or not self._levels:
+            return
+        if self._fit:
+            self.fitInView(self.sceneRect(), Qt.KeepAspectRatio)
+        self._update_level()
+
+    def _update_level(self):
+        # Level with at least one of its pixels per pixel of the view
+        zoom = self.transform().m11()
+        level = int(math.floor(math.log2(1 / zoom))) if zoom < 1 else 0
+        level = min(max(level, 0), len(self._levels) - 1)
+        if level == self._level:
+            return
+        for k, items in enumerate(self._levels):
+            for item in items:
+                item.setVisible(k == level)
+        self._level = level
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self._fit:
+            self._timer.start()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._refresh()
+
+    def wheelEvent(self, event):
+        if not self._levels:
+            return
+        factor = 1.25 ** (event.angleDelta().y() / 120)
+        self._fit = False
+        self.scale(factor, factor)
+        # Zooming out further than the whole image fits it again
+        rect = self.mapFromScene(self.sceneRect()).boundingRect()
+        if rect.width() <= self.viewport().width() and (
+            rect.height() <= self.viewport().height()
+        ):
+            self._fit = True
+            self.fitInView(self.sceneRect(), Qt.KeepAspectRatio)
+        self._update_level()
+
+    def mouseDoubleClickEvent(self, event):
+        self._fit = True
+        self._refresh()
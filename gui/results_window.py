@@ -1,6 +1,5 @@
 import os
 import numpy as np
-import matplotlib.cm as cm
 from PySide6.QtWidgets import (
     QMainWindow,
     QWidget,
@@ -12,9 +11,25 @@ from PySide6.QtWidgets import (
     QFileDialog,
     QMessageBox,
 )
-from PySide6.QtGui import QPixmap, QImage
+from PySide6.QtGui import QFontDatabase, QImage
 from PySide6.QtCore import Qt
 
+from dt import stage
+
+from .colormap import render, render_ratio
+from .mapview import MapView
+
+# File names of the saved images
+_FILE_NAMES = {
+    "markers": "markers.png",
+    "fg": "fg.png",
+    "bg": "bg.png",
+    "prob": "probability.png",
+    "fg_geos": "fg_geos.png",
+    "bg_geos": "bg_geos.png",
+    "prob_geos": "probability_geos.png",
+}
+
 
 class ResultsWindow(QMainWindow):
     def __init__(
@@ -54,20 +69,13 @@ class ResultsWindow(QMainWindow):
         self.lbl_bg_geos = QLabel("Geodesic Background")
         self.lbl_prob_geos = QLabel("Geodesic Probability")
 
-        self.img_markers = QLabel()
-        self.img_markers.setAlignment(Qt.AlignCenter)
-        self.img_fg = QLabel()
-        self.img_fg.setAlignment(Qt.AlignCenter)
-        self.img_bg = QLabel()
-        self.img_bg.setAlignment(Qt.AlignCenter)
-        self.img_prob = QLabel()
-        self.img_prob.setAlignment(Qt.AlignCenter)
-        self.img_fg_geos = QLabel()
-        self.img_fg_geos.setAlignment(Qt.AlignCenter)
-        self.img_bg_geos = QLabel()
-        self.img_bg_geos.setAlignment(Qt.AlignCenter)
-        self.img_prob_geos = QLabel()
-        self.img_prob_geos.setAlignment(Qt.AlignCenter)
+        self.img_markers = MapView()
+        self.img_fg = MapView()
+        self.img_bg = MapView()
+        self.img_prob = MapView()
+        self.img_fg_geos = MapView()
+        self.img_bg_geos = MapView()
+        self.img_prob_geos = MapView()
 
         # First row: LLDT results
         grid.addWidget(self.lbl_markers, 0, 0)
@@ -89,6 +97,13 @@ class ResultsWindow(QMainWindow):
 
         layout.addLayout(grid)
 
+        # Stages recorded when the computation was profiled
+        self.profile_label = QLabel()
+        self.profile_label.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.profile_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.profile_label.hide()
+        layout.addWidget(self.profile_label)
+
         btn_h = QHBoxLayout()
         self.save_btn = QPushButton("Save Images")
         self.save_btn.clicked.connect(self._on_save)
@@ -100,99 +115,64 @@ class ResultsWindow(QMainWindow):
 
         self._update_display()
 
-    def _normalize_to_uint8(self, arr: np.ndarray) -> np.ndarray:
-        if arr is None:
-            return None
-        a = arr.astype(np.float64)
-        mn = a.min()
-        mx = a.max()
-        if mx == mn:
-            return np.zeros(a.shape, dtype=np.uint8)
-        norm = ((a - mn) / (mx - mn) * 255.0).astype(np.uint8)
-        return norm
+    def set_profile(self, text: str):
+        self.profile_label.setText(text)
+        self.profile_label.setVisible(bool(text))
 
     def _array_to_qimage(self, arr: np.ndarray) -> QImage:
+        # The QImage shares the buffer of arr, which must outlive it
         if arr is None:
             return QImage()
         if arr.ndim == 2:
             h, w = arr.shape
-            arr2 = arr.copy()
-            return QImage(arr2.data, w, h, w, QImage.Format_Grayscale8).copy()
+            return QImage(arr.data, w, h, w, QImage.Format_Grayscale8)
         elif arr.ndim == 3 and arr.shape[2] == 3:
             h, w, _ = arr.shape
-            arr2 = arr.copy()
-            return QImage(arr2.data, w, h, 3 * w, QImage.Format_RGB888).copy()
+            return QImage(arr.data, w, h, 3 * w, QImage.Format_RGB888)
         else:
             return QImage()
 
-    def _update_display(self):
-        # build original pixmaps from arrays (keep originals for scaling)
-        q_markers = self._array_to_qimage(self.marker_image)
-        self._pix_markers = (
-            QPixmap.fromImage(q_markers) if not q_markers.isNull() else None
-        )
-
-        # use inferno colormap for LLDT displays and store original pixmaps
-        cmap = cm.get_cmap("inferno")
-        cmap_r = cm.get_cmap("inferno_r")
-        self._pix_fg = None
-        self._pix_bg = None
-        self._pix_prob = None
-        if self.D_fg is not None:
-            fg_norm = self._normalize_to_uint8(self.D_fg)
-            fg_rgb = (cmap(fg_norm / 255.0)[..., :3] * 255).astype(np.uint8)
-            qfg = self._array_to_qimage(fg_rgb)
-            self._pix_fg = QPixmap.fromImage(qfg)
-        if self.D_bg is not None:
-            bg_norm = self._normalize_to_uint8(self.D_bg)
-            bg_rgb = (cmap(bg_norm / 255.0)[..., :3] * 255).astype(np.uint8)
-            qbg = self._array_to_qimage(bg_rgb)
-            self._pix_bg = QPixmap.fromImage(qbg)
-
-        # Compute probability: D_fg / (D_fg + D_bg)
+    def _render_images(self):
+        # Render each map once, as (QImage, buffer) pairs used both for the
+        # display and for saving
+        with stage("colormap"):
+            arrays = self._render_arrays()
+        self._images = {
+            name: (self._array_to_qimage(arr), arr) for name, arr in arrays.items()
+        }
+
+    def _render_arrays(self) -> dict[str, np.ndarray]:
+        arrays = {}
+        if self.marker_image is not None:
+            arrays["markers"] = np.ascontiguousarray(self.marker_image)
+        for name, D in (
+            ("fg", self.D_fg),
+            ("bg", self.D_bg),
+            ("fg_geos", self.D_fg_geos),
+            ("bg_geos", self.D_bg_geos),
+        ):
+            if D is not None:
+                arrays[name] = render(D)
+        # Probability: D_fg / (D_fg + D_bg)
         if self.D_fg is not None and self.D_bg is not None:
-            # Avoid division by zero
-            denom = self.D_fg.astype(np.float64) + self.D_bg.astype(np.float64)
-            prob = np.zeros_like(self.D_fg, dtype=np.float64)
-            mask = denom > 0
-            prob[mask] = self.D_fg[mask].astype(np.float64) / denom[mask]
-            # Normalize to [0, 255]
-            prob_uint8 = (prob * 255).astype(np.uint8)
-            prob_rgb = (cmap_r(prob)[..., :3] * 255).astype(np.uint8)
-            qprob = self._array_to_qimage(prob_rgb)
-            self._pix_prob = QPixmap.fromImage(qprob)
-
-        # Add geodesic distance transforms
-        self._pix_fg_geos = None
-        self._pix_bg_geos = None
-        self._pix_prob_geos = None
-        if self.D_fg_geos is not None:
-            fg_geos_norm = self._normalize_to_uint8(self.D_fg_geos)
-            fg_geos_rgb = (cmap(fg_geos_norm / 255.0)[..., :3] * 255).astype(np.uint8)
-            qfg_geos = self._array_to_qimage(fg_geos_rgb)
-            self._pix_fg_geos = QPixmap.fromImage(qfg_geos)
-        if self.D_bg_geos is not None:
-            bg_geos_norm = self._normalize_to_uint8(self.D_bg_geos)
-            bg_geos_rgb = (cmap(bg_geos_norm / 255.0)[..., :3] * 255).astype(np.uint8)
-            qbg_geos = self._array_to_qimage(bg_geos_rgb)
-            self._pix_bg_geos = QPixmap.fromImage(qbg_geos)
-
-        # Compute geodesic probability: D_fg_geos / (D_fg_geos + D_bg_geos)
+            arrays["prob"] = render_ratio(self.D_fg, self.D_bg)
         if self.D_fg_geos is not None and self.D_bg_geos is not None:
-            denom_geos = self.D_fg_geos.astype(np.float64) + self.D_bg_geos.astype(
-                np.float64
-            )
-            prob_geos = np.zeros_like(self.D_fg_geos, dtype=np.float64)
-            mask_geos = denom_geos > 0
-            prob_geos[mask_geos] = (
-                self.D_fg_geos[mask_geos].astype(np.float64) / denom_geos[mask_geos]
-            )
-            prob_geos_rgb = (cmap_r(prob_geos)[..., :3] * 255).astype(np.uint8)
-            qprob_geos = self._array_to_qimage(prob_geos_rgb)
-            self._pix_prob_geos = QPixmap.fromImage(qprob_geos)
+            arrays["prob_geos"] = render_ratio(self.D_fg_geos, self.D_bg_geos)
+        return arrays
 
-        # scale to the current label sizes
-        self._rescale_pixmaps()
+    def _update_display(self):
+        self._render_images()
+        for name, view in (
+            ("markers", self.img_markers),
+            ("fg", self.img_fg),
+            ("bg", self.img_bg),
+            ("prob", self.img_prob),
+            ("fg_geos", self.img_fg_geos),
+            ("bg_geos", self.img_bg_geos),
+            ("prob_geos", self.img_prob_geos),
+        ):
+            image = self._images.get(name)
+            view.set_image(image[0] if image is not None else None)
 
     def _on_save(self):
         d = QFileDialog.getExistingDirectory(
@@ -206,139 +186,11 @@ class ResultsWindow(QMainWindow):
                 self, "Directory not empty", "Please select an empty directory."
             )
             return
-        # save marker image (RGB)
-        try:
-            q_markers = self._array_to_qimage(self.marker_image)
-            q_markers.save(os.path.join(d, "markers.png"))
-        except Exception as e:
-            QMessageBox.warning(self, "Save error", f"Failed to save markers: {e}")
-            return
-        # save fg and bg if present
-        try:
-            cmap = cm.get_cmap("inferno")
-            if self.D_fg is not None:
-                fg_norm = self._normalize_to_uint8(self.D_fg)
-                fg_rgb = (cmap(fg_norm / 255.0)[..., :3] * 255).astype(np.uint8)
-                qfg = self._array_to_qimage(fg_rgb)
-                qfg.save(os.path.join(d, "fg.png"))
-            if self.D_bg is not None:
-                bg_norm = self._normalize_to_uint8(self.D_bg)
-                bg_rgb = (cmap(bg_norm / 255.0)[..., :3] * 255).astype(np.uint8)
-                qbg = self._array_to_qimage(bg_rgb)
-                qbg.save(os.path.join(d, "bg.png"))
-
-            # Save probability image
-            if self.D_fg is not None and self.D_bg is not None:
-                cmap_r = cm.get_cmap("inferno_r")
-                denom = self.D_fg.astype(np.float64) + self.D_bg.astype(np.float64)
-                prob = np.zeros_like(self.D_fg, dtype=np.float64)
-                mask = denom > 0
-                prob[mask] = self.D_fg[mask].astype(np.float64) / denom[mask]
-                prob_rgb = (cmap_r(prob)[..., :3] * 255).astype(np.uint8)
-                qprob = self._array_to_qimage(prob_rgb)
-                qprob.save(os.path.join(d, "probability.png"))
-
-            # Save geodesic distance transforms
-            if self.D_fg_geos is not None:
-                fg_geos_norm = self._normalize_to_uint8(self.D_fg_geos)
-                fg_geos_rgb = (cmap(fg_geos_norm / 255.0)[..., :3] * 255).astype(
-                    np.uint8
-                )
-                qfg_geos = self._array_to_qimage(fg_geos_rgb)
-                qfg_geos.save(os.path.join(d, "fg_geos.png"))
-            if self.D_bg_geos is not None:
-                bg_geos_norm = self._normalize_to_uint8(self.D_bg_geos)
-                bg_geos_rgb = (cmap(bg_geos_norm / 255.0)[..., :3] * 255).astype(
-                    np.uint8
-                )
-                qbg_geos = self._array_to_qimage(bg_geos_rgb)
-                qbg_geos.save(os.path.join(d, "bg_geos.png"))
-
-            # Save geodesic probability image
-            if self.D_fg_geos is not None and self.D_bg_geos is not None:
-                cmap_r = cm.get_cmap("inferno_r")
-                denom_geos = self.D_fg_geos.astype(np.float64) + self.D_bg_geos.astype(
-                    np.float64
-                )
-                prob_geos = np.zeros_like(self.D_fg_geos, dtype=np.float64)
-                mask_geos = denom_geos > 0
-                prob_geos[mask_geos] = (
-                    self.D_fg_geos[mask_geos].astype(np.float64) / denom_geos[mask_geos]
-                )
-                prob_geos_rgb = (cmap_r(prob_geos)[..., :3] * 255).astype(np.uint8)
-                qprob_geos = self._array_to_qimage(prob_geos_rgb)
-                qprob_geos.save(os.path.join(d, "probability_geos.png"))
-        except Exception as e:
-            QMessageBox.warning(
-                self, "Save error", f"Failed to save distance transforms: {e}"
-            )
-            return
+        # save the images rendered for the display
+        for name, (image, _) in self._images.items():
+            path = os.path.join(d, _FILE_NAMES[name])
+            if not image.save(path):
+                QMessageBox.warning(self, "Save error", f"Failed to save {path}")
+                return
 
         QMessageBox.information(self, "Saved", f"Images saved to {d}")
-
-    def _rescale_pixmaps(self):
-        # Scale stored original pixmaps to the label sizes while keeping aspect ratio
-        try:
-            if getattr(self, "_pix_markers", None) is not None:
-                target = self.img_markers.size()
-                if target.width() > 0 and target.height() > 0:
-                    self.img_markers.setPixmap(
-                        self._pix_markers.scaled(
-                            target, Qt.KeepAspectRatio, Qt.SmoothTransformation
-                        )
-                    )
-            if getattr(self, "_pix_fg", None) is not None:
-                target = self.img_fg.size()
-                if target.width() > 0 and target.height() > 0:
-                    self.img_fg.setPixmap(
-                        self._pix_fg.scaled(
-                            target, Qt.KeepAspectRatio, Qt.SmoothTransformation
-                        )
-                    )
-            if getattr(self, "_pix_bg", None) is not None:
-                target = self.img_bg.size()
-                if target.width() > 0 and target.height() > 0:
-                    self.img_bg.setPixmap(
-                        self._pix_bg.scaled(
-                            target, Qt.KeepAspectRatio, Qt.SmoothTransformation
-                        )
-                    )
-            if getattr(self, "_pix_prob", None) is not None:
-                target = self.img_prob.size()
-                if target.width() > 0 and target.height() > 0:
-                    self.img_prob.setPixmap(
-                        self._pix_prob.scaled(
-                            target, Qt.KeepAspectRatio, Qt.SmoothTransformation
-                        )
-                    )
-            if getattr(self, "_pix_fg_geos", None) is not None:
-                target = self.img_fg_geos.size()
-                if target.width() > 0 and target.height() > 0:
-                    self.img_fg_geos.setPixmap(
-                        self._pix_fg_geos.scaled(
-                            target, Qt.KeepAspectRatio, Qt.SmoothTransformation
-                        )
-                    )
-            if getattr(self, "_pix_bg_geos", None) is not None:
-                target = self.img_bg_geos.size()
-                if target.width() > 0 and target.height() > 0:
-                    self.img_bg_geos.setPixmap(
-                        self._pix_bg_geos.scaled(
-                            target, Qt.KeepAspectRatio, Qt.SmoothTransformation
-                        )
-                    )
-            if getattr(self, "_pix_prob_geos", None) is not None:
-                target = self.img_prob_geos.size()
-                if target.width() > 0 and target.height() > 0:
-                    self.img_prob_geos.setPixmap(
-                        self._pix_prob_geos.scaled(
-                            target, Qt.KeepAspectRatio, Qt.SmoothTransformation
-                        )
-                    )
-        except Exception:
-            pass
-
-    def resizeEvent(self, event):
-        super().resizeEvent(event)
-        # Rescale images when window is resized or maximized
-        self._rescale_pixmaps()
@@ -1,3 +1,5 @@
+import contextlib
+
 from PySide6.QtWidgets import (
     QMainWindow,
     QWidget,
@@ -6,24 +8,22 @@ from PySide6.QtWidgets import (
     QVBoxLayout,
     QRadioButton,
     QButtonGroup,
+    QCheckBox,
     QHBoxLayout,
     QSlider,
     QScrollArea,
     QFileDialog,
+    QMessageBox,
+    QProgressBar,
 )
 from PySide6.QtGui import QPixmap, QColor, QImage
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QThreadPool
 import numpy as np
 
-from dt import (
-    immersion,
-    level_lines_distance_transform,
-    geodesic_distance_transform,
-    get_coordinates,
-    get_marker_image,
-)
+from dt import PrecomputationCache, get_marker_image, record
 from .imagelabel import ImageLabel
 from .results_window import ResultsWindow
+from .worker import Task, compute_lldt, compute_gdt
 
 
 class ImageViewer(QMainWindow):
@@ -49,6 +49,10 @@ class ImageViewer(QMainWindow):
         self.compute_btn.clicked.connect(self._on_compute)
         layout.addWidget(self.compute_btn)
 
+        # Time, memory and statistics of the stages, shown with the results
+        self.profile_check = QCheckBox("Profile")
+        layout.addWidget(self.profile_check)
+
         # Brush controls (radio buttons)
         hbox = QHBoxLayout()
         self.fg_radio = QRadioButton("Foreground (Blue)")
@@ -62,10 +66,10 @@ class ImageViewer(QMainWindow):
         layout.addLayout(hbox)
         # connect toggles: only act when checked
         self.fg_radio.toggled.connect(
-            lambda checked: checked and self.set_brush_color(QColor("blue"))
+            lambda checked: checked and self.set_brush(QColor("blue"), 1)
         )
         self.bg_radio.toggled.connect(
-            lambda checked: checked and self.set_brush_color(QColor("red"))
+            lambda checked: checked and self.set_brush(QColor("red"), 2)
         )
 
         self.scroll = QScrollArea()
@@ -97,9 +101,30 @@ class ImageViewer(QMainWindow):
         size_hbox.addWidget(self.size_value_label)
         layout.addLayout(size_hbox)
 
+        # Loaded image, as a grayscale (h, w) or RGB (h, w, 3) array
+        self._image = None
+
+        # Background computation state
+        self._pool = QThreadPool(self)
+        self._generation = 0
+        self._tasks = []
+        self._results = {}
+        self._cache = PrecomputationCache()
+        # State of the last transforms of the image, by name, which the next
+        # computation updates when strokes were only added
+        self._maps = {}
+        self.progress_bar = QProgressBar()
+        self.progress_bar.hide()
+        self.statusBar().addPermanentWidget(self.progress_bar)
+
     def set_brush_color(self, qcolor: QColor):
         self.image_label.set_brush_color(qcolor)
 
+    def set_brush(self, qcolor: QColor, label: int):
+        # Color of the strokes, and label they give to the markers
+        self.image_label.set_brush_color(qcolor)
+        self.image_label.set_brush_label(label)
+
     def _on_size_changed(self, value: int):
         # update label and forward size to the image label
         self.size_value_label.setText(str(value))
@@ -111,122 +136,124 @@ class ImageViewer(QMainWindow):
             self.image_label.clear_painting()
 
     def _on_compute(self):
-        # Convert current image and painted markers into numpy arrays.
-        pix = getattr(self.image_label, "_pix", None)
-        orig = getattr(self.image_label, "_orig_pix", None)
-        if pix is None or orig is None:
+        # The markers are recorded by the image label as they are painted:
+        # 1 for foreground (blue), 2 for background (red)
+        img = self._image
+        markers = self.image_label.markers
+        if img is None or markers is None:
             return
+        # painting goes on while the transforms are computed
+        markers = markers.copy()
 
-        def qimage_to_array(qimg: QImage) -> np.ndarray:
-            img = qimg.convertToFormat(QImage.Format_ARGB32)
-            w = img.width()
-            h = img.height()
-            ptr = img.bits()
-            # ptr is a buffer/memoryview; create a numpy array view then copy
-            arr = np.frombuffer(ptr, dtype=np.uint8)
-            arr = arr.reshape((h, w, 4)).copy()
-            # arr is in BGRA order; convert to RGB
-            rgb = arr[:, :, :3][..., ::-1].copy()
-            return rgb
-
-        img_cur = pix.toImage()
-        img_orig = orig.toImage()
-        arr_cur = qimage_to_array(img_cur)
-        arr_orig = qimage_to_array(img_orig)
-
-        # Produce a grayscale image array to return/print.
-        if arr_cur.ndim == 3:
-            # color -> convert to luminance
-            arr_cur_gray = np.dot(arr_cur[..., :3], [0.299, 0.587, 0.114]).astype(
-                np.uint8
-            )
-        else:
-            arr_cur_gray = arr_cur
-
-        if arr_orig.ndim == 3:
-            arr_orig_gray = np.dot(arr_orig[..., :3], [0.299, 0.587, 0.114]).astype(
-                np.uint8
-            )
-        else:
-            arr_orig_gray = arr_orig
-
-        # Compute marker array: 1 for foreground (blue), 2 for background (red)
-        h, w = arr_cur_gray.shape[:2]
-        markers = np.zeros((h, w), dtype=np.uint8)
-
-        # detect pixels that changed due to painting
-        if arr_cur.ndim == 3 and arr_orig.ndim == 3:
-            changed = np.any(arr_cur != arr_orig, axis=2)
-        else:
-            changed = arr_cur_gray != arr_orig_gray
-
-        # If color info is available, detect blue/red painted pixels
-        if arr_cur.ndim == 3:
-            blue = np.array([0, 0, 255], dtype=int)
-            red = np.array([255, 0, 0], dtype=int)
-            cur_int = arr_cur.astype(int)
-            d_blue = np.sum((cur_int - blue) ** 2, axis=2)
-            d_red = np.sum((cur_int - red) ** 2, axis=2)
-            fg_mask = changed & (d_blue <= d_red)
-            bg_mask = changed & (d_red < d_blue)
-            markers[fg_mask] = 1
-            markers[bg_mask] = 2
-        else:
-            # fallback: mark any changed pixel as foreground (1)
-            markers[changed] = 1
-
-        # Prepare image and seeds for dahu level-lines distance transform.
-        # Use the original (unpainted) image so marker values do not corrupt
-        # the input used for immersion/LLDT computation.
-        img_for_dahu = arr_orig_gray.astype(np.uint16)
-
-        # build fg/bg masks and immerse them
-        fg_mask = (markers == 1).astype(np.uint8)
-        bg_mask = (markers == 2).astype(np.uint8)
-
-        # Compute immersion of image
-        m, M = immersion(img_for_dahu)
+        # Prepare image and seeds for dahu level-lines distance transform,
+        # from the loaded (unpainted) image
+        img_for_dahu = img.astype(np.uint16)
 
-        # Immerse the marker masks to match the notebook behavior
-        _, fg_K = immersion(fg_mask)
-        _, bg_K = immersion(bg_mask)
-
-        D_fg = None
-        D_bg = None
+        # Build the marker image displayed along the results
         try:
-            # Extract seeds from immersed marker images (matching notebook implementation)
-            if np.any(fg_K):
-                seeds_fg = get_coordinates(fg_K > 0)
-                _, D_fg = level_lines_distance_transform(m, M, seeds_fg)
-            if np.any(bg_K):
-                seeds_bg = get_coordinates(bg_K > 0)
-                _, D_bg = level_lines_distance_transform(m, M, seeds_bg)
-        except Exception as e:
-            print("Error computing LLDT:", e)
-
-        # Compute geodesic distance transform on the original image
-        D_fg_geos = None
-        D_bg_geos = None
-        try:
-            if np.any(fg_mask):
-                D_fg_geos = geodesic_distance_transform(img_for_dahu, fg_mask > 0)
-            if np.any(bg_mask):
-                D_bg_geos = geodesic_distance_transform(img_for_dahu, bg_mask > 0)
-        except Exception as e:
-            print("Error computing geodesic distance transform:", e)
-
-        # Display the marker image and LLDT results in a new window.
-        try:
-            marker_image = get_marker_image(arr_orig_gray, markers)
+            marker_image = get_marker_image(img, markers)
         except Exception as e:
             QMessageBox.warning(
                 self, "Marker error", f"Failed to build marker image:\n{e}"
             )
             return
 
+        # Run LLDT (with immersion) and GDT concurrently in the background,
+        # cancelling a computation that would still be running
+        self._cancel_compute()
+        self._results = {"markers": marker_image}
+        self._tasks = [
+            Task(
+                self._generation,
+                "lldt",
+                compute_lldt,
+                img_for_dahu,
+                markers,
+                self._cache,
+                self._maps.get("lldt"),
+            ),
+            Task(
+                self._generation,
+                "gdt",
+                compute_gdt,
+                img_for_dahu,
+                markers,
+                self._maps.get("gdt"),
+            ),
+        ]
+        self.progress_bar.setRange(0, 3)
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.statusBar().showMessage("Computing...")
+        for task in self._tasks:
+            task.profile = self.profile_check.isChecked()
+            task.signals.progress.connect(self._on_task_progress)
+            task.signals.finished.connect(self._on_task_finished)
+            task.signals.failed.connect(self._on_task_failed)
+            self._pool.start(task)
+
+        return img, markers
+
+    def _cancel_compute(self):
+        # Results of the previous generation are ignored from now on
+        self._generation += 1
+        for task in self._tasks:
+            task.cancel()
+        self._pool.clear()
+        self._tasks = []
+        self.progress_bar.hide()
+        self.statusBar().clearMessage()
+
+    def _on_task_progress(self, generation: int, message: str):
+        if generation != self._generation:
+            return
+        self.progress_bar.setValue(self.progress_bar.value() + 1)
+        self.statusBar().showMessage(message)
+
+    def _on_task_finished(self, generation: int, name: str, result):
+        if generation != self._generation:
+            return
+        self._results[name] = result[:2]
+        # A failed transform is computed anew next time
+        self._maps[name] = result[2] if len(result) > 2 else None
+        self.progress_bar.setValue(self.progress_bar.value() + 1)
+        self.statusBar().showMessage(f"{name.upper()} done")
+        if "lldt" in self._results and "gdt" in self._results:
+            self._show_results()
+
+    def _on_task_failed(self, generation: int, name: str, error: str):
+        if generation != self._generation:
+            return
+        print(f"Error computing {name.upper()}:", error)
+        self._on_task_finished(generation, name, (None, None))
+
+    def _show_results(self):
+        recorders = [
+            (task.name, task.recorder)
+            for task in self._tasks
+            if task.recorder is not None
+        ]
+        self._tasks = []
+        self.progress_bar.hide()
+        self.statusBar().clearMessage()
+        D_fg, D_bg = self._results["lldt"]
+        D_fg_geos, D_bg_geos = self._results["gdt"]
+
+        # Display the marker image and LLDT results in a new window.
         try:
             # Create the results window without a parent so it is independent
-            dlg = ResultsWindow(marker_image, D_fg, D_bg, D_fg_geos, D_bg_geos)
+            with record() if recorders else contextlib.nullcontext() as rec:
+                dlg = ResultsWindow(
+                    self._results["markers"], D_fg, D_bg, D_fg_geos, D_bg_geos
+                )
+            if recorders:
+                recorders.append(("display", rec))
+                dlg.set_profile(
+                    "\n".join(
+                        f"{name.upper()}\n{recorder.summary()}"
+                        for name, recorder in recorders
+                    )
+                )
             # Keep a reference so Python/GIL doesn't garbage-collect it while shown
             self._last_results_window = dlg
             # Ensure it is deleted when closed and show non-modally
@@ -237,7 +264,12 @@ class ImageViewer(QMainWindow):
                 self, "Display error", f"Failed to show results window:\n{e}"
             )
 
-        return arr_cur_gray, markers
+    def closeEvent(self, event):
+        # Drop pending work and wait for the running kernels, which stop soon
+        # after being cancelled
+        self._cancel_compute()
+        self._pool.waitForDone()
+        super().closeEvent(event)
 
     def open_image(self):
         file_path, _ = QFileDialog.getOpenFileName(
@@ -253,18 +285,32 @@ class ImageViewer(QMainWindow):
             self.image_label.setText("Failed to load image.")
             return
 
-        # If the image is color, convert it to grayscale
-        if qimg.format() != QImage.Format_Grayscale8:
-            try:
-                qimg = qimg.convertToFormat(QImage.Format_Grayscale8)
-            except Exception:
-                # fallback: keep original if conversion fails
-                pass
+        # Color images are kept in color: the transforms combine their
+        # channels (L1 norm of the differences)
+        color = not qimg.allGray()
+        fmt = QImage.Format_RGB888 if color else QImage.Format_Grayscale8
+        if qimg.format() != fmt:
+            qimg = qimg.convertToFormat(fmt)
 
         pix = QPixmap.fromImage(qimg)
         if pix.isNull():
             self.image_label.setText("Failed to load image.")
             return
+        # Image the transforms are computed on, (h, w) or (h, w, 3)
+        rows = np.frombuffer(qimg.constBits(), dtype=np.uint8).reshape(
+            qimg.height(), qimg.bytesPerLine()
+        )
+        if color:
+            self._image = (
+                rows[:, : 3 * qimg.width()]
+                .reshape(qimg.height(), qimg.width(), 3)
+                .copy()
+            )
+        else:
+            self._image = rows[:, : qimg.width()].copy()
+        # The maps of the previous image cannot be updated
+        self._cancel_compute()
+        self._maps = {}
         self.image_label.setPixmap(pix)
         self.image_label.adjustSize()
         self.setWindowTitle(f"Image Viewer - {file_path}")
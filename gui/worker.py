@@ -0,0 +1,195 @@
+import contextlib
+import threading
+
+import numpy as np
+from PySide6.QtCore import QObject, QRunnable, Signal
+
+from dt import (
+    PrecomputationCache,
+    level_lines_distance_transform,
+    level_lines_distance_transform_update,
+    geodesic_distance_transform,
+    geodesic_distance_transform_update,
+    multi_label_geodesic_distance_transform,
+    multivariate_level_lines_distance_transform,
+    get_immersed_coordinates,
+    record,
+)
+
+
+# Updated LLDT maps are flooded anew after this many updates in a row, so
+# that the approximation of the updates does not add up over the strokes
+_LLDT_REFRESH = 4
+
+
+class Cancelled(Exception):
+    pass
+
+
+class TaskSignals(QObject):
+    # All the signals carry the generation of the computation they belong to,
+    # so that results of a cancelled computation can be told apart.
+    progress = Signal(int, str)
+    finished = Signal(int, str, object)
+    failed = Signal(int, str, str)
+
+
+class Task(QRunnable):
+    """Run `fn(task, *args)` in a thread pool and report through signals.
+
+    `fn` may call `task.report(message)` after each stage and `task.check()`
+    between stages, which stops the task once it has been cancelled. The
+    transforms stop during a stage when given `cancel=task.flag`. When
+    `profile` is set, the stages of the transforms are recorded in
+    `task.recorder` (see dt.instrument).
+    """
+
+    def __init__(self, generation: int, name: str, fn, *args):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.generation = generation
+        self.name = name
+        self.signals = TaskSignals()
+        self._cancelled = threading.Event()
+        # Read by the compiled loops of the transforms
+        self.flag = np.zeros(1, dtype=np.bool_)
+        self._fn = fn
+        self._args = args
+        self.profile = False
+        self.recorder = None
+
+    def cancel(self):
+        self._cancelled.set()
+        self.flag[0] = True
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise Cancelled()
+
+    def report(self, message: str):
+        self.check()
+        self.signals.progress.emit(self.generation, message)
+
+    def run(self):
+        try:
+            self.check()
+            with record() if self.profile else contextlib.nullcontext() as rec:
+                self.recorder = rec
+                result = self._fn(self, *self._args)
+            self.check()
+        except Cancelled:
+            return
+        except Exception as e:
+            self.signals.failed.emit(self.generation, self.name, str(e))
+            return
+        self.signals.finished.emit(self.generation, self.name, result)
+
+
+def _added(previous: dict | None, markers: np.ndarray) -> list | None:
+    # Marker pixels of each label added since the previous computation, or
+    # None when there is nothing to update: no previous maps, or markers that
+    # were erased or relabelled, which the updates cannot take back
+    if previous is None:
+        return None
+    old = previous["markers"]
+    if old.shape != markers.shape or np.any((old != 0) & (old != markers)):
+        return None
+    return [(markers == k) & (old != k) for k in (1, 2)]
+
+
+def compute_lldt(
+    task: Task,
+    img: np.ndarray,
+    markers: np.ndarray,
+    cache: PrecomputationCache,
+    previous: dict | None = None,
+):
+    # Returns the maps of both labels and the state the next computation
+    # starts from. When strokes were only added since `previous` (the state
+    # of the last computation on the image), the maps are updated from the
+    # new seeds, which approximates the flood from all of them; they are
+    # flooded anew every _LLDT_REFRESH computations.
+
+    # Seeds are the faces of the immersed markers, taken directly from the
+    # marker pixels
+    seeds = [get_immersed_coordinates(markers == k) for k in (1, 2)]
+
+    if img.ndim == 3:
+        # Color image: marginal transform of its channels, label by label,
+        # always computed anew
+        D = [None, None]
+        for k in (0, 1):
+            if len(seeds[k]) > 0:
+                task.check()
+                _, D[k] = multivariate_level_lines_distance_transform(
+                    img, seeds[k], return_levels=False, cancel=task.flag
+                )
+        task.report("Channels flooded")
+        return D[0], D[1], None
+
+    # The immersion of the image is reused across computations
+    m, M = cache.immersion(img)
+    task.report("Immersion done")
+
+    added = _added(previous, markers)
+    if added is not None and previous["updates"] >= _LLDT_REFRESH:
+        added = None
+    # Levels and distances of each label, kept to be updated
+    layers = [None, None]
+    for k in (0, 1):
+        if len(seeds[k]) == 0:
+            continue
+        task.check()
+        if added is None or previous["layers"][k] is None:
+            layers[k] = level_lines_distance_transform(m, M, seeds[k], cancel=task.flag)
+            continue
+        # The previous maps may be displayed, they are updated as copies
+        F, D = (a.copy() for a in previous["layers"][k])
+        if added[k].any():
+            level_lines_distance_transform_update(
+                m, M, F, D, get_immersed_coordinates(added[k]), cancel=task.flag
+            )
+        layers[k] = F, D
+
+    state = {
+        "markers": markers,
+        "layers": layers,
+        "updates": 0 if added is None else previous["updates"] + 1,
+    }
+    D_fg = layers[0][1] if layers[0] is not None else None
+    D_bg = layers[1][1] if layers[1] is not None else None
+    return D_fg, D_bg, state
+
+
+def compute_gdt(
+    task: Task, img: np.ndarray, markers: np.ndarray, previous: dict | None = None
+):
+    # Returns the maps of both labels and the state the next computation
+    # starts from. When strokes were only added since `previous`, the maps
+    # are updated from the new marker pixels, which gives the transform of
+    # all of them.
+    if not np.any(markers):
+        return None, None, None
+
+    added = _added(previous, markers)
+    if added is None:
+        D = multi_label_geodesic_distance_transform(
+            img, markers, per_label=True, nlabels=2, cancel=task.flag
+        )
+        layers = [D[k] if np.any(markers == k + 1) else None for k in (0, 1)]
+    else:
+        layers = [None, None]
+        for k in (0, 1):
+            if not np.any(markers == k + 1):
+                continue
+            task.check()
+            if previous["layers"][k] is None:
+                layers[k] = geodesic_distance_transform(
+                    img, markers == k + 1, cancel=task.flag
+                )
+            else:
+                layers[k] = geodesic_distance_transform_update(
+                    img, previous["layers"][k].copy(), np.argwhere(added[k])
+                )
+
+    return layers[0], layers[1], {"markers": markers, "layers": layers}
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from dt import (
+    implicit_level_lines_distance_transform,
+    geodesic_distance_transform,
+    batch_level_lines_distance_transform,
+    batch_geodesic_distance_transform,
+    record,
+)
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16])
+def test_batch_matches_loop(dtype):
+    rng = np.random.default_rng(0)
+    imgs = rng.integers(0, np.iinfo(dtype).max, (5, 19, 23), endpoint=True)
+    imgs = imgs.astype(dtype)
+    masks = rng.random(imgs.shape) < 0.02
+    masks[:, 0, 0] = True
+    seeds = [np.argwhere(mask) * 2 for mask in masks]
+
+    F, D = batch_level_lines_distance_transform(imgs, seeds)
+    for img, s, F_img, D_img in zip(imgs, seeds, F, D):
+        F_ref, D_ref = implicit_level_lines_distance_transform(img, s)
+        np.testing.assert_array_equal(D_img, D_ref)
+        np.testing.assert_array_equal(F_img, F_ref)
+
+    for method in ("sweep", "dial"):
+        res = batch_geodesic_distance_transform(imgs, masks, method=method)
+        for img, mask, dist in zip(imgs, masks, res):
+            np.testing.assert_array_equal(
+                dist, geodesic_distance_transform(img, mask, method=method)
+            )
+
+
+def test_batch_records_queue_stats():
+    # The stage of the batch sums the queues of the images
+    rng = np.random.default_rng(1)
+    imgs = rng.integers(0, 256, (3, 15, 17)).astype(np.uint8)
+    seeds = [[(0, 0), (8, 20)]] * len(imgs)
+    pushes = 0
+    for img in imgs:
+        with record() as rec:
+            implicit_level_lines_distance_transform(img, seeds[0])
+        pushes += rec.stages[-1]["pushes"]
+    with record() as rec:
+        batch_level_lines_distance_transform(imgs, seeds)
+    (entry,) = [s for s in rec.stages if s["name"] == "lldt"]
+    assert entry["images"] == len(imgs)
+    assert entry["pushes"] == pushes
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"connectivity": 4},
+        {"connectivity": 16},
+        {"metric": "max"},
+        {"gamma": 0.5},
+        {"connectivity": 16, "gamma": 2.0},
+        {"method": "dial", "connectivity": 4},
+        {"method": "dial", "connectivity": 16},
+    ],
+)
+def test_batch_geodesic_options(options):
+    # The options reach the kernels of each image
+    rng = np.random.default_rng(2)
+    imgs = rng.integers(0, 256, (4, 17, 21)).astype(np.uint8)
+    masks = rng.random(imgs.shape) < 0.03
+    masks[:, 8, 10] = True
+    res = batch_geodesic_distance_transform(imgs, masks, **options)
+    for img, mask, dist in zip(imgs, masks, res):
+        np.testing.assert_array_equal(
+            dist, geodesic_distance_transform(img, mask, **options)
+        )
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"connectivity": 6},
+        {"metric": "l3"},
+        {"gamma": -1.0},
+        {"method": "dial", "gamma": 1.0},
+    ],
+)
+def test_batch_geodesic_rejects_options(options):
+    imgs = np.zeros((2, 5, 5), dtype=np.uint8)
+    with pytest.raises(ValueError):
+        batch_geodesic_distance_transform(imgs, imgs > 0, **options)
@@ -0,0 +1,43 @@
+import numpy as np
+
+from dt import immersion, PrecomputationCache
+
+
+def test_hits_on_the_same_content():
+    cache = PrecomputationCache()
+    img = np.random.default_rng(0).integers(0, 256, (20, 30)).astype(np.uint8)
+    m, M = cache.immersion(img)
+    m_ref, M_ref = immersion(img)
+    np.testing.assert_array_equal(m, m_ref)
+    np.testing.assert_array_equal(M, M_ref)
+    assert cache.nbytes == m.nbytes + M.nbytes
+
+    # A copy of the image hits, another image or dtype does not
+    assert cache.immersion(img.copy())[0] is m
+    assert cache.immersion(img.astype(np.uint16))[0] is not m
+    calls = []
+    cache.get(img, "other", lambda img: calls.append(img) or 1)
+    assert cache.get(img, "other", lambda img: calls.append(img) or 2) == 1
+    assert len(calls) == 1
+
+
+def test_evicts_least_recently_used():
+    rng = np.random.default_rng(1)
+    imgs = [rng.integers(0, 256, (20, 30)).astype(np.uint8) for _ in range(3)]
+    size = sum(a.nbytes for a in immersion(imgs[0]))
+    cache = PrecomputationCache(max_bytes=2 * size)
+    first = cache.immersion(imgs[0])
+    cache.immersion(imgs[1])
+    assert cache.immersion(imgs[0]) is first
+    # imgs[1] is now the least recently used
+    cache.immersion(imgs[2])
+    assert cache.nbytes == 2 * size
+    assert cache.immersion(imgs[0]) is first
+    second = cache.immersion(imgs[1])
+    assert cache.immersion(imgs[1]) is second
+
+    # The most recent image is kept even over the budget
+    cache = PrecomputationCache(max_bytes=1)
+    assert cache.immersion(imgs[0]) is cache.immersion(imgs[0])
+    cache.clear()
+    assert cache.nbytes == 0
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from dt import (
+    immersion,
+    get_immersed_coordinates,
+    implicit_level_lines_distance_transform,
+    level_lines_distance_transform,
+    geodesic_distance_transform,
+)
+from dt.cli import compute, load_markers, main
+
+
+@pytest.fixture
+def img():
+    return np.random.default_rng(0).integers(0, 256, (23, 31)).astype(np.uint8)
+
+
+@pytest.fixture
+def markers(img):
+    markers = np.zeros(img.shape, dtype=np.uint8)
+    markers[2:5, 3] = 1
+    markers[18, 20:26] = 2
+    return markers
+
+
+def test_load_color_markers(tmp_path, img, markers):
+    # The image painted as in the GUI: blue for the foreground, red for the
+    # background
+    painted = np.repeat(img[..., None], 3, axis=2)
+    painted[markers == 1] = (0, 0, 255)
+    painted[markers == 2] = (255, 0, 0)
+    Image.fromarray(painted).save(tmp_path / "a_markers.png")
+    np.testing.assert_array_equal(load_markers(tmp_path / "a_markers.png"), markers)
+
+    # Label images, as PNG or NPY
+    Image.fromarray(markers).save(tmp_path / "b_markers.png")
+    np.testing.assert_array_equal(load_markers(tmp_path / "b_markers.png"), markers)
+    np.save(tmp_path / "c_markers.npy", markers.astype(np.int64))
+    loaded = load_markers(tmp_path / "c_markers.npy")
+    np.testing.assert_array_equal(loaded, markers)
+    assert loaded.dtype == np.uint8
+
+
+@pytest.mark.parametrize("immersed", [False, True])
+def test_compute(img, markers, immersed):
+    res = compute(img, markers, immersed=immersed)
+    m, M = immersion(img)
+    for k in (1, 2):
+        seeds = get_immersed_coordinates(markers == k)
+        if immersed:
+            D = level_lines_distance_transform(m, M, seeds)[1]
+        else:
+            D = implicit_level_lines_distance_transform(img, seeds, pixels_only=True)[1]
+        np.testing.assert_array_equal(res["lldt"][k - 1], D)
+        np.testing.assert_array_equal(
+            res["gdt"][k - 1], geodesic_distance_transform(img, markers == k)
+        )
+
+
+def test_main(tmp_path, img, markers):
+    # Color markers next to the image, one npz per image
+    Image.fromarray(img).save(tmp_path / "a.png")
+    painted = np.repeat(img[..., None], 3, axis=2)
+    painted[markers == 1] = (0, 0, 255)
+    painted[markers == 2] = (255, 0, 0)
+    Image.fromarray(painted).save(tmp_path / "a_markers.png")
+
+    assert main([str(tmp_path), "-o", str(tmp_path / "out"), "--workers", "1"]) == 0
+    res = np.load(tmp_path / "out" / "a.npz")
+    expected = compute(img, markers)
+    assert sorted(res.files) == ["gdt", "lldt"]
+    for name in ("lldt", "gdt"):
+        np.testing.assert_array_equal(res[name], expected[name])
@@ -0,0 +1,211 @@
+import numpy as np
+import pytest
+
+from dt import (
+    geodesic_distance_transform,
+    geodesic_distance_transform_update,
+    multi_label_geodesic_distance_transform,
+    record,
+)
+
+
+def _markers(rng, shape, n=6):
+    mask = np.zeros(shape, dtype=np.bool_)
+    mask[rng.integers(0, shape[0], n), rng.integers(0, shape[1], n)] = True
+    return mask
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.float32])
+@pytest.mark.parametrize("shape", [(150, 131), (64, 64), (7, 200)])
+def test_parallel_sweeps_match(dtype, shape):
+    # The tiles of the parallel passes see the same values as the serial ones
+    rng = np.random.default_rng(0)
+    img = (rng.random(shape) * 255).astype(dtype)
+    mask = _markers(rng, shape)
+    serial = geodesic_distance_transform(img, mask)
+    parallel = geodesic_distance_transform(img, mask, parallel=True)
+    np.testing.assert_array_equal(parallel, serial)
+
+    labels = mask * rng.integers(1, 4, shape)
+    L, D = multi_label_geodesic_distance_transform(img, labels)
+    L_par, D_par = multi_label_geodesic_distance_transform(img, labels, parallel=True)
+    np.testing.assert_array_equal(D_par, D)
+    np.testing.assert_array_equal(L_par, L)
+
+
+@pytest.mark.parametrize("method", ["sweep", "dial"])
+def test_multi_label(method):
+    rng = np.random.default_rng(4)
+    img = rng.integers(0, 256, (40, 50)).astype(np.uint8)
+    labels = _markers(rng, img.shape, 9) * rng.integers(1, 4, img.shape)
+    labels[0, 0], labels[39, 49], labels[20, 25] = 1, 2, 3
+
+    # One layer per label, each one the transform of its markers
+    D = multi_label_geodesic_distance_transform(
+        img, labels, per_label=True, method=method
+    )
+    for k in range(3):
+        np.testing.assert_array_equal(
+            D[k], geodesic_distance_transform(img, labels == k + 1, method=method)
+        )
+
+    # A single pass gives the distance to the closest marker and its label
+    L, D_min = multi_label_geodesic_distance_transform(img, labels, method=method)
+    np.testing.assert_array_equal(D_min, D.min(axis=0))
+    unique = np.sum(D == D_min, axis=0) == 1
+    np.testing.assert_array_equal(L[unique], D.argmin(axis=0)[unique] + 1)
+
+
+def test_dial_matches_sweeps():
+    rng = np.random.default_rng(1)
+    img = rng.integers(0, 256, (90, 110)).astype(np.uint8)
+    mask = _markers(rng, img.shape)
+    np.testing.assert_array_equal(
+        geodesic_distance_transform(img, mask, method="dial"),
+        geodesic_distance_transform(img, mask),
+    )
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_output_buffer(dtype):
+    rng = np.random.default_rng(5)
+    img = rng.integers(0, 256, (30, 40)).astype(np.uint8)
+    mask = _markers(rng, img.shape)
+    out = np.zeros(img.shape, dtype=dtype)
+    dist = geodesic_distance_transform(img, mask, out=out)
+    assert dist is out
+    np.testing.assert_array_equal(dist, geodesic_distance_transform(img, mask))
+    with pytest.raises(ValueError):
+        geodesic_distance_transform(img, mask, out=np.zeros(img.shape, np.uint32))
+
+
+@pytest.mark.parametrize("method", ["sweep", "dial"])
+def test_max_distance_and_roi(method):
+    rng = np.random.default_rng(6)
+    img = rng.integers(0, 256, (30, 40)).astype(np.uint8)
+    mask = _markers(rng, img.shape)
+    exact = geodesic_distance_transform(img, mask, method=method)
+
+    # The distances up to max_distance are the exact ones
+    limit = float(np.median(exact))
+    np.testing.assert_array_equal(
+        geodesic_distance_transform(img, mask, method=method, max_distance=limit),
+        np.where(exact <= limit, exact, np.float32(1e10)),
+    )
+
+    # A box gives the transform of the image cropped to it, markers outside
+    # of it staying at 0
+    box = np.s_[4:25, 6:31]
+    dist = geodesic_distance_transform(img, mask, method=method, roi=(4, 6, 25, 31))
+    np.testing.assert_array_equal(
+        dist[box], geodesic_distance_transform(img[box], mask[box], method=method)
+    )
+    outside = np.ones(img.shape, dtype=np.bool_)
+    outside[box] = False
+    np.testing.assert_array_equal(dist[outside], np.where(mask, 0, 1e10)[outside])
+
+    # With a mask, paths stay inside of it
+    roi = np.ones(img.shape, dtype=np.bool_)
+    roi[:, 18:21] = False
+    roi[mask] = True
+    dist = geodesic_distance_transform(img, mask, method=method, roi=roi)
+    assert np.all(dist[~roi] == 1e10)
+    assert np.all(dist[roi] >= exact[roi])
+
+
+def _serpentine(shape=(41, 40)) -> np.ndarray:
+    # A wall every 4 rows, open at alternate ends: the
+    # corridor winds back and forth, and each turn takes more sweeps
+    img = np.zeros(shape, dtype=np.uint8)
+    for i, row in enumerate(range(2, shape[0] - 1, 4)):
+        img[row] = 255
+        if i % 2 == 0:
+            img[row, -2:] = 0
+        else:
+            img[row, :2] = 0
+    return img
+
+
+def test_max_sweeps():
+    img = _serpentine()
+    mask = np.zeros(img.shape, dtype=np.bool_)
+    mask[0, 0] = True
+    exact = geodesic_distance_transform(img, mask, method="dial")
+    with record() as rec:
+        np.testing.assert_array_equal(geodesic_distance_transform(img, mask), exact)
+    sweeps = rec.stages[-1]["sweeps"]
+    assert sweeps > 3
+
+    # Fewer sweeps give upper bounds of the distances, that get closer (the
+    # last sweep only checks that nothing changes)
+    previous = None
+    for n in range(1, sweeps - 1):
+        with record() as rec:
+            dist = geodesic_distance_transform(img, mask, max_sweeps=n)
+        assert rec.stages[-1]["sweeps"] == n
+        assert np.all(dist >= exact)
+        assert np.any(dist > exact)
+        if previous is not None:
+            assert np.all(dist <= previous)
+        previous = dist
+    np.testing.assert_array_equal(
+        geodesic_distance_transform(img, mask, max_sweeps=sweeps - 1), exact
+    )
+
+    # The passes stop once no distance decreases by more than tol
+    with record() as rec:
+        dist = geodesic_distance_transform(img, mask, tol=1e9)
+    assert rec.stages[-1]["sweeps"] < sweeps
+    assert np.all(dist >= exact)
+
+
+def test_dial_rejects_non_integer_costs():
+    img = np.zeros((4, 5), dtype=np.float32)
+    mask = np.ones(img.shape, dtype=np.bool_)
+    with pytest.raises(ValueError):
+        geodesic_distance_transform(img, mask, method="dial")
+    with pytest.raises(ValueError):
+        geodesic_distance_transform(
+            np.zeros((4, 5, 3), dtype=np.uint8), mask, method="dial", metric="l2"
+        )
+    with pytest.raises(ValueError):
+        geodesic_distance_transform(img.astype(np.uint8), mask, method="dial", gamma=1)
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.float32])
+@pytest.mark.parametrize("metric", ["l1", "l2", "max"])
+def test_channels(dtype, metric):
+    rng = np.random.default_rng(2)
+    img = (rng.random((40, 50, 3)) * 255).astype(dtype)
+    mask = _markers(rng, img.shape[:2])
+    full = geodesic_distance_transform(img, mask, metric=metric)
+
+    # A single channel is the image itself
+    np.testing.assert_array_equal(
+        geodesic_distance_transform(img[..., :1], mask, metric=metric),
+        geodesic_distance_transform(img[..., 0], mask),
+    )
+
+    # Adding markers to a transform gives the transform of all of them
+    first = mask.copy()
+    first[np.argwhere(mask)[:2].T.tolist()] = False
+    dist = geodesic_distance_transform(img, first, metric=metric)
+    new = np.argwhere(mask & ~first)
+    geodesic_distance_transform_update(img, dist, new, metric=metric)
+    np.testing.assert_allclose(dist, full, rtol=1e-6)
+
+
+@pytest.mark.parametrize("connectivity", [4, 8, 16])
+@pytest.mark.parametrize("gamma", [None, 0.5])
+def test_update_connectivity(connectivity, gamma):
+    rng = np.random.default_rng(3)
+    img = rng.integers(0, 256, (40, 50)).astype(np.uint8)
+    mask = _markers(rng, img.shape)
+    options = {"connectivity": connectivity, "gamma": gamma}
+    full = geodesic_distance_transform(img, mask, **options)
+
+    first = mask.copy()
+    first[np.argwhere(mask)[:2].T.tolist()] = False
+    dist = geodesic_distance_transform(img, first, **options)
+    geodesic_distance_transform_update(img, dist, np.argwhere(mask & ~first), **options)
+    np.testing.assert_allclose(dist, full, rtol=1e-6)
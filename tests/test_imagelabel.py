@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("PySide6")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtGui import QColor, QImage, QPixmap  # noqa: E402
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+from dt import immersion, get_coordinates, get_immersed_coordinates  # noqa: E402
+from gui.imagelabel import ImageLabel  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def _rgb(pixmap: QPixmap) -> np.ndarray:
+    img = pixmap.toImage().convertToFormat(QImage.Format_RGB888)
+    # Copied, the buffer belongs to img
+    arr = np.frombuffer(img.constBits(), dtype=np.uint8)
+    arr = arr.reshape(img.height(), img.bytesPerLine())[:, : 3 * img.width()]
+    return arr.reshape(img.height(), img.width(), 3).copy()
+
+
+def test_markers_match_painted_pixels(app):
+    # The label buffer holds the pixels painted in blue (1) and red (2), the
+    # last stroke over a pixel winning
+    gray = np.random.default_rng(0).integers(0, 256, (45, 61)).astype(np.uint8)
+    image = QImage(gray.data, 61, 45, 61, QImage.Format_Grayscale8)
+    label = ImageLabel()
+    label.setPixmap(QPixmap.fromImage(image))
+    original = _rgb(label._orig_pix)
+
+    strokes = [(1, 5, 10, 8), (2, 20, 12, 6), (1, 24, 14, 3), (2, 59, 43, 9)]
+    for k, x, y, r in strokes:
+        label.set_brush_label(k)
+        label.set_brush_color(QColor("blue" if k == 1 else "red"))
+        label.set_brush_radius(r)
+        label._paint_at(x, y)
+
+    painted = _rgb(label._pix)
+    changed = np.any(painted != original, axis=2)
+    expected = np.zeros(gray.shape, dtype=np.uint8)
+    expected[changed & np.all(painted == (0, 0, 255), axis=2)] = 1
+    expected[changed & np.all(painted == (255, 0, 0), axis=2)] = 2
+    markers = label.markers
+    assert markers.shape == gray.shape
+    assert set(np.unique(markers)) == {0, 1, 2}
+    np.testing.assert_array_equal(markers, expected)
+
+    # The seeds are the faces of the immersed masks of the labels
+    for k in (1, 2):
+        mask = (markers == k).astype(np.uint8)
+        np.testing.assert_array_equal(
+            get_immersed_coordinates(markers == k),
+            get_coordinates(immersion(mask)[1] > 0),
+        )
+
+    label.clear_painting()
+    assert not label.markers.any()
@@ -0,0 +1,228 @@
+import numpy as np
+import pytest
+
+from dt import (
+    immersion,
+    level_lines_distance_transform,
+    level_lines_distance_transform_update,
+    implicit_level_lines_distance_transform,
+    implicit_level_lines_distance_transform_update,
+    level_lines_distance_transform_3d,
+    multi_label_level_lines_distance_transform,
+    get_coordinates,
+)
+
+
+def _seeds(rng, shape, kind):
+    seeds = np.stack([rng.integers(0, n, 8) for n in shape], axis=1)
+    if kind == "duplicated":
+        seeds = np.concatenate((seeds, seeds[::2], seeds[:1]))
+    return seeds
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16])
+@pytest.mark.parametrize("kind", ["random", "duplicated"])
+def test_engines_match(dtype, kind):
+    rng = np.random.default_rng(0)
+    for _ in range(5):
+        img = rng.integers(0, np.iinfo(dtype).max, (17, 23), endpoint=True)
+        m, M = immersion(img.astype(dtype))
+        seeds = _seeds(rng, m.shape, kind)
+        F, D = level_lines_distance_transform(m, M, seeds, engine="numba")
+        F_py, D_py = level_lines_distance_transform(m, M, seeds, engine="python")
+        np.testing.assert_array_equal(D, D_py)
+        np.testing.assert_array_equal(F, F_py)
+
+
+def test_bool_image_matches_uint8():
+    img = np.random.default_rng(1).random((19, 21)) > 0.5
+    seeds = [(0, 0), (20, 12)]
+    F, D = level_lines_distance_transform(*immersion(img), seeds)
+    F_u8, D_u8 = level_lines_distance_transform(*immersion(img.astype(np.uint8)), seeds)
+    np.testing.assert_array_equal(D, D_u8)
+    np.testing.assert_array_equal(F, F_u8)
+
+
+@pytest.mark.parametrize(
+    "option",
+    [
+        {"dtype": np.uint16},
+        {"return_levels": False},
+        {"max_distance": 3},
+        {"roi": (0, 0, 5, 5)},
+        {"cancel": np.zeros(1, dtype=np.bool_)},
+    ],
+)
+def test_python_engine_rejects_options(option):
+    m, M = immersion(np.zeros((4, 4), dtype=np.uint8))
+    with pytest.raises(ValueError):
+        level_lines_distance_transform(m, M, engine="python", **option)
+
+
+def test_output_buffers_and_dtypes():
+    rng = np.random.default_rng(5)
+    img = rng.integers(0, 256, (19, 23)).astype(np.uint8)
+    m, M = immersion(img)
+    seeds = _seeds(rng, m.shape, "random")
+    F_ref, D_ref = level_lines_distance_transform(m, M, seeds)
+
+    # Existing buffers are filled and returned, whatever they held
+    out = np.full(m.shape, 7, dtype=m.dtype)
+    dist_out = np.zeros(m.shape, dtype=np.uint16)
+    F, D = level_lines_distance_transform(m, M, seeds, out=out, dist_out=dist_out)
+    assert F is out and D is dist_out
+    np.testing.assert_array_equal(D, D_ref)
+    np.testing.assert_array_equal(F, F_ref)
+
+    # Compact distances, without the levels
+    F, D = level_lines_distance_transform(
+        m, M, seeds, dtype=np.uint16, return_levels=False
+    )
+    assert F is None and D.dtype == np.uint16
+    np.testing.assert_array_equal(D, D_ref)
+    _, D = implicit_level_lines_distance_transform(
+        img, seeds, pixels_only=True, dist_out=np.empty(img.shape, dtype=np.uint16)
+    )
+    np.testing.assert_array_equal(D, D_ref[::2, ::2])
+
+    # Distances that do not fit, and invalid buffers
+    with pytest.raises(OverflowError):
+        level_lines_distance_transform(m, M, [(0, 0)], dtype=np.uint8)
+    for options in (
+        {"dtype": np.int32},
+        {"dtype": np.float32},
+        {"dist_out": np.empty((3, 3), dtype=np.uint32)},
+        {"dist_out": np.empty(m.shape[::-1], dtype=np.uint32).T},
+        {"out": np.empty(m.shape, dtype=np.uint16)},
+    ):
+        with pytest.raises(ValueError):
+            level_lines_distance_transform(m, M, seeds, **options)
+
+
+def test_max_distance_and_roi():
+    rng = np.random.default_rng(6)
+    img = rng.integers(0, 256, (21, 25)).astype(np.uint8)
+    m, M = immersion(img)
+    seeds = _seeds(rng, m.shape, "random")
+    _, D_ref = level_lines_distance_transform(m, M, seeds)
+    UNSEEN = np.iinfo(D_ref.dtype).max
+
+    # The distances up to max_distance are the ones of the whole flood
+    limit = int(np.median(D_ref))
+    for transform in (
+        lambda **kw: level_lines_distance_transform(m, M, seeds, **kw),
+        lambda **kw: implicit_level_lines_distance_transform(img, seeds, **kw),
+    ):
+        _, D = transform(max_distance=limit)
+        np.testing.assert_array_equal(D, np.where(D_ref <= limit, D_ref, UNSEEN))
+
+    # A box gives the flood of the faces inside it, from the seeds inside it
+    l0, c0, l1, c1 = 5, 8, 30, 41
+    inside = (seeds[:, 0] >= l0) & (seeds[:, 0] < l1)
+    inside &= (seeds[:, 1] >= c0) & (seeds[:, 1] < c1)
+    assert inside.any() and not inside.all()
+    _, D = level_lines_distance_transform(m, M, seeds, roi=(l0, c0, l1, c1))
+    _, D_box = level_lines_distance_transform(
+        np.ascontiguousarray(m[l0:l1, c0:c1]),
+        np.ascontiguousarray(M[l0:l1, c0:c1]),
+        seeds[inside] - (l0, c0),
+    )
+    np.testing.assert_array_equal(D[l0:l1, c0:c1], D_box)
+    D[l0:l1, c0:c1] = UNSEEN
+    assert np.all(D == UNSEEN)
+
+    # A mask of the box gives the same flood, and a mask cutting the grid
+    # leaves the faces outside of it unreached
+    box = np.zeros(m.shape, dtype=np.bool_)
+    box[l0:l1, c0:c1] = True
+    _, D = level_lines_distance_transform(m, M, seeds, roi=box)
+    np.testing.assert_array_equal(D[l0:l1, c0:c1], D_box)
+    roi = np.ones(m.shape, dtype=np.bool_)
+    roi[:, 20:23] = False
+    roi[tuple(seeds.T)] = True
+    _, D = level_lines_distance_transform(m, M, seeds, roi=roi)
+    assert np.all(D[~roi] == UNSEEN)
+    assert np.all(D[roi] != UNSEEN)
+
+
+def test_multi_label():
+    rng = np.random.default_rng(4)
+    m, M = immersion(rng.integers(0, 256, (21, 25)).astype(np.uint8))
+    labels = np.zeros(m.shape, dtype=np.uint8)
+    for k in (1, 2, 3):
+        labels[tuple(_seeds(rng, m.shape, "random")[:3].T)] = k
+    seed_sets = [get_coordinates(labels == k) for k in (1, 2, 3)]
+
+    # One layer per label, each one the transform of its seeds
+    D = multi_label_level_lines_distance_transform(m, M, labels, per_label=True)
+    assert D.shape == (3,) + m.shape
+    for k, seeds in enumerate(seed_sets):
+        np.testing.assert_array_equal(
+            D[k], level_lines_distance_transform(m, M, seeds)[1]
+        )
+    np.testing.assert_array_equal(
+        multi_label_level_lines_distance_transform(m, M, seed_sets, per_label=True), D
+    )
+
+    # A single flood from all the seeds, carrying their labels
+    L, D = multi_label_level_lines_distance_transform(m, M, labels)
+    _, D_all = level_lines_distance_transform(m, M, get_coordinates(labels > 0))
+    np.testing.assert_array_equal(D, D_all)
+    np.testing.assert_array_equal(L[labels > 0], labels[labels > 0])
+    assert set(np.unique(L)) == {1, 2, 3}
+
+
+def _smooth(shape):
+    x = np.indices(shape).sum(axis=0)
+    return (128 + 100 * np.sin(x / 5) * np.cos(np.arange(shape[-1]) / 7)).astype(
+        np.uint8
+    )
+
+
+@pytest.mark.parametrize("shape", [(33, 41), (5, 9, 11)])
+def test_update_from_no_seeds_matches_transform(shape):
+    # Without previous seeds, the update is the transform of the new ones
+    rng = np.random.default_rng(2)
+    m, M = immersion(rng.integers(0, 256, shape).astype(np.uint8))
+    seeds = _seeds(rng, m.shape, "duplicated")
+    transform = (
+        level_lines_distance_transform
+        if len(shape) == 2
+        else level_lines_distance_transform_3d
+    )
+    F_ref, D_ref = transform(m, M, seeds)
+    F, D = transform(m, M, [])
+    level_lines_distance_transform_update(m, M, F, D, seeds)
+    np.testing.assert_array_equal(D, D_ref)
+    np.testing.assert_array_equal(F[D < D.max()], F_ref[D < D.max()])
+
+
+@pytest.mark.parametrize("implicit", [False, True])
+def test_update_against_recompute(implicit):
+    rng = np.random.default_rng(3)
+    img = _smooth((48, 56))
+    m, M = immersion(img)
+    old, new = _seeds(rng, m.shape, "random"), _seeds(rng, m.shape, "random")[:3]
+    _, D_full = level_lines_distance_transform(m, M, np.concatenate((old, new)))
+    if implicit:
+        F, D = implicit_level_lines_distance_transform(img, old)
+        D_old = D.copy()
+        implicit_level_lines_distance_transform_update(img, F, D, new)
+    else:
+        F, D = level_lines_distance_transform(m, M, old)
+        D_old = D.copy()
+        level_lines_distance_transform_update(m, M, F, D, new)
+
+    # An approximation of the recompute, which never increases the distances
+    assert np.all(D <= D_old)
+    assert np.all(D[tuple(new.T)] == 0)
+    assert np.any(D < D_old)
+    error = np.abs(D.astype(np.int64) - D_full).sum() / D_full.sum()
+    assert error < 0.02
+
+    # Bounded, only the faces reached below max_distance change
+    F, D = level_lines_distance_transform(m, M, old)
+    level_lines_distance_transform_update(m, M, F, D, new, max_distance=20)
+    changed = D != D_old
+    assert np.all(D[changed] <= 20)
+    np.testing.assert_array_equal(D[~changed], D_old[~changed])
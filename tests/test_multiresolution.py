@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from dt import (
+    implicit_level_lines_distance_transform,
+    geodesic_distance_transform,
+    multiresolution_level_lines_distance_transform,
+    multiresolution_geodesic_distance_transform,
+    approximation_error,
+)
+from dt.multiresolution import _pyramid, _reduce_mask, _upsample
+
+
+@pytest.fixture
+def img():
+    x = np.indices((45, 61)).sum(axis=0)
+    return (128 + 100 * np.sin(x / 9) * np.cos(np.arange(61) / 13)).astype(np.uint8)
+
+
+@pytest.fixture
+def mask(img):
+    mask = np.zeros(img.shape, dtype=np.bool_)
+    mask[3, 4] = mask[40, 30] = mask[20, 58] = True
+    return mask
+
+
+def test_pyramid():
+    img = np.arange(45 * 61).reshape(45, 61)
+    pyramid = _pyramid(img, 3)
+    assert [level.shape for level in pyramid] == [(45, 61), (23, 31), (12, 16), (6, 8)]
+    np.testing.assert_array_equal(pyramid[2], img[::4, ::4])
+    # Stops once a side has a single pixel
+    assert len(_pyramid(img[:3], 5)) == 3
+
+    mask = np.zeros((5, 7), dtype=np.bool_)
+    mask[4, 3] = True
+    reduced = _reduce_mask(mask)
+    assert reduced.shape == (3, 4)
+    np.testing.assert_array_equal(np.argwhere(reduced), [(2, 1)])
+
+    up = _upsample(pyramid[2], img.shape)
+    assert up.shape == img.shape
+    np.testing.assert_array_equal(up[::4, ::4], pyramid[2])
+    np.testing.assert_array_equal(up[5, 6], img[4, 4])
+
+
+def test_stop_level(img, mask):
+    # The coarsest level is the exact transform of the subsampled image
+    # (markers reduced to the pixels standing for them), upsampled
+    top = _pyramid(img, 2)[-1]
+    coarse = _reduce_mask(_reduce_mask(mask))
+    gdt = multiresolution_geodesic_distance_transform(img, mask, levels=2, stop_level=5)
+    assert gdt.shape == img.shape
+    np.testing.assert_array_equal(
+        gdt, _upsample(geodesic_distance_transform(top, coarse), img.shape)
+    )
+
+    seeds = 2 * np.argwhere(mask)
+    lldt = multiresolution_level_lines_distance_transform(
+        img, seeds, levels=2, stop_level=2
+    )
+    _, D = implicit_level_lines_distance_transform(
+        top, 2 * np.argwhere(coarse), pixels_only=True
+    )
+    np.testing.assert_array_equal(lldt, _upsample(D, img.shape))
+
+
+def test_exact_without_levels(img, mask):
+    # Only a transform without any coarser level is exact
+    np.testing.assert_array_equal(
+        multiresolution_geodesic_distance_transform(img, mask, levels=0),
+        geodesic_distance_transform(img, mask),
+    )
+    seeds = 2 * np.argwhere(mask)
+    np.testing.assert_array_equal(
+        multiresolution_level_lines_distance_transform(img, seeds, levels=0),
+        implicit_level_lines_distance_transform(img, seeds, pixels_only=True)[1],
+    )
+
+
+def test_finer_levels_are_closer(img, mask):
+    exact = geodesic_distance_transform(img, mask)
+    errors = [
+        approximation_error(
+            multiresolution_geodesic_distance_transform(img, mask, stop_level=k),
+            exact,
+        )["relative"]
+        for k in range(4)
+    ]
+    assert errors == sorted(errors)
+    assert errors[0] < 0.05
+
+
+def test_approximation_error():
+    exact = np.array([[0, 2, 4], [1, np.iinfo(np.uint16).max, 3]], dtype=np.uint16)
+    approx = np.array([[0, 3, 4], [1, 0, 1]], dtype=np.uint16)
+    # The pixel the exact transform did not reach is left out
+    assert approximation_error(approx, exact) == {
+        "max": 2.0,
+        "mean": 0.6,
+        "relative": 0.6 / 2.0,
+        "exact": 0.6,
+    }
+    exact = np.array([0.0, 1.0, 1e10])
+    assert approximation_error(exact, exact)["exact"] == 1.0
+    assert approximation_error(np.zeros(1), np.full(1, 1e10))["max"] == 0.0
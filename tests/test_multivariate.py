@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from dt import (
+    implicit_level_lines_distance_transform,
+    multivariate_level_lines_distance_transform,
+)
+
+
+@pytest.fixture
+def img():
+    return np.random.default_rng(0).integers(0, 256, (17, 21, 3)).astype(np.uint8)
+
+
+SEEDS = [(0, 0), (20, 30), (11, 7)]
+
+
+@pytest.mark.parametrize("pixels_only", [False, True])
+def test_channels_are_flooded_on_their_own(img, pixels_only):
+    F, D = multivariate_level_lines_distance_transform(
+        img, SEEDS, pixels_only=pixels_only
+    )
+    channels = [
+        implicit_level_lines_distance_transform(
+            np.ascontiguousarray(img[..., k]), SEEDS, pixels_only=pixels_only
+        )
+        for k in range(img.shape[2])
+    ]
+    np.testing.assert_array_equal(F, np.stack([F_k for F_k, _ in channels], axis=-1))
+    np.testing.assert_array_equal(D, sum(D_k for _, D_k in channels))
+
+    D_max = multivariate_level_lines_distance_transform(
+        img, SEEDS, pixels_only=pixels_only, metric="max", return_levels=False
+    )[1]
+    np.testing.assert_array_equal(D_max, np.max([D_k for _, D_k in channels], axis=0))
+
+    D_l2 = multivariate_level_lines_distance_transform(
+        img, SEEDS, pixels_only=pixels_only, metric="l2"
+    )[1]
+    assert D_l2.dtype == np.float32
+    squares = sum(D_k.astype(np.float64) ** 2 for _, D_k in channels)
+    np.testing.assert_allclose(D_l2, np.sqrt(squares), rtol=1e-6)
+
+
+def test_single_channel(img):
+    F, D = multivariate_level_lines_distance_transform(img[..., :1], SEEDS)
+    F_ref, D_ref = implicit_level_lines_distance_transform(
+        np.ascontiguousarray(img[..., 0]), SEEDS
+    )
+    np.testing.assert_array_equal(F[..., 0], F_ref)
+    np.testing.assert_array_equal(D, D_ref)
+
+
+def test_dtype_and_errors(img):
+    _, D = multivariate_level_lines_distance_transform(img, SEEDS)
+    _, D16 = multivariate_level_lines_distance_transform(img, SEEDS, dtype=np.uint16)
+    assert D16.dtype == np.uint16
+    np.testing.assert_array_equal(D16, D)
+    # The sum of the channels does not fit, even though each one does
+    ramp = np.repeat((np.arange(21, dtype=np.uint8) * 5)[None, :, None], 3, axis=2)
+    _, D = multivariate_level_lines_distance_transform(ramp, metric="max")
+    assert D.max() == 100
+    with pytest.raises(OverflowError):
+        multivariate_level_lines_distance_transform(ramp, dtype=np.uint8)
+
+    with pytest.raises(ValueError):
+        multivariate_level_lines_distance_transform(img[..., 0], SEEDS)
+    with pytest.raises(ValueError):
+        multivariate_level_lines_distance_transform(img, SEEDS, metric="l3")
@@ -0,0 +1,58 @@
+import numpy as np
+
+from dt import (
+    StreamingSession,
+    geodesic_distance_transform,
+    implicit_level_lines_distance_transform,
+    get_immersed_coordinates,
+    approximation_error,
+)
+
+
+def _frames(count: int, shape=(48, 64)) -> list[np.ndarray]:
+    # A bright square moving over a gradient
+    img = (np.indices(shape).sum(axis=0) * 2).astype(np.uint8)
+    frames = []
+    for t in range(count):
+        frame = img.copy()
+        frame[4 + 3 * t : 12 + 3 * t, 10 + 4 * t : 18 + 4 * t] += 90
+        frames.append(frame)
+    return frames
+
+
+def _markers(t: int, shape=(48, 64)) -> np.ndarray:
+    # Markers added over the frames, one of them removed at the 6th
+    markers = np.zeros(shape, dtype=np.bool_)
+    markers[2, 3] = markers[40, 50] = True
+    if t >= 3:
+        markers[30, 10] = True
+    if t >= 6:
+        markers[2, 3] = False
+    return markers
+
+
+def test_gdt_matches_cold_transform():
+    # At threshold 0, every frame gets the transform of the frame
+    session = StreamingSession(("gdt",))
+    for t, frame in enumerate(_frames(9)):
+        markers = _markers(t)
+        dist = session.update(frame, markers)["gdt"]
+        np.testing.assert_array_equal(dist, geodesic_distance_transform(frame, markers))
+
+
+def test_lldt_drift_is_bounded():
+    # The updated frames drift from the transform, until it is recomputed
+    # after `refresh` of them, or when a marker is removed (at the 6th frame)
+    # or its pixel changes (the square reaches one at the 10th)
+    session = StreamingSession(("lldt",), refresh=2)
+    errors = []
+    for t, frame in enumerate(_frames(11)):
+        markers = _markers(t)
+        D = session.update(frame, markers)["lldt"]
+        _, exact = implicit_level_lines_distance_transform(
+            frame, get_immersed_coordinates(markers), pixels_only=True
+        )
+        errors.append(approximation_error(D, exact)["relative"])
+        if t in (0, 3, 6, 9, 10):
+            np.testing.assert_array_equal(D, exact)
+    assert 0 < max(errors) < 0.01
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from dt import (
+    immersion,
+    implicit_level_lines_distance_transform,
+    geodesic_distance_transform,
+    tiled_immersion,
+    tiled_level_lines_distance_transform,
+    tiled_geodesic_distance_transform,
+)
+
+
+@pytest.fixture
+def img():
+    return np.random.default_rng(0).integers(0, 256, (37, 51)).astype(np.uint8)
+
+
+@pytest.mark.parametrize("max_bytes", [2**30, 1000])
+def test_immersion_matches(img, max_bytes):
+    m, M = tiled_immersion(img, max_bytes=max_bytes)
+    m_ref, M_ref = immersion(img)
+    np.testing.assert_array_equal(m, m_ref)
+    np.testing.assert_array_equal(M, M_ref)
+
+
+@pytest.mark.parametrize("max_bytes", [2**30, 4000, 1000])
+@pytest.mark.parametrize("pixels_only", [False, True])
+def test_level_lines_matches(img, max_bytes, pixels_only):
+    seeds = [(0, 0), (40, 60), (72, 100), (40, 60)]
+    F, D = tiled_level_lines_distance_transform(
+        img, seeds, pixels_only=pixels_only, max_bytes=max_bytes
+    )
+    F_ref, D_ref = implicit_level_lines_distance_transform(
+        img, seeds, pixels_only=pixels_only
+    )
+    np.testing.assert_array_equal(D, D_ref)
+    np.testing.assert_array_equal(F, F_ref)
+
+    F, D = tiled_level_lines_distance_transform(
+        img, seeds, pixels_only=pixels_only, max_bytes=max_bytes, return_levels=False
+    )
+    assert F is None
+    np.testing.assert_array_equal(D, D_ref)
+
+
+def test_level_lines_budget(img):
+    # The arrays kept in memory fit in max_bytes together
+    faces = (2 * img.shape[0] - 1) * (2 * img.shape[1] - 1)
+    max_bytes = faces // 8 + 1 + faces * 4
+    F, D = tiled_level_lines_distance_transform(img, max_bytes=max_bytes)
+    assert not isinstance(D, np.memmap)
+    assert isinstance(F, np.memmap)
+
+
+@pytest.mark.parametrize("max_bytes", [2**30, 2000])
+def test_geodesic_matches(img, max_bytes):
+    mask = np.zeros(img.shape, dtype=np.bool_)
+    mask[3, 4] = mask[30, 45] = mask[20, 1] = True
+    np.testing.assert_array_equal(
+        tiled_geodesic_distance_transform(img, mask, max_bytes=max_bytes),
+        geodesic_distance_transform(img, mask),
+    )
@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+
+from dt import immersion, level_lines_distance_transform, TreeOfShapes
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16, np.bool_])
+def test_root_distance_matches_flood(dtype):
+    # From its root (0, 0), the distances of the tree are the LLDT
+    rng = np.random.default_rng(0)
+    for _ in range(5):
+        img = rng.integers(0, 2 if dtype == np.bool_ else np.iinfo(dtype).max, (17, 23))
+        img = img.astype(dtype)
+        F, D = level_lines_distance_transform(*immersion(img))
+        tree = TreeOfShapes(img)
+        np.testing.assert_array_equal(tree.distance(), D)
+        np.testing.assert_array_equal(tree.distance(pixels_only=True), D[::2, ::2])
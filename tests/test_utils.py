@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+from dt import immersion, get_coordinates, get_immersed_coordinates
+
+
+@pytest.mark.parametrize("shape", [(1, 1), (13, 17), (5, 6, 7)])
+@pytest.mark.parametrize("dtype", [np.uint8, np.bool_])
+def test_immersed_coordinates_match_immersion(shape, dtype):
+    # The faces of the immersed mask, without building it
+    rng = np.random.default_rng(0)
+    for density in (0.0, 0.05, 0.5, 1.0):
+        mask = (rng.random(shape) < density).astype(dtype)
+        expected = np.argwhere(immersion(mask.astype(np.uint8))[1] > 0)
+        if mask.ndim == 2:
+            np.testing.assert_array_equal(
+                expected, get_coordinates(immersion(mask.astype(np.uint8))[1] > 0)
+            )
+        seeds = get_immersed_coordinates(mask)
+        assert seeds.shape == (len(expected), len(shape))
+        np.testing.assert_array_equal(seeds, expected)
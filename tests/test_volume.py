@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from dt import (
+    immersion,
+    level_lines_distance_transform,
+    level_lines_distance_transform_3d,
+    implicit_level_lines_distance_transform_3d,
+    geodesic_distance_transform,
+    geodesic_distance_transform_3d,
+)
+
+
+@pytest.fixture
+def volume():
+    return np.random.default_rng(0).integers(0, 256, (7, 9, 11)).astype(np.uint8)
+
+
+def test_single_slice_matches_2d():
+    # A volume of one slice has the same faces as the image
+    rng = np.random.default_rng(1)
+    img = rng.integers(0, 256, (13, 17)).astype(np.uint8)
+    seeds = [(0, 0), (12, 20), (24, 31)]
+    F, D = level_lines_distance_transform(*immersion(img), seeds)
+    F3, D3 = level_lines_distance_transform_3d(
+        *immersion(img[None]), [(0, *seed) for seed in seeds]
+    )
+    np.testing.assert_array_equal(D3[0], D)
+    np.testing.assert_array_equal(F3[0], F)
+
+    mask = np.zeros(img.shape, dtype=np.bool_)
+    mask[3, 4] = mask[10, 1] = True
+    np.testing.assert_array_equal(
+        geodesic_distance_transform_3d(img[None], mask[None], connectivity=26)[0],
+        geodesic_distance_transform(img, mask),
+    )
+
+
+def test_implicit_matches_immersion(volume):
+    seeds = [(0, 0, 0), (6, 9, 13), (12, 16, 20)]
+    F, D = level_lines_distance_transform_3d(*immersion(volume), seeds)
+    F_imp, D_imp = implicit_level_lines_distance_transform_3d(volume, seeds)
+    np.testing.assert_array_equal(D_imp, D)
+    np.testing.assert_array_equal(F_imp, F)
+
+    F_pix, D_pix = implicit_level_lines_distance_transform_3d(
+        volume, seeds, pixels_only=True, dtype=np.uint16
+    )
+    np.testing.assert_array_equal(D_pix, D[::2, ::2, ::2])
+    np.testing.assert_array_equal(F_pix, F[::2, ::2, ::2])
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_float_geodesic_matches_2d(dtype):
+    # Non integer costs rounded to float32 distances must still converge
+    img = (np.random.default_rng(2).random((30, 40)) * 255).astype(dtype)
+    mask = np.zeros(img.shape, dtype=np.bool_)
+    mask[4, 5] = True
+    np.testing.assert_array_equal(
+        geodesic_distance_transform_3d(img[None], mask[None], connectivity=26)[0],
+        geodesic_distance_transform(img, mask),
+    )
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("PySide6")
+
+from dt import PrecomputationCache  # noqa: E402
+from gui.worker import _LLDT_REFRESH, Task, compute_gdt, compute_lldt  # noqa: E402
+
+
+def _image():
+    # Smooth, as the images the GUI is used on, in uint16 as it computes them
+    y, x = np.indices((40, 52))
+    img = 128 + 100 * np.sin(x / 6) * np.cos(y / 5)
+    return img.astype(np.uint16)
+
+
+def _markers(*strokes):
+    markers = np.zeros((40, 52), dtype=np.uint8)
+    for k, y, x in strokes:
+        markers[y : y + 3, x : x + 2] = k
+    return markers
+
+
+FIRST = _markers((1, 5, 5), (2, 30, 40))
+MORE = _markers((1, 5, 5), (2, 30, 40), (1, 20, 10), (2, 10, 45))
+
+
+def _run(fn, *args):
+    return fn(Task(0, "test", fn), *args)
+
+
+def test_gdt_update_matches_recompute():
+    img = _image()
+    *_, state = _run(compute_gdt, img, FIRST)
+    *D, updated = _run(compute_gdt, img, MORE, state)
+    *D_ref, _ = _run(compute_gdt, img, MORE)
+    for d, d_ref in zip(D, D_ref):
+        np.testing.assert_array_equal(d, d_ref)
+    # The previous maps are left as they were
+    assert updated["layers"][0] is not state["layers"][0]
+    assert not np.array_equal(state["layers"][0], D[0])
+
+
+def test_gdt_label_added_later():
+    img = _image()
+    only_fg = _markers((1, 5, 5))
+    *_, state = _run(compute_gdt, img, only_fg)
+    assert state["layers"][1] is None
+    *D, _ = _run(compute_gdt, img, MORE, state)
+    *D_ref, _ = _run(compute_gdt, img, MORE)
+    for d, d_ref in zip(D, D_ref):
+        np.testing.assert_array_equal(d, d_ref)
+
+
+def test_lldt_update_approximates_recompute():
+    img, cache = _image(), PrecomputationCache()
+    *D_old, state = _run(compute_lldt, img, FIRST, cache)
+    *D, updated = _run(compute_lldt, img, MORE, cache, state)
+    *D_ref, fresh = _run(compute_lldt, img, MORE, cache)
+    assert updated["updates"] == 1 and fresh["updates"] == 0
+    for d_old, d, d_ref in zip(D_old, D, D_ref):
+        assert np.all(d <= d_old) and np.any(d < d_old)
+        error = np.abs(d.astype(np.int64) - d_ref).sum() / d_ref.sum()
+        assert error < 0.01
+
+
+def test_lldt_recomputed_when_needed():
+    img, cache = _image(), PrecomputationCache()
+    *D_ref, _ = _run(compute_lldt, img, FIRST, cache)
+
+    # Erased strokes cannot be updated
+    *_, state = _run(compute_lldt, img, MORE, cache)
+    *D, state = _run(compute_lldt, img, FIRST, cache, state)
+    assert state["updates"] == 0
+    for d, d_ref in zip(D, D_ref):
+        np.testing.assert_array_equal(d, d_ref)
+
+    # Nor can the maps be updated forever
+    for n in range(1, _LLDT_REFRESH + 1):
+        *_, state = _run(compute_lldt, img, FIRST, cache, state)
+        assert state["updates"] == n
+    *D, state = _run(compute_lldt, img, FIRST, cache, state)
+    assert state["updates"] == 0
+    for d, d_ref in zip(D, D_ref):
+        np.testing.assert_array_equal(d, d_ref)
+
+    # Color images are always computed anew
+    rgb = np.repeat(img[..., None], 3, axis=2)
+    *D, state = _run(compute_lldt, rgb, FIRST, cache)
+    assert state is None and D[0] is not None